@@ -0,0 +1,440 @@
+"""
+Local stand-in for the parts of the Spotify Web API the exporter uses, serving a synthetic library.
+
+Tracks are generated from their index, so libraries of any size (100 to 1M tracks) cost no memory
+until playlists are written to. Latency and rate limiting (429 with Retry-After) can be injected.
+
+Standalone:
+    python benchmarks/fake_spotify.py --port 8765 --tracks 100000 --latency-ms 40
+and point a client at it with make_client('http://127.0.0.1:8765').
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+MARKETS = ['AD', 'AR', 'AT', 'AU', 'BE', 'BR', 'CA', 'CH', 'DE', 'DK', 'ES', 'FI', 'FR', 'GB', 'IE', 'IT', 'JP', 'NL', 'SE', 'US']
+ALBUM_TYPES = ['album', 'single', 'compilation']
+GENRES = ['pop', 'rock', 'indie', 'hip hop', 'jazz', 'electronic', 'folk', 'metal', 'soul', 'classical', 'k-pop', 'ambient']
+LABELS = ['Fake Records', 'Synthetic Sound', 'Benchmark Music', 'Offline Audio', 'Local Loop']
+USER_ID = 'benchmarkuser'
+NEW_LIKES_FIRST_INDEX = 900_000_000 # tracks liked through FakeLibrary.like, past any playlist's tracks
+
+
+def _spotify_id(prefix: str, index: int) -> str:
+    return f"{prefix}{index:021d}"
+
+
+def track_id(index: int) -> str:
+    return _spotify_id('T', index)
+
+
+def playlist_id(index: int) -> str:
+    return _spotify_id('P', index)
+
+
+def make_track(index: int) -> dict:
+    """Full track object of track index, the same on every call."""
+    album_index = index // 12
+    year = 1960 + album_index % 65
+    release_date = [f"{year}-{1 + album_index % 12:02d}-{1 + album_index % 28:02d}", f"{year}", f"{year}-{1 + album_index % 12:02d}"][album_index % 3]
+    artists = [{'id': _spotify_id('R', (index + k * 131) % 50000), 'name': f"Artist {(index + k * 131) % 50000}", 'type': 'artist'}
+               for k in range(1 + index % 3)]
+    return {
+        'id': track_id(index),
+        'name': f"Track {index}",
+        'uri': f"spotify:track:{track_id(index)}",
+        'type': 'track',
+        'duration_ms': 120000 + (index * 7919) % 240000,
+        'explicit': index % 5 == 0,
+        'popularity': index % 101,
+        'track_number': 1 + index % 12,
+        'external_ids': {'isrc': f"XX{index:010d}"},
+        'available_markets': MARKETS,
+        'artists': artists,
+        'album': {
+            'id': _spotify_id('A', album_index),
+            'name': f"Album {album_index}",
+            'album_type': ALBUM_TYPES[album_index % 3],
+            'release_date': release_date,
+            'release_date_precision': ['day', 'year', 'month'][album_index % 3],
+            'total_tracks': 12,
+            'artists': artists[:1],
+            'available_markets': MARKETS,
+        },
+    }
+
+
+def make_artist(index: int) -> dict:
+    """Full artist object of artist index (the artists of make_track use indices below 50000)."""
+    return {
+        'id': _spotify_id('R', index),
+        'name': f"Artist {index}",
+        'type': 'artist',
+        'genres': [GENRES[(index + k * 5) % len(GENRES)] for k in range(index % 4)],
+        'popularity': (index * 37) % 101,
+        'followers': {'href': None, 'total': index * 13},
+        'images': [],
+    }
+
+
+def make_album(index: int) -> dict:
+    """Full album object of album index, without its track listing."""
+    album = dict(make_track(index * 12)['album'])
+    album.update({'label': LABELS[index % len(LABELS)], 'popularity': (index * 17) % 101, 'genres': [],
+                  'copyrights': [{'text': f"(P) {LABELS[index % len(LABELS)]}", 'type': 'P'}]})
+    return album
+
+
+def _added_at(index: int) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1_500_000_000 + index * 3600))
+
+
+def parse_fields(text: str) -> dict:
+    """Field tree of a fields= filter, e.g. 'items(track(id,name)),total' -> {'items': {'track': {...}}, 'total': {}}."""
+    def parse(position):
+        tree, name = {}, ''
+        while position < len(text):
+            char = text[position]
+            if char == '(':
+                tree[name.strip()], position = parse(position + 1)
+                name = ''
+                continue
+            if char in ',)':
+                if name.strip():
+                    tree[name.strip()] = {}
+                name = ''
+                position += 1
+                if char == ')':
+                    return tree, position
+                continue
+            name += char
+            position += 1
+        if name.strip():
+            tree[name.strip()] = {}
+        return tree, position
+    return parse(0)[0]
+
+
+def apply_fields(value, tree: dict):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [apply_fields(element, tree) for element in value]
+    if isinstance(value, dict):
+        return {key: apply_fields(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
+
+
+@dataclass
+class FakeLibrary:
+    """
+    Synthetic account: saved_tracks Liked Songs and playlist_count playlists named 'Playlist <n>'.
+    Playlist n holds playlist_sizes.get(n, default_playlist_size) tracks starting at track n * 1000.
+    """
+    saved_tracks: int = 1000
+    playlist_count: int = 50
+    default_playlist_size: int = 100
+    playlist_sizes: dict[int, int] = field(default_factory=dict)
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    rate_limit_every: int = 0 # every n-th request is answered with a 429
+    max_requests_per_second: float = 0.0 # requests beyond this budget are answered with a 429
+    retry_after_seconds: int = 1 # whole seconds, like the real API (urllib3 rejects fractional values)
+    user_id: str = USER_ID
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._request_count = 0
+        self._since_rate_limit_change = 0
+        self._window = []
+        self._written = {} # playlist id -> track ids, for playlists created or modified through the API
+        self._versions = {}
+        self._names = {}
+        self._liked = None # (track index, added_at index) newest first, once likes were added or removed
+        self._new_likes = 0
+        self._failures = [] # statuses of the next requests that are answered with a server error
+        self._random = random.Random(0)
+        self.rate_limited_count = 0
+
+    # -- playlist contents --
+
+    def _playlist_index(self, pid: str) -> int | None:
+        if pid.startswith('P') and pid[1:].isdigit() and int(pid[1:]) < self.playlist_count:
+            return int(pid[1:])
+        return None
+
+    def playlist_track_ids(self, pid: str) -> list[str] | range | None:
+        if pid in self._written:
+            return self._written[pid]
+        index = self._playlist_index(pid)
+        if index is None:
+            return None
+        return range(index * 1000, index * 1000 + self.playlist_sizes.get(index, self.default_playlist_size))
+
+    def _track_at(self, entry) -> dict:
+        return make_track(entry if isinstance(entry, int) else int(entry[1:]))
+
+    def playlist_name(self, pid: str) -> str:
+        return self._names.get(pid) or f"Playlist {self._playlist_index(pid)}"
+
+    def snapshot_id(self, pid: str) -> str:
+        return f"{pid}-v{self._versions.get(pid, 0)}"
+
+    def _write(self, pid: str, update):
+        with self._lock:
+            current = self.playlist_track_ids(pid)
+            ids = [entry if isinstance(entry, str) else track_id(entry) for entry in current]
+            self._written[pid] = update(ids)
+            self._versions[pid] = self._versions.get(pid, 0) + 1
+
+    def rename(self, pid: str, name: str):
+        """Renames a playlist, which gives it a new snapshot_id like on Spotify."""
+        with self._lock:
+            self._names[pid] = name
+            self._versions[pid] = self._versions.get(pid, 0) + 1
+
+    def _liked_entries(self) -> list[tuple[int, int]]:
+        if self._liked is None:
+            self._liked = [(position, self.saved_tracks - position) for position in range(self.saved_tracks)]
+        return self._liked
+
+    def like(self, count: int = 1) -> list[str]:
+        """Saves count tracks that were not liked yet on top of Liked Songs, as the app would. Returns their ids."""
+        with self._lock:
+            liked = self._liked_entries()
+            newest = liked[0][1] if liked else 0
+            entries = [(NEW_LIKES_FIRST_INDEX + self._new_likes + count - 1 - n, newest + count - n) for n in range(count)]
+            self._new_likes += count
+            liked[:0] = entries
+        return [track_id(index) for index, _ in entries]
+
+    def relike(self, ids: list[str]):
+        """Likes already saved tracks again, which moves them on top of Liked Songs with a new added_at."""
+        with self._lock:
+            liked = self._liked_entries()
+            newest = liked[0][1] if liked else 0
+            moved = [entry for entry in liked if track_id(entry[0]) in set(ids)]
+            liked[:] = ([(index, newest + len(moved) - n) for n, (index, _) in enumerate(moved)]
+                        + [entry for entry in liked if track_id(entry[0]) not in set(ids)])
+
+    def unlike(self, ids: list[str]):
+        with self._lock:
+            doomed = set(ids)
+            self._liked = [entry for entry in self._liked_entries() if track_id(entry[0]) not in doomed]
+
+    # -- throttling --
+
+    def admit(self) -> bool:
+        """Counts a request and decides whether it is rate limited."""
+        with self._lock:
+            self._request_count += 1
+            self._since_rate_limit_change += 1
+            now = time.monotonic()
+            limited = bool(self.rate_limit_every) and self._since_rate_limit_change % self.rate_limit_every == 0
+            if self.max_requests_per_second:
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.max_requests_per_second:
+                    limited = True
+                else:
+                    self._window.append(now)
+            if limited:
+                self.rate_limited_count += 1
+            delay = (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000.0
+        if delay:
+            time.sleep(delay)
+        return not limited
+
+    def set_rate_limit_every(self, every: int):
+        """Answers every n-th request from now on with a 429 (0 turns injection off)."""
+        with self._lock:
+            self.rate_limit_every = every
+            self._since_rate_limit_change = 0
+
+    def fail_next(self, count: int, status: int = 500):
+        """Answers the next count requests with a server error."""
+        with self._lock:
+            self._failures = [status] * count
+
+    def next_failure(self) -> int | None:
+        with self._lock:
+            return self._failures.pop() if self._failures else None
+
+    @property
+    def request_count(self) -> int:
+        return self._request_count
+
+    # -- endpoints --
+
+    def _page(self, url: str, entries, offset: int, limit: int, make_item) -> dict:
+        items = [make_item(offset + i, entry) for i, entry in enumerate(entries[offset:offset + limit])]
+        total = len(entries)
+        next_url = f"{url}?offset={offset + limit}&limit={limit}" if offset + limit < total else None
+        return {'href': url, 'items': items, 'limit': limit, 'offset': offset, 'total': total, 'next': next_url, 'previous': None}
+
+    def handle(self, method: str, path: str, query: dict, body) -> tuple[int, dict]:
+        parts = [part for part in path.split('/') if part]
+        if parts and parts[0] == 'v1':
+            parts = parts[1:]
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', 20))
+        fields = parse_fields(query['fields']) if query.get('fields') else {}
+
+        if method == 'GET' and parts == ['me']:
+            return 200, {'id': self.user_id, 'display_name': 'Benchmark User'}
+        if method == 'GET' and parts == ['me', 'tracks']:
+            if self._liked is not None:
+                return 200, self._page('me/tracks', self._liked, offset, limit,
+                                       lambda position, entry: {'added_at': _added_at(entry[1]), 'track': make_track(entry[0])})
+            return 200, self._page('me/tracks', range(self.saved_tracks), offset, limit,
+                                   lambda position, index: {'added_at': _added_at(self.saved_tracks - position), 'track': make_track(index)})
+        if method == 'GET' and parts == ['me', 'playlists']:
+            pids = [playlist_id(index) for index in range(self.playlist_count)] + [pid for pid in self._written if self._playlist_index(pid) is None]
+            return 200, self._page('me/playlists', pids, offset, limit, lambda position, pid: {
+                'id': pid, 'name': self.playlist_name(pid), 'snapshot_id': self.snapshot_id(pid),
+                'tracks': {'total': len(self.playlist_track_ids(pid))}})
+        if method == 'GET' and parts and parts[0] in BATCH_ENDPOINTS and len(parts) == 1:
+            make, limit = BATCH_ENDPOINTS[parts[0]]
+            ids = [entity_id for entity_id in query.get('ids', '').split(',') if entity_id]
+            if len(ids) > limit:
+                return 400, {'error': {'status': 400, 'message': f"Too many ids requested (max {limit})"}}
+            return 200, {parts[0]: [make(int(entity_id[1:])) if entity_id[1:].isdigit() else None for entity_id in ids]}
+        if method == 'POST' and len(parts) == 3 and parts[0] == 'users' and parts[2] == 'playlists':
+            with self._lock:
+                pid = _spotify_id('N', len(self._written) + 1)
+                self._written[pid] = []
+                self._names[pid] = (body or {}).get('name', '')
+            return 201, {'id': pid, 'name': self._names[pid], 'snapshot_id': self.snapshot_id(pid),
+                         'external_urls': {'spotify': f"https://open.spotify.com/playlist/{pid}"}}
+
+        if len(parts) >= 2 and parts[0] == 'playlists':
+            pid = parts[1]
+            entries = self.playlist_track_ids(pid)
+            if entries is None:
+                return 404, {'error': {'status': 404, 'message': 'Not found.'}}
+            if len(parts) == 2 and method == 'GET':
+                playlist = {'id': pid, 'name': self.playlist_name(pid), 'snapshot_id': self.snapshot_id(pid),
+                            'external_urls': {'spotify': f"https://open.spotify.com/playlist/{pid}"},
+                            'tracks': {'total': len(entries)}}
+                return 200, apply_fields(playlist, fields)
+            if len(parts) == 3 and parts[2] in ('tracks', 'items'):
+                if method == 'GET':
+                    page = self._page(f"playlists/{pid}/{parts[2]}", entries, offset, limit,
+                                      lambda position, entry: {'added_at': _added_at(position), 'is_local': False,
+                                                               'track': self._track_at(entry)})
+                    return 200, apply_fields(page, fields)
+                if method == 'POST':
+                    uris = body if isinstance(body, list) else (body or {}).get('uris', [])
+                    added = [uri.rsplit(':', 1)[-1] for uri in uris]
+                    self._write(pid, lambda ids: ids + added)
+                    return 201, {'snapshot_id': self.snapshot_id(pid)}
+                if method == 'DELETE':
+                    removed = {entry['uri'].rsplit(':', 1)[-1] for entry in (body or {}).get('items', (body or {}).get('tracks', []))}
+                    self._write(pid, lambda ids: [tid for tid in ids if tid not in removed])
+                    return 200, {'snapshot_id': self.snapshot_id(pid)}
+        return 404, {'error': {'status': 404, 'message': f"No fake endpoint for {method} {path}"}}
+
+
+# several-objects endpoints: name -> (object maker, max ids per call)
+BATCH_ENDPOINTS = {'tracks': (make_track, 50), 'artists': (make_artist, 50), 'albums': (make_album, 20)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    library: FakeLibrary = None
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+        if not self.library.admit():
+            status, payload, headers = 429, {'error': {'status': 429, 'message': 'API rate limit exceeded'}}, {
+                'Retry-After': str(int(self.library.retry_after_seconds))}
+        elif (failure := self.library.next_failure()) is not None:
+            status, payload, headers = failure, {'error': {'status': failure, 'message': 'Server error'}}, {}
+        else:
+            status, payload = self.library.handle(self.command, url.path, query, json.loads(raw_body) if raw_body else None)
+            headers = {}
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSpotifyServer:
+    """Serves a FakeLibrary on a background thread: with FakeSpotifyServer(library) as server: ... server.url ..."""
+    def __init__(self, library: FakeLibrary, host: str = '127.0.0.1', port: int = 0):
+        handler = type('Handler', (_Handler,), {'library': library})
+        self.library = library
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_client(base_url: str):
+    """spotipy client talking to the fake server, configured like client.initialize_spotify_auth's."""
+    import spotipy
+
+    from spotify_exporter.client import build_session
+
+    from spotify_exporter.config import REQUEST_TIMEOUT_SECONDS
+
+    sp = spotipy.Spotify(auth='benchmark-token', requests_session=build_session(), requests_timeout=REQUEST_TIMEOUT_SECONDS)
+    sp.prefix = base_url.rstrip('/') + '/v1/'
+    return sp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic Spotify library for offline benchmarks.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--tracks', type=int, default=1000, help="size of Liked Songs and of playlist 0")
+    parser.add_argument('--playlists', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="answer every n-th request with a 429")
+    parser.add_argument('--max-rps', type=float, default=0.0, help="answer requests beyond this rate with a 429")
+    parser.add_argument('--retry-after', type=int, default=1)
+    args = parser.parse_args()
+
+    library = FakeLibrary(args.tracks, args.playlists, playlist_sizes={0: args.tracks}, latency_ms=args.latency_ms,
+                          jitter_ms=args.jitter_ms, rate_limit_every=args.rate_limit_every,
+                          max_requests_per_second=args.max_rps, retry_after_seconds=args.retry_after)
+    with FakeSpotifyServer(library, port=args.port) as server:
+        print(f"Fake Spotify API at {server.url}/v1/ (playlist 0: {playlist_id(0)}), Ctrl+C to stop")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,388 @@
+"""
+Offline benchmarks of the export pipeline against the fake Spotify API of fake_spotify.py.
+
+    python benchmarks/run_benchmarks.py                          # default sizes, prints a table
+    python benchmarks/run_benchmarks.py --sizes 100 1000000      # up to a 1M track library
+    python benchmarks/run_benchmarks.py --check                  # exit 1 if a case is over its threshold
+    python benchmarks/run_benchmarks.py --write-thresholds       # record the current timings (x headroom)
+    python benchmarks/run_benchmarks.py --only startup           # cold start of the GUI only
+
+Each case is run --repeat times and its best time is kept. Request counts are deterministic, so
+thresholds also catch changes that make more calls than before. Cases returning a track table also
+report its bytes per track, which is held to a memory budget. Startup cases run the GUI in a fresh
+interpreter and are held to a fixed time budget instead of their recorded time. Caches are kept in a temporary
+directory, never in the user's cache dir.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_spotify import USER_ID, FakeLibrary, FakeSpotifyServer, make_client, make_track, playlist_id, track_id  # noqa: E402
+
+from spotify_exporter import cache, config, playlist_index  # noqa: E402
+from spotify_exporter.attributes import RowBuilder  # noqa: E402
+from spotify_exporter.config import DEFAULT_ATTRIBUTES  # noqa: E402
+from spotify_exporter.table import compact_tracks, table_bytes  # noqa: E402
+
+ENRICHED_ATTRIBUTES = DEFAULT_ATTRIBUTES + ['artist.genres', 'artist.popularity', 'album.label']
+DEFAULT_SIZES = [100, 10_000, 100_000]
+DEFAULT_THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thresholds.json')
+RATE_LIMITED_MAX_SIZE = 10_000 # 429 injection cases only run up to this size, they are about retry overhead
+RATE_LIMIT_EVERY = 5 # every 5th request of the rate limited cases gets a 429
+INDEX_PLAYLIST_COUNT = 2_000
+LIKED_DELTA_SIZE = 10 # tracks liked between two runs of the incremental Liked Songs case
+UPLOAD_MAX_SIZE = 10_000
+MEMORY_HEADROOM = 1.1 # table sizes only change with the code (or pandas), so their budget is tight
+STARTUP_BUDGET_SECONDS = 1.0 # from launching the interpreter to the window being drawn
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'openpyxl', 'spotipy', 'requests', 'urllib3')
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# run in a fresh interpreter; body sets loaded to the heavy modules imported by the Tk thread, printed as JSON
+STARTUP_SCRIPT = """
+import json, os, sys
+sys.path.insert(0, {repo_dir!r})
+os.chdir({repo_dir!r})
+from spotify_exporter import config
+config.set_cache_dir({cache_dir!r})
+def heavy_modules():
+    return sorted(name for name in {heavy_modules!r} if name in sys.modules)
+{body}
+print(json.dumps(loaded))
+sys.stdout.flush()
+os._exit(0) # do not wait for the background login check
+"""
+STARTUP_IMPORT = """
+import spotify
+loaded = heavy_modules()
+"""
+# the saved login check (which imports spotipy) only starts once the window is drawn, in the background
+STARTUP_WINDOW = """
+import tkinter as tk
+import spotify
+root = tk.Tk()
+app = spotify.SpotifyExporterApp(root)
+loaded = heavy_modules()
+root.update()
+"""
+
+
+class Case:
+    def __init__(self, name: str, run, setup=None, library: FakeLibrary | None = None, measure_table: bool = False,
+                 budget_seconds: float | None = None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.library = library
+        self.measure_table = measure_table
+        self.budget_seconds = budget_seconds
+
+
+def _reset_caches():
+    """Drops the process wide cache objects so the next call opens the (benchmark) cache dir again."""
+    cache.track_cache_global = None
+    playlist_index.playlist_index_global = None
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def synthetic_frame(indices, attributes: list[str] = DEFAULT_ATTRIBUTES):
+    """Export frame of the given track indices, as get_tracks_to_df would build it."""
+    import pandas as pd
+
+    row_builder = RowBuilder(attributes)
+    return compact_tracks(pd.DataFrame([row_builder.row(make_track(index)) for index in indices], columns=row_builder.columns))
+
+
+def perturbed_frames(size: int):
+    """(old, new) frames of a playlist that lost 5% of its tracks, gained 5%, had 1% renamed and a block moved."""
+    rng = random.Random(size)
+    old_df = synthetic_frame(range(size))
+    kept = [index for index in range(size) if rng.random() >= 0.05]
+    block = len(kept) // 10
+    kept = kept[block:2 * block] + kept[:block] + kept[2 * block:]
+    new_df = synthetic_frame(kept + list(range(size, size + size // 20)))
+    renamed = new_df.sample(frac=0.01, random_state=size).index
+    new_df.loc[renamed, 'name'] = new_df.loc[renamed, 'name'] + ' (Remastered)'
+    return old_df, new_df
+
+
+def network_cases(size: int, sp, library: FakeLibrary) -> list[Case]:
+    from spotify_exporter.tracks import get_tracks_to_df
+
+    pid = playlist_id(0)
+    cases = [
+        Case(f"get_tracks_to_df[{size}]", lambda: get_tracks_to_df(pid, DEFAULT_ATTRIBUTES, sp=sp, use_cache=False), library=library,
+             measure_table=True),
+        Case(f"get_tracks_to_df_cached[{size}]", lambda: get_tracks_to_df(pid, DEFAULT_ATTRIBUTES, sp=sp),
+             setup=lambda: get_tracks_to_df(pid, DEFAULT_ATTRIBUTES, sp=sp, refresh_cache=True), library=library),
+        Case(f"liked_songs_to_df[{size}]", lambda: get_tracks_to_df('', DEFAULT_ATTRIBUTES, sp=sp, use_cache=False), library=library),
+    ]
+    def liked_songs_delta():
+        library.like(LIKED_DELTA_SIZE)
+        return get_tracks_to_df('', DEFAULT_ATTRIBUTES, sp=sp)
+
+    cases.append(Case(f"liked_songs_delta[{size}]", liked_songs_delta,
+                      setup=lambda: get_tracks_to_df('', DEFAULT_ATTRIBUTES, sp=sp, refresh_cache=True), library=library))
+    def enriched_cold():
+        cache.get_track_cache().clear()
+        return get_tracks_to_df(pid, ENRICHED_ATTRIBUTES, sp=sp)
+
+    cases += [
+        Case(f"get_tracks_to_df_enriched_cold[{size}]", enriched_cold, library=library, measure_table=True),
+        Case(f"get_tracks_to_df_enriched_warm[{size}]", lambda: get_tracks_to_df(pid, ENRICHED_ATTRIBUTES, sp=sp),
+             setup=enriched_cold, library=library),
+    ]
+    if size <= UPLOAD_MAX_SIZE:
+        from spotify_exporter.upload import upload_tracks
+
+        track_ids = [track_id(index) for index in range(size)]
+        runs = iter(range(1_000_000))
+        cases.append(Case(f"upload_tracks_create[{size}]", lambda: upload_tracks(
+            track_ids, playlist_name=f"Upload {size}", checkpoint_key=f"benchmark-{size}-{next(runs)}", sp=sp), library=library))
+    if size <= RATE_LIMITED_MAX_SIZE:
+        def rate_limited():
+            library.set_rate_limit_every(RATE_LIMIT_EVERY)
+            try:
+                return get_tracks_to_df(pid, DEFAULT_ATTRIBUTES, sp=sp, use_cache=False)
+            finally:
+                library.set_rate_limit_every(0)
+        cases.append(Case(f"get_tracks_to_df_rate_limited[{size}]", rate_limited, library=library))
+    return cases
+
+
+def index_cases(sp, library: FakeLibrary) -> list[Case]:
+    from spotify_exporter.tracks import id_helper_name
+
+    last_name = f"Playlist {library.playlist_count - 1}"
+
+    def cold():
+        _reset_caches()
+        _remove(config.get_playlist_index_path(USER_ID))
+        return id_helper_name(last_name, sp)
+
+    def from_disk():
+        playlist_index.playlist_index_global = None
+        return id_helper_name(last_name, sp)
+
+    return [
+        Case(f"id_helper_name_cold[{library.playlist_count}]", cold, library=library),
+        Case(f"id_helper_name_from_disk[{library.playlist_count}]", from_disk, setup=cold, library=library),
+        Case(f"id_helper_name_warm[{library.playlist_count}]", lambda: id_helper_name(last_name, sp), setup=cold, library=library),
+    ]
+
+
+def _has_display() -> bool:
+    try:
+        import tkinter as tk
+        tk.Tk().destroy()
+        return True
+    except Exception:
+        return False
+
+
+def startup_cases(work_dir: str) -> list[Case]:
+    """Cold start of the GUI: importing spotify.py, and (with a display) until the window is first drawn."""
+    def run_fresh(body):
+        script = STARTUP_SCRIPT.format(repo_dir=REPO_DIR, cache_dir=os.path.join(work_dir, 'startup_cache'), body=body,
+                                       heavy_modules=HEAVY_MODULES)
+        completed = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+        return {'heavy_modules': json.loads(completed.stdout.strip().splitlines()[-1])}
+
+    cases = [Case("startup_import", lambda: run_fresh(STARTUP_IMPORT), budget_seconds=STARTUP_BUDGET_SECONDS)]
+    if _has_display():
+        cases.append(Case("startup_window", lambda: run_fresh(STARTUP_WINDOW), budget_seconds=STARTUP_BUDGET_SECONDS))
+    return cases
+
+
+def local_cases(size: int, work_dir: str, excel_max_size: int) -> list[Case]:
+    from spotify_exporter.diff import diff_tracks
+    from spotify_exporter.export import build_export_sheets
+    from spotify_exporter.formats import write_sheets
+
+    frames = {}
+
+    def prepare():
+        if not frames:
+            frames['old'], frames['new'] = perturbed_frames(size)
+            frames['old_path'] = os.path.join(work_dir, f"previous_{size}.parquet")
+            frames['old'].to_parquet(frames['old_path'], index=False)
+
+    cases = [
+        Case(f"diff_tracks[{size}]", lambda: diff_tracks(frames['old'], frames['new']), setup=prepare),
+        Case(f"update_diff[{size}]", lambda: build_export_sheets(frames['new'], frames['old_path']), setup=prepare),
+        Case(f"write_parquet[{size}]", lambda: write_sheets({'AllSongs': frames['new']}, os.path.join(work_dir, f"out_{size}.parquet")),
+             setup=prepare),
+    ]
+    built = {}
+
+    def build_index():
+        # 20 playlists of size / 10 tracks, each overlapping the next by half, and Liked Songs holding every track
+        from spotify_exporter.track_index import LIKED_SONGS_ID, TrackIndex
+        from spotify_exporter.tracks import PlaylistListing
+
+        built['index'] = track_index = TrackIndex(os.path.join(work_dir, f"track_index_{size}.sqlite3"))
+        step = max(1, size // 20)
+        for number in range(20):
+            track_ids = [track_id(index) for index in range(number * step, number * step + 2 * step)]
+            track_index.put_playlist(playlist_id(number), f"Playlist {number}", 'snapshot', PlaylistListing(track_ids))
+        track_index.put_playlist(LIKED_SONGS_ID, 'Liked Songs', None, PlaylistListing([track_id(index) for index in range(size)]))
+        track_index.put_tracks([(track_id(index), f"Track {index}", f"Artist {index}") for index in range(size)])
+
+    cases.append(Case(f"track_index_queries[{size}]", lambda: built['index'].to_sheets(), setup=build_index))
+    if size <= excel_max_size:
+        def write_xlsx():
+            sheets = build_export_sheets(frames['new'], frames['old_path'])
+            write_sheets(sheets, os.path.join(work_dir, f"out_{size}.xlsx"))
+        cases.append(Case(f"write_xlsx[{size}]", write_xlsx, setup=prepare))
+    return cases
+
+
+def run_case(case: Case, repeat: int) -> dict:
+    if case.setup is not None:
+        case.setup()
+    timings = []
+    requests = None
+    for _ in range(repeat):
+        requests_before = case.library.request_count if case.library else 0
+        start = time.perf_counter()
+        output = case.run()
+        timings.append(time.perf_counter() - start)
+        if case.library:
+            requests = case.library.request_count - requests_before
+    result = {'seconds': round(min(timings), 4), 'median_seconds': round(sorted(timings)[len(timings) // 2], 4)}
+    if requests is not None:
+        result['requests'] = requests
+    if case.measure_table and output is not None and len(output):
+        result['bytes_per_track'] = round(table_bytes(output) / len(output), 1)
+    if case.budget_seconds is not None:
+        result['budget_seconds'] = case.budget_seconds
+    if isinstance(output, dict) and 'heavy_modules' in output:
+        result['heavy_modules'] = output['heavy_modules']
+    return result
+
+
+def check_thresholds(results: dict, thresholds: dict) -> list[str]:
+    """Descriptions of the cases that are slower, or make more requests, than their thresholds allow."""
+    failures = []
+    for name, limits in thresholds.get('cases', {}).items():
+        result = results.get(name)
+        if result is None:
+            continue
+        if result['seconds'] > limits.get('max_seconds', float('inf')):
+            failures.append(f"{name}: {result['seconds']:.3f}s > {limits['max_seconds']:.3f}s")
+        if result.get('requests', 0) > limits.get('max_requests', float('inf')):
+            failures.append(f"{name}: {result['requests']} requests > {limits['max_requests']}")
+        if result.get('bytes_per_track', 0) > limits.get('max_bytes_per_track', float('inf')):
+            failures.append(f"{name}: {result['bytes_per_track']} bytes per track > {limits['max_bytes_per_track']}")
+        if result.get('heavy_modules'):
+            failures.append(f"{name}: {', '.join(result['heavy_modules'])} imported at startup")
+    return failures
+
+
+def thresholds_from(results: dict, headroom: float, settings: dict) -> dict:
+    cases = {}
+    for name, result in results.items():
+        limits = {'max_seconds': result.get('budget_seconds') or round(max(result['seconds'] * headroom, 0.05), 3)}
+        if 'requests' in result:
+            limits['max_requests'] = result['requests']
+        if 'bytes_per_track' in result:
+            limits['max_bytes_per_track'] = round(result['bytes_per_track'] * MEMORY_HEADROOM)
+        cases[name] = limits
+    return {'settings': settings, 'headroom': headroom, 'machine': platform.platform(), 'cases': cases}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the exporter against a local fake Spotify API.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="library sizes (tracks)")
+    parser.add_argument('--only', nargs='+', default=None, help="run only cases whose name starts with one of these")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="latency added to every fake API response")
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--excel-max-size', type=int, default=20_000, help="largest size written as .xlsx")
+    parser.add_argument('--playlists', type=int, default=INDEX_PLAYLIST_COUNT, help="playlists in the library for id_helper_name")
+    parser.add_argument('--output', help="save the results as JSON")
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS_PATH)
+    parser.add_argument('--check', action='store_true', help="exit with status 1 if a case exceeds its threshold")
+    parser.add_argument('--write-thresholds', action='store_true', help="save the results (times headroom) as thresholds")
+    parser.add_argument('--headroom', type=float, default=2.0)
+    args = parser.parse_args()
+
+    logging.getLogger('spotipy').setLevel(logging.CRITICAL) # injected 429s are expected
+    settings = {'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms}
+    results = {}
+
+    def wanted(name):
+        return not args.only or any(name.startswith(prefix) for prefix in args.only)
+
+    def run(cases):
+        for case in cases:
+            if not wanted(case.name):
+                continue
+            results[case.name] = run_case(case, args.repeat)
+            result = results[case.name]
+            requests = f"{result['requests']:>8}" if 'requests' in result else f"{'':>8}"
+            table = f"{result['bytes_per_track']:>10.0f}" if 'bytes_per_track' in result else ""
+            print(f"{case.name:<44} {result['seconds']:>9.3f}s {requests}{table}", flush=True)
+
+    with tempfile.TemporaryDirectory(prefix='spotify_exporter_bench_') as work_dir:
+        config.set_cache_dir(os.path.join(work_dir, 'cache'))
+        _reset_caches()
+        print(f"{'case':<44} {'best':>10} {'requests':>8} {'B/track':>9}")
+        run(startup_cases(work_dir))
+
+        library = FakeLibrary(saved_tracks=0, playlist_count=args.playlists, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              retry_after_seconds=0)
+        with FakeSpotifyServer(library) as server:
+            run(index_cases(make_client(server.url), library))
+
+        for size in args.sizes:
+            library = FakeLibrary(saved_tracks=size, playlist_count=1, playlist_sizes={0: size}, latency_ms=args.latency_ms,
+                                  jitter_ms=args.jitter_ms, retry_after_seconds=0)
+            with FakeSpotifyServer(library) as server:
+                run(network_cases(size, make_client(server.url), library))
+            run(local_cases(size, work_dir, args.excel_max_size))
+        _reset_caches()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'settings': settings, 'results': results}, f, indent=1)
+    if args.write_thresholds:
+        with open(args.thresholds, 'w', encoding='utf-8') as f:
+            json.dump(thresholds_from(results, args.headroom, settings), f, indent=1)
+            f.write('\n')
+        print(f"Thresholds written to {args.thresholds}")
+    if args.check:
+        try:
+            with open(args.thresholds, 'r', encoding='utf-8') as f:
+                thresholds = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read thresholds from {args.thresholds}: {e}")
+            sys.exit(2)
+        if thresholds.get('settings', settings) != settings:
+            print(f"Thresholds were recorded with {thresholds['settings']}, not {settings}; cannot compare.")
+            sys.exit(2)
+        failures = check_thresholds(results, thresholds)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+        print("All cases within their thresholds.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,230 +1,78 @@
-import spotipy
-from spotipy.oauth2 import SpotifyPKCE 
-import pandas as pd
-import json
 import tkinter as tk 
-from tkinter import filedialog, messagebox 
+from tkinter import filedialog, messagebox, ttk
+import queue
 import sys 
-import os 
-from appdirs import user_cache_dir
-
-# helper function for pyinstaller
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and for PyInstaller """
-    try:
-        base_path = sys._MEIPASS
-    except AttributeError:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-
-
-
-CONFIG_FILE = resource_path('config.json')
-CLIENT_ID = None
-REDIRECT_URI = None
-
-APP_NAME = "SpotifyPlaylistExporter"
-APP_AUTHOR = "MySpotifyTools"
-CACHE_DIR = user_cache_dir(APP_NAME, APP_AUTHOR)
-if not os.path.exists(CACHE_DIR):
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from spotify_exporter import client
+from spotify_exporter.api import create_playlist_from_file
+from spotify_exporter.config import CONFIG_FILE, DEFAULT_ATTRIBUTES, OPTIONAL_ATTRIBUTES, load_config, resource_path
+from spotify_exporter.diff import save_snapshot
+from spotify_exporter.errors import (AuthenticationError, ConfigurationError, InputFileError, OperationCancelled,
+                                     SpotifyExporterError, UpdateError, UploadError)
+from spotify_exporter.export import build_export_sheets, suggest_output_filename
+from spotify_exporter.formats import FILE_TYPES, write_sheets
+from spotify_exporter.progress import ProgressTracker, tracking
+from spotify_exporter.tracks import get_playlist_id_from_query, get_tracks_to_df
+
+# GUI front end, the export logic itself lives in the spotify_exporter package
+
+EVENT_POLL_MS = 100 # how often the Tk thread picks up progress from the background worker
+PROGRESS_BAR_STEPS = 1000
+LOGIN_TIMEOUT_SECONDS = 5 * 60 # how long the Login button waits for the browser login before giving up
+
+def config_is_valid() -> bool:
+    """Returns True if config.json provides CLIENT_ID and REDIRECT_URI."""
     try:
-        os.makedirs(CACHE_DIR)
-    except OSError as e:
-        print(f"Warning: Could not create cache directory at {CACHE_DIR}: {e}")
-        CACHE_DIR = "." 
-SPOTIFY_CACHE_PATH = os.path.join(CACHE_DIR, '.spotify_pkce_cache')
-
-try:
-    with open(CONFIG_FILE, 'r') as f:
-        spotify_data = json.load(f)['SPOTIFY']
-    CLIENT_ID = spotify_data['CLIENT_ID']
-    REDIRECT_URI = spotify_data['REDIRECT_URI']
-except (FileNotFoundError, KeyError) as e:
-    print(f"CRITICAL ERROR: Error loading configuration from {CONFIG_FILE}: {e}")
-
-SCOPE = "user-library-read playlist-read-private playlist-read-collaborative playlist-modify-private"
-DEFAULT_ATTRIBUTES = ['id', 'name', 'artists.name', 'album.name', 'album.album_type', 'album.release_date', 'duration_ms']
-
-sp_global = None
-auth_manager_global = None
-
-def initialize_spotify_auth()->bool:
-    """
-    Initializes the Spotify Authentication Manager and the Spotipy client.
-    Attempts to get an access token.
-    Returns True on success, False on failure.
-    """
-    global auth_manager_global, sp_global, CLIENT_ID, REDIRECT_URI, SCOPE, SPOTIFY_CACHE_PATH
-
-    if not CLIENT_ID or not REDIRECT_URI: 
-        messagebox.showerror("Configuration Error", "Client ID or Redirect URI is missing. Please check config.json.")
-        return False
-
-    try:
-        auth_manager_global = SpotifyPKCE(
-            client_id=CLIENT_ID,
-            redirect_uri=REDIRECT_URI,
-            scope=SCOPE,
-            open_browser=True,
-            cache_path=SPOTIFY_CACHE_PATH
-        )
-        token_info = auth_manager_global.get_access_token() 
-        if not token_info:
-            messagebox.showerror("Authentication Failed", "Could not get Spotify access token. Please try again.")
-            return False
-        sp_global = spotipy.Spotify(auth_manager=auth_manager_global)
+        load_config()
         return True
-    except Exception as e:
-        messagebox.showerror("Authentication Error", f"Could not initialize Spotify: {e}")
-        sp_global = None 
+    except ConfigurationError as e:
+        print(f"CRITICAL ERROR: {e}")
         return False
 
-def id_helper_name(playlist_name: str) -> str | None:
-    """
-    Finds playlist ID by name. 
-    Uses global sp_global.
-    """
-    if not sp_global: return None 
-    results = sp_global.current_user_playlists(limit=50)
-    while results:
-        for item in results['items']:
-            if item.get('name', '').lower() == playlist_name.lower(): 
-                return item.get('id')
-        results = sp_global.next(results) if results['next'] else None
-    return None
-
-def id_helper_url(playlist_url: str) -> str :
-    """Extracts playlist ID from URL."""
-    return playlist_url[34:56]
+def show_auth_error(error: Exception) -> bool:
+    """Reports a failed login in a message box. Returns False for errors that are not about the login."""
+    if isinstance(error, ConfigurationError):
+        messagebox.showerror("Configuration Error", "Client ID or Redirect URI is missing. Please check config.json.")
+    elif isinstance(error, AuthenticationError):
+        messagebox.showerror("Authentication Error", str(error))
+    else:
+        return False
+    return True
 
 
-def get_playlist_id_from_query(playlist_query: str) -> str | None:
+def build_sheets_for_export(main_df, update_excel_path: str | None = None):
     """
-    Determines playlist ID from user query (name, URL, or blank for liked).
-    Returns playlist ID, '' for liked songs, or None if not found/invalid.
+    Builds the sheets to save (handling the update logic) and the suggested file name.
+    Problems with the update file do not stop the export, they are returned as a (title, message) warning.
+    Returns (final_sheets, output_filename_suggestion, warning).
     """
-    if not sp_global:
-        messagebox.showerror("Error", "Spotify not authenticated. Please authenticate first.")
-        return None
-
-    if not playlist_query: 
-        return ''
-
-    if 'open.spotify.com/playlist/' in playlist_query:
-        return id_helper_url(playlist_query)
-    else: 
-        return id_helper_name(playlist_query)
-
-
-def get_tracks_to_df(playlist_id: str, attributes: list[str]) -> pd.DataFrame | None:
-    """Fetches tracks and converts them to a DataFrame. Uses global sp_global."""
-    if not sp_global: return None
-
-    output_columns = []
-    attribute_to_output_mapping = []
-    col_idx_counter = 0
-
-    for attr_path in attributes:
-        if attr_path == 'artists.name':
-            output_columns.extend(['primary-artist', 'featured-artists'])
-            attribute_to_output_mapping.append({'type': 'artists', 'indices': (col_idx_counter, col_idx_counter + 1)})
-            col_idx_counter += 2
-        else:
-            output_columns.append(attr_path.replace('.', '-')) 
-            attribute_to_output_mapping.append({'type': 'other', 'path': attr_path, 'index': col_idx_counter})
-            col_idx_counter += 1
-    all_rows_data=[] 
-    items_iterator=None
-    if playlist_id=='': 
-        items_iterator=sp_global.current_user_saved_tracks(limit=50)
-    else:
-        items_iterator=sp_global.playlist_items(playlist_id, limit=50, fields="items(track(id,name,artists(name),album(name,album_type,release_date),duration_ms)),next")
-
-
-    while items_iterator:
-        for item in items_iterator['items']:
-            track_data=item.get('track')
-            if not track_data or track_data.get('id') is None:
-                continue
-
-            row_data=[None]*len(output_columns)
-
-            for mapping in attribute_to_output_mapping:
-                if mapping['type']=='artists':
-                    artists=track_data.get('artists', [])
-                    if artists:
-                        row_data[mapping['indices'][0]]=artists[0].get('name')
-                        if len(artists)>1:
-                            row_data[mapping['indices'][1]]=", ".join([a.get('name') for a in artists[1:]])
-                else:
-                    current_val = track_data
-                    for part in mapping['path'].split('.'):
-                        if isinstance(current_val, dict):
-                            current_val = current_val.get(part)
-                        else:
-                            current_val = None
-                            break
-                    row_data[mapping['index']] = current_val
-            all_rows_data.append(row_data)
-
-        items_iterator = sp_global.next(items_iterator) if items_iterator.get('next') else None
-    if not all_rows_data:
-        return pd.DataFrame(columns=output_columns)
-    return pd.DataFrame(all_rows_data, columns=output_columns)
-
-
-def export_data_to_excel(main_df: pd.DataFrame, update_excel_path: str | None = None):
-    """Saves the DataFrame to Excel, handles update logic, and creates multiple sheets."""
-    if main_df.empty and not update_excel_path:
-        messagebox.showinfo("No Data", "No data to export.")
-        return
-
-    output_filename_suggestion = "spotify_playlist_data.xlsx"
-    final_sheets = {'AllSongs': main_df.copy()} 
+    output_filename_suggestion = suggest_output_filename()
+    final_sheets = {'AllSongs': main_df}
+    warning = None
     if update_excel_path:
         try:
-            old_df = pd.read_excel(update_excel_path, sheet_name='AllSongs')
-            if 'id' not in old_df.columns or 'id' not in main_df.columns:
-                messagebox.showerror("Update Error", "'id' column missing in existing or new data. Cannot update.")
-                output_filename_suggestion = "spotify_playlist_data_new_only.xlsx"
-            else:
-                old_ids = set(old_df['id'].dropna())
-                new_ids = set(main_df['id'].dropna())
-                missing_in_new_df = old_df[old_df['id'].isin(old_ids - new_ids)]
-                newly_added_to_playlist_df = main_df[main_df['id'].isin(new_ids - old_ids)]
-                combined_df = pd.concat([main_df, missing_in_new_df], ignore_index=True).drop_duplicates(subset=['id'], keep='first')
-                final_sheets['AllSongs'] = combined_df
-
-                if not missing_in_new_df.empty:
-                    final_sheets['MissingFromCurrentPlaylist'] = missing_in_new_df
-                if not newly_added_to_playlist_df.empty:
-                    final_sheets['NewlyAddedToPlaylist'] = newly_added_to_playlist_df
-                
-                output_filename_suggestion = update_excel_path.split('/')[-1].replace(".xlsx", "_updated.xlsx")
-
-
+            final_sheets = build_export_sheets(main_df, update_excel_path)
+            output_filename_suggestion = suggest_output_filename(update_excel_path)
         except FileNotFoundError:
-            messagebox.showwarning("Update Warning", f"Update file '{update_excel_path}' not found. Proceeding to save new data only.")
+            warning = ("Update Warning", f"Update file '{update_excel_path}' not found. Proceeding to save new data only.")
             output_filename_suggestion = "spotify_playlist_data_new.xlsx"
-        except Exception as e:
-            messagebox.showerror("Update Error", f"Error during update: {e}")
-    save_path = filedialog.asksaveasfilename(
-        initialfile=output_filename_suggestion,
-        defaultextension=".xlsx",
-        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
-    )
-    if not save_path:
-        messagebox.showinfo("Cancelled", "Export operation cancelled.")
-        return
-
-    try:
-        with pd.ExcelWriter(save_path) as writer:
-            for sheet_name, df_to_write in final_sheets.items():
-                if not df_to_write.empty:
-                     df_to_write.to_excel(writer, sheet_name=sheet_name, index=False)
-        messagebox.showinfo("Success", f"Data successfully exported to\n{save_path}")
-    except Exception as e:
-        messagebox.showerror("Export Error", f"Could not save Excel file: {e}")
+        except UpdateError as e:
+            warning = ("Update Error", str(e))
+            output_filename_suggestion = "spotify_playlist_data_new_only.xlsx"
+    return final_sheets, output_filename_suggestion, warning
+
+
+def format_progress(snapshot) -> str:
+    """One line summary of a ProgressSnapshot: pages, rows per second and ETA."""
+    if not snapshot.pages_total:
+        return ""
+    text = f"{snapshot.pages_done}/{snapshot.pages_total} pages, {snapshot.items_done} rows, {snapshot.items_per_second:.0f} rows/s"
+    if snapshot.eta_seconds is not None:
+        minutes, seconds = divmod(int(snapshot.eta_seconds), 60)
+        text += f", ETA {minutes}:{seconds:02d}"
+    return text
 
 class SpotifyExporterApp:
     def __init__(self, root_window):
@@ -246,17 +94,23 @@ class SpotifyExporterApp:
         # stores boolean variable for checkboxes
         self.attribute_vars = {} 
         self.is_authenticated = False 
-        if CLIENT_ID and REDIRECT_URI: #
-            if initialize_spotify_auth():
-                self.is_authenticated = True
-        else:
+        # network and file work runs on one background thread, results come back through events
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.events = queue.Queue()
+        self.current_tracker = None
+        self.login_thread = None
+        self.login_outcome = {}
+        if not config_is_valid():
             messagebox.showerror("Fatal Configuration Error",
                                  f"CLIENT_ID or REDIRECT_URI missing. Please check '{CONFIG_FILE}'.\nApplication will now close.")
             self.root.destroy() 
             return 
 
+        # the window comes first, the saved login is checked in the background once it is up
         self._setup_ui_layout()
-        self._update_ui_auth_state() 
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.root.after(EVENT_POLL_MS, self._poll_events)
+        self.root.after_idle(self._check_saved_login)
 
     def _setup_ui_layout(self):
         """Creates and arranges all the UI widgets."""
@@ -276,8 +130,8 @@ class SpotifyExporterApp:
         attr_frame.pack(fill=tk.X)
 
         num_cols = 3
-        for i, attr_name in enumerate(DEFAULT_ATTRIBUTES):
-            var = tk.BooleanVar(value=True)
+        for i, attr_name in enumerate(DEFAULT_ATTRIBUTES + OPTIONAL_ATTRIBUTES):
+            var = tk.BooleanVar(value=attr_name in DEFAULT_ATTRIBUTES)
             chk = tk.Checkbutton(attr_frame, text=attr_name, variable=var)
             chk.grid(row=i // num_cols, column=i % num_cols, sticky="w", padx=5, pady=2)
             self.attribute_vars[attr_name] = var
@@ -288,6 +142,8 @@ class SpotifyExporterApp:
         tk.Label(playlist_frame, text="Playlist Name/Link (or blank for Liked Songs):").pack(side=tk.LEFT, padx=(0,5))
         self.playlist_entry = tk.Entry(playlist_frame) 
         self.playlist_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.refresh_cache_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(playlist_frame, text="Refresh cache", variable=self.refresh_cache_var).pack(side=tk.LEFT, padx=(5,0))
         update_frame = tk.LabelFrame(self.root, text="Update Existing Excel (Optional)", padx=10, pady=5)
         update_frame.pack(fill=tk.X, padx=10, pady=5)
         create_playlist_frame = tk.LabelFrame(self.root, text="Create Playlist from Excel", padx=10, pady=5)
@@ -316,6 +172,15 @@ class SpotifyExporterApp:
         self.process_button = tk.Button(process_button_frame, text="Get Playlist Data & Export to Excel", command=self._trigger_processing_and_export, font=("Arial", 10, "bold"))
         self.process_button.pack()
 
+        progress_frame = tk.Frame(self.root, padx=10)
+        progress_frame.pack(fill=tk.X)
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate', maximum=PROGRESS_BAR_STEPS)
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0,5))
+        self.cancel_button = tk.Button(progress_frame, text="Cancel", command=self._cancel_current_task, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT)
+        self.progress_var = tk.StringVar()
+        tk.Label(self.root, textvariable=self.progress_var, anchor=tk.W, padx=10).pack(fill=tk.X)
+
         self.status_var = tk.StringVar() 
         self.status_var.set("Please log in to Spotify if needed.")
         status_bar = tk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W, padx=5)
@@ -332,35 +197,167 @@ class SpotifyExporterApp:
             self.process_button.config(state=tk.DISABLED) 
             self.status_var.set("Please log in to Spotify to enable export.")
 
-    def _handle_spotify_login(self):
-        """Handles the 'Login / Re-Login to Spotify' button click."""
-        self.status_var.set("Attempting Spotify authentication... Follow browser prompts.")
-        self.root.update_idletasks()
+    def _check_saved_login(self):
+        """
+        Loads (and if needed refreshes) the saved login in the background, which also imports spotipy
+        off the Tk thread. It never prompts: without a usable saved login the Login button is left to the user.
+        """
+        def check(tracker):
+            tracker.set_phase("Checking saved Spotify login...")
+            client.initialize_spotify_auth(interactive=False)
 
-        if initialize_spotify_auth():
+        def on_checked(_):
             self.is_authenticated = True
+            self._update_ui_auth_state()
+
+        def on_error(error):
+            self._update_ui_auth_state()
+            if not isinstance(error, AuthenticationError):
+                return show_auth_error(error)
+            return True
+
+        self.auth_status_label.config(text="Status: Checking saved login...", fg="orange")
+        self._run_in_background(check, on_checked, on_error)
+
+    def _handle_spotify_login(self):
+        """
+        Handles the 'Login / Re-Login to Spotify' button click. spotipy waits for the browser's redirect
+        without a timeout, so the login runs on a daemon thread that never holds up closing the app, and the
+        background task only waits for it until it finishes, is cancelled or takes LOGIN_TIMEOUT_SECONDS.
+        A login still waiting for the browser is waited for again rather than started twice.
+        """
+        if self.login_thread is None or not self.login_thread.is_alive():
+            outcome = self.login_outcome = {}
+
+            def run_login():
+                try:
+                    client.initialize_spotify_auth()
+                except Exception as e:
+                    outcome['error'] = e
+
+            self.login_thread = threading.Thread(target=run_login, daemon=True)
+            self.login_thread.start()
+        login_thread, outcome = self.login_thread, self.login_outcome
+
+        def login(tracker):
+            tracker.set_phase("Attempting Spotify authentication... Follow browser prompts.")
+            deadline = time.monotonic() + LOGIN_TIMEOUT_SECONDS
+            while login_thread.is_alive():
+                tracker.check()
+                if time.monotonic() > deadline:
+                    raise AuthenticationError("Timed out waiting for the Spotify login. Finish it in the browser, "
+                                              "then press Login again.")
+                login_thread.join(0.2)
+            if 'error' in outcome:
+                raise outcome['error']
+
+        def on_logged_in(_):
+            self.is_authenticated = True
+            self._update_ui_auth_state()
             messagebox.showinfo("Authentication Success", "Successfully authenticated with Spotify!")
-        else:
+
+        def on_error(error):
             self.is_authenticated = False
-        self._update_ui_auth_state() 
+            self._update_ui_auth_state()
+            return show_auth_error(error)
+
+        self._run_in_background(login, on_logged_in, on_error)
 
     def _select_update_excel_file(self):
         """Opens a file dialog to select an Excel file for updating."""
         filepath = filedialog.askopenfilename(
             title="Select Excel file to update",
             defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
+            filetypes=FILE_TYPES
         )
         if filepath:
             self.update_path_var.set(filepath)
             self.status_var.set(f"Selected update file: {filepath.split('/')[-1]}")
 
+    def _set_busy(self, busy: bool):
+        """Disables the action buttons while a background task runs and enables Cancel."""
+        action_state = tk.DISABLED if busy else tk.NORMAL
+        self.login_button.config(state=action_state)
+        self.create_playlist_button.config(state=action_state)
+        self.process_button.config(state=action_state if self.is_authenticated else tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL if busy else tk.DISABLED)
+        self.progress_bar['value'] = 0
+        self.progress_var.set("")
+
+    def _run_in_background(self, work, on_success, on_error=None):
+        """
+        Runs work(tracker) on the background executor with a ProgressTracker installed.
+        on_success(result) or on_error(exception) are then called on the Tk thread; on_error returns
+        True if it handled the exception, otherwise a generic error message is shown.
+        """
+        tracker = ProgressTracker(on_update=lambda snapshot: self.events.put(('progress', snapshot)))
+        self.current_tracker = tracker
+        self._set_busy(True)
+
+        def run():
+            with tracking(tracker):
+                return work(tracker)
+
+        future = self.executor.submit(run)
+        future.add_done_callback(lambda done: self.events.put(('done', (done, on_success, on_error))))
+
+    def _poll_events(self):
+        """Applies progress updates and finished tasks posted by the background thread."""
+        latest_snapshot = None
+        finished = []
+        try:
+            while True:
+                kind, payload = self.events.get_nowait()
+                if kind == 'progress':
+                    latest_snapshot = payload
+                else:
+                    finished.append(payload)
+        except queue.Empty:
+            pass
+
+        if latest_snapshot is not None and self.current_tracker is not None:
+            if latest_snapshot.phase and not self.current_tracker.cancelled:
+                self.status_var.set(latest_snapshot.phase)
+            self.progress_bar['value'] = latest_snapshot.fraction * PROGRESS_BAR_STEPS
+            self.progress_var.set(format_progress(latest_snapshot))
+        for future, on_success, on_error in finished:
+            self._finish_task(future, on_success, on_error)
+        self.root.after(EVENT_POLL_MS, self._poll_events)
+
+    def _finish_task(self, future, on_success, on_error):
+        self.current_tracker = None
+        self._set_busy(False)
+        try:
+            result = future.result()
+        except OperationCancelled:
+            self.status_var.set("Cancelled. Ready.")
+            return
+        except Exception as e:
+            if on_error is None or not on_error(e):
+                messagebox.showerror("Error", f"An error occurred: {e}")
+                self.status_var.set(f"Error: {e}. Ready.")
+            return
+        on_success(result)
+
+    def _cancel_current_task(self):
+        """Cancels the running task. Requests in flight finish, no further request is started."""
+        if self.current_tracker is not None:
+            self.current_tracker.cancel()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_var.set("Cancelling...")
+
+    def _on_close(self):
+        if self.current_tracker is not None:
+            self.current_tracker.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
     def _trigger_processing_and_export(self):
         """
         Main function triggered by the 'Process & Export' button.
-        It gathers inputs from the UI and calls the backend processing functions.
+        It gathers inputs from the UI and runs the fetch in the background; saving follows in _on_tracks_fetched.
         """
-        if not self.is_authenticated or not sp_global:
+        if not self.is_authenticated or not client.sp_global:
             messagebox.showerror("Not Authenticated", "Please authenticate with Spotify first using the Login button.")
             self._update_ui_auth_state()
             return
@@ -371,20 +368,31 @@ class SpotifyExporterApp:
             return
         playlist_query = self.playlist_entry.get().strip()
         update_file_path = self.update_path_var.get() if self.update_path_var.get() else None
-
-        self.status_var.set("Processing: Getting playlist ID...")
-        self.root.update_idletasks()
-        playlist_id = get_playlist_id_from_query(playlist_query) 
-
-        if playlist_id is None and playlist_query != "": 
+        refresh_cache = self.refresh_cache_var.get()
+        sp = client.sp_global
+
+        def fetch(tracker):
+            tracker.set_phase("Processing: Getting playlist ID...")
+            playlist_id = get_playlist_id_from_query(playlist_query, sp)
+            if playlist_id is None:
+                return {'playlist_id': None}
+            tracker.set_phase(f"Processing: Fetching tracks for '{playlist_query if playlist_query else 'Liked Songs'}'...")
+            current_df = get_tracks_to_df(playlist_id, selected_attributes, sp=sp, refresh_cache=refresh_cache)
+            tracker.set_phase("Processing: Preparing export...")
+            prepared = None
+            if current_df is not None and not (current_df.empty and not update_file_path):
+                prepared = build_sheets_for_export(current_df, update_file_path)
+            return {'playlist_id': playlist_id, 'df': current_df, 'prepared': prepared}
+
+        self._run_in_background(fetch, lambda result: self._on_tracks_fetched(result, playlist_query))
+
+    def _on_tracks_fetched(self, result: dict, playlist_query: str):
+        playlist_id = result['playlist_id']
+        if playlist_id is None:
             messagebox.showerror("Playlist Not Found", f"Could not find playlist: '{playlist_query}'.\nPlease check the name/link or leave blank for Liked Songs.")
             self.status_var.set("Playlist not found. Ready.")
             return
-        self.status_var.set(f"Processing: Fetching tracks for '{playlist_query if playlist_query else 'Liked Songs'}'...")
-        self.root.update_idletasks()
-
-        current_df = get_tracks_to_df(playlist_id, selected_attributes) 
-
+        current_df = result['df']
         if current_df is None:
             self.status_var.set("Error fetching tracks. Please check messages. Ready.")
             return
@@ -396,13 +404,44 @@ class SpotifyExporterApp:
             messagebox.showinfo("No Tracks", "No tracks found in your Liked Songs.")
             self.status_var.set("No tracks found in Liked Songs. Ready.")
 
-        self.status_var.set("Processing: Preparing Excel export...")
-        self.root.update_idletasks()
-        export_data_to_excel(current_df, update_excel_path=update_file_path) 
-        self.status_var.set("Export process finished. Ready for next operation.")
+        if result['prepared'] is None:
+            messagebox.showinfo("No Data", "No data to export.")
+            return
+        final_sheets, output_filename_suggestion, warning = result['prepared']
+        if warning is not None:
+            show = messagebox.showerror if warning[0] == "Update Error" else messagebox.showwarning
+            show(*warning)
+        save_path = filedialog.asksaveasfilename(
+            initialfile=output_filename_suggestion,
+            defaultextension=".xlsx",
+            filetypes=FILE_TYPES
+        )
+        if not save_path:
+            messagebox.showinfo("Cancelled", "Export operation cancelled.")
+            self.status_var.set("Export cancelled. Ready.")
+            return
+
+        def write(tracker):
+            tracker.set_phase(f"Processing: Writing {save_path.split('/')[-1]}...")
+            write_sheets(final_sheets, save_path)
+            save_snapshot(save_path, final_sheets['AllSongs'])
+            return save_path
+
+        def on_written(path):
+            messagebox.showinfo("Success", f"Data successfully exported to\n{path}")
+            self.status_var.set("Export process finished. Ready for next operation.")
+
+        def on_write_error(error):
+            if not isinstance(error, SpotifyExporterError):
+                return False
+            messagebox.showerror("Export Error", str(error))
+            self.status_var.set("Export failed. Ready.")
+            return True
+
+        self._run_in_background(write, on_written, on_write_error)
 
     def _trigger_create_playlist_from_excel(self):
-        if not self.is_authenticated or not sp_global:
+        if not self.is_authenticated or not client.sp_global:
             messagebox.showerror("Not Authenticated", "Please authenticate with Spotify first using the Login button.")
             self._update_ui_auth_state()
             return
@@ -415,59 +454,45 @@ class SpotifyExporterApp:
         excel_path = filedialog.askopenfilename(
             title="Select Excel file with track IDs",
             defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx"), ("Excel files (old)", "*.xls"), ("All files", "*.*")]
+            filetypes=FILE_TYPES[:1] + [("Excel files (old)", "*.xls")] + FILE_TYPES[1:]
         )
 
         if not excel_path:
             self.status_var.set("Playlist creation cancelled: No file selected.")
             return
+        sp = client.sp_global
 
-        self.status_var.set(f"Processing: Reading track IDs from {excel_path.split('/')[-1]}...")
-        self.root.update_idletasks()
+        def create(tracker):
+            tracker.set_phase(f"Creating playlist '{new_playlist_name}' from {excel_path.split('/')[-1]}...")
+            return create_playlist_from_file(excel_path, new_playlist_name, sp=sp)
 
-        try:
-            df = pd.read_excel(excel_path)
-            if 'id' not in df.columns:
-                messagebox.showerror("Error", "Excel file must contain an 'id' column with Spotify track IDs.")
-                self.status_var.set("Error: 'id' column missing in Excel. Ready.")
-                return
-
-            track_ids = df['id'].dropna().astype(str).tolist()
-            track_ids = [tid for tid in track_ids if tid]
-
-            if not track_ids:
-                messagebox.showinfo("No Track IDs", "No track IDs found in the 'id' column of the selected Excel file.")
-                self.status_var.set("No track IDs found. Ready.")
-                return
-
-            self.status_var.set(f"Creating playlist '{new_playlist_name}' and adding {len(track_ids)} tracks...")
-            self.root.update_idletasks()
-
-            user_id = sp_global.me()['id']
-            new_playlist = sp_global.user_playlist_create(user=user_id, name=new_playlist_name, public=False)
-            new_playlist_id = new_playlist['id']
-
-            for i in range(0, len(track_ids), 100):
-                batch = track_ids[i:i + 100]
-                sp_global.playlist_add_items(new_playlist_id, batch)
-            
-            playlist_url = new_playlist['external_urls'].get('spotify', 'N/A')
-            messagebox.showinfo("Success", f"Playlist '{new_playlist_name}' created successfully with {len(track_ids)} tracks.\nURL: {playlist_url}")
+        def on_created(new_playlist):
+            skipped = len(new_playlist.invalid) + new_playlist.duplicate_count
+            skipped_note = f"\n{skipped} invalid or duplicate IDs were skipped." if skipped else ""
+            resumed_note = " (resumed)" if new_playlist.resumed else ""
+            messagebox.showinfo("Success", f"Playlist '{new_playlist_name}' created successfully{resumed_note} with {new_playlist.track_count} tracks.{skipped_note}\nURL: {new_playlist.url}")
             self.status_var.set(f"Playlist '{new_playlist_name}' created. Ready.")
             self.new_playlist_name_entry.delete(0, tk.END)
 
-        except FileNotFoundError:
-            messagebox.showerror("File Not Found", f"The file {excel_path} was not found.")
-            self.status_var.set("Error: File not found. Ready.")
-        except pd.errors.EmptyDataError:
-            messagebox.showerror("Empty File", "The selected Excel file is empty or has no sheets to read.")
-            self.status_var.set("Error: Empty Excel file. Ready.")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred during playlist creation: {e}")
-            self.status_var.set(f"Error creating playlist: {e}. Ready.")
+        def on_error(e):
+            if isinstance(e, FileNotFoundError):
+                messagebox.showerror("File Not Found", f"The file {excel_path} was not found.")
+                self.status_var.set("Error: File not found. Ready.")
+            elif isinstance(e, InputFileError):
+                messagebox.showerror("Error", str(e))
+                self.status_var.set(f"Error: {e} Ready.")
+            elif isinstance(e, UploadError):
+                messagebox.showerror("Upload Interrupted", str(e))
+                self.status_var.set("Playlist creation interrupted. Ready.")
+            else:
+                messagebox.showerror("Error", f"An error occurred during playlist creation: {e}")
+                self.status_var.set(f"Error creating playlist: {e}. Ready.")
+            return True
+
+        self._run_in_background(create, on_created, on_error)
 
 if __name__ == "__main__":
-    if not CLIENT_ID or not REDIRECT_URI:
+    if not config_is_valid():
         try:
             root_error = tk.Tk()
             root_error.withdraw() 
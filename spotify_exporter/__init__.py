@@ -0,0 +1,68 @@
+"""
+Headless Spotify playlist exporter.
+
+Submodules are imported on first attribute access, so `import spotify_exporter`
+does not load pandas, spotipy or tkinter until they are actually needed.
+"""
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    'export_playlist': 'api',
+    'export_liked_songs': 'api',
+    'export_playlist_stream': 'api',
+    'update_workbook': 'api',
+    'create_playlist_from_file': 'api',
+    'resolve_playlist': 'api',
+    'ExportResult': 'api',
+    'analyze_library': 'api',
+    'LibraryReport': 'api',
+    'get_track_index': 'track_index',
+    'update_track_index': 'track_index',
+    'upload_tracks': 'upload',
+    'clean_track_ids': 'upload',
+    'UploadResult': 'upload',
+    'export_batch': 'batch',
+    'BatchResult': 'batch',
+    'initialize_spotify_auth': 'client',
+    'get_client': 'client',
+    'get_playlist_id_from_query': 'tracks',
+    'get_tracks_to_df': 'tracks',
+    'build_export_sheets': 'export',
+    'write_workbook': 'export',
+    'write_sheets': 'formats',
+    'read_table': 'formats',
+    'diff_tracks': 'diff',
+    'compact_tracks': 'table',
+    'RowBuilder': 'attributes',
+    'ProgressTracker': 'progress',
+    'tracking': 'progress',
+    'Trace': 'trace',
+    'tracing': 'trace',
+    'DEFAULT_ATTRIBUTES': 'config',
+    'OPTIONAL_ATTRIBUTES': 'config',
+    'SpotifyExporterError': 'errors',
+    'ConfigurationError': 'errors',
+    'AuthenticationError': 'errors',
+    'PlaylistNotFoundError': 'errors',
+    'SpotifyAPIError': 'errors',
+    'UpdateError': 'errors',
+    'InputFileError': 'errors',
+    'ExportError': 'errors',
+    'UploadError': 'errors',
+    'OperationCancelled': 'errors',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,173 @@
+"""
+Headless entry points. Each function does one complete operation and reports problems by
+raising SpotifyExporterError subclasses instead of showing dialogs (errors of the Spotify API included).
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from .client import get_client, spotify_errors
+from .config import DEFAULT_ATTRIBUTES, FETCH_CONCURRENCY
+from .diff import save_snapshot
+from .errors import InputFileError, PlaylistNotFoundError, UploadError
+from .export import build_export_sheets, suggest_output_filename
+from .formats import read_table, write_sheets
+from .playlist_index import get_playlist_index
+from .stream import write_row_batches
+from .track_index import IndexUpdate, get_track_index, update_track_index
+from .tracks import get_playlist_id_from_query, get_tracks_to_df, iter_track_row_batches
+from .upload import UploadResult, clean_track_ids, upload_tracks
+
+if TYPE_CHECKING:
+    from spotipy import Spotify
+
+
+@dataclass
+class ExportResult:
+    """Outcome of an export. output_path is None when there was nothing to write."""
+    playlist_id: str
+    output_path: str | None
+    track_count: int
+    sheet_row_counts: dict[str, int] = field(default_factory=dict)
+
+
+@spotify_errors
+def resolve_playlist(playlist_query: str, sp: Spotify | None = None) -> str:
+    """Returns the playlist id for a name or link ('' for liked songs). Raises PlaylistNotFoundError."""
+    sp = sp or get_client()
+    playlist_id = get_playlist_id_from_query(playlist_query, sp)
+    if playlist_id is None:
+        suggestions = [playlist['name'] for playlist in get_playlist_index(sp).search(playlist_query)]
+        hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+        raise PlaylistNotFoundError(f"Could not find playlist: '{playlist_query}'.{hint}")
+    return playlist_id
+
+
+@dataclass
+class LibraryReport:
+    """Outcome of analyze_library. output_path is None when no file was asked for (or there was nothing to write)."""
+    update: IndexUpdate
+    output_path: str | None
+    sheet_row_counts: dict[str, int] = field(default_factory=dict)
+
+
+@spotify_errors
+def export_playlist(playlist_query: str, output_path: str | None = None, attributes: list[str] | None = None,
+                    update_path: str | None = None, max_workers: int = FETCH_CONCURRENCY, use_cache: bool = True,
+                    refresh_cache: bool = False, sp: Spotify | None = None) -> ExportResult:
+    """
+    Exports a playlist (by name or link, blank for Liked Songs). The format follows output_path's
+    extension: .xlsx, .parquet, .feather/.arrow, .csv or .ndjson.
+    With update_path the old export is merged in as in the GUI's update flow.
+    output_path defaults to the name the GUI would suggest, in the working directory.
+    """
+    sp = sp or get_client()
+    playlist_id = resolve_playlist(playlist_query, sp)
+    main_df = get_tracks_to_df(playlist_id, attributes or DEFAULT_ATTRIBUTES, max_workers=max_workers, sp=sp,
+                               use_cache=use_cache, refresh_cache=refresh_cache)
+    if main_df.empty and not update_path:
+        return ExportResult(playlist_id, None, 0)
+
+    final_sheets = build_export_sheets(main_df, update_path)
+    output_path = output_path or suggest_output_filename(update_path)
+    write_sheets(final_sheets, output_path)
+    save_snapshot(output_path, final_sheets['AllSongs'])
+    return ExportResult(playlist_id, output_path, len(main_df),
+                        {sheet_name: len(df) for sheet_name, df in final_sheets.items() if not df.empty})
+
+
+@spotify_errors
+def export_playlist_stream(playlist_query: str, output_path: str | None = None, attributes: list[str] | None = None,
+                           max_workers: int = FETCH_CONCURRENCY, sp: Spotify | None = None) -> ExportResult:
+    """
+    Streaming variant of export_playlist: every API page is written to output_path (.xlsx, .csv or .ndjson)
+    as soon as it arrives, so memory stays flat regardless of playlist size.
+    Updating an existing workbook and the track cache are not available in this mode.
+    """
+    sp = sp or get_client()
+    playlist_id = resolve_playlist(playlist_query, sp)
+    output_columns, row_batches = iter_track_row_batches(playlist_id, attributes or DEFAULT_ATTRIBUTES, max_workers, sp)
+    output_path = output_path or suggest_output_filename()
+    row_count = write_row_batches(output_path, output_columns, row_batches)
+    return ExportResult(playlist_id, output_path, row_count, {'AllSongs': row_count})
+
+
+@spotify_errors
+def export_liked_songs(output_path: str | None = None, attributes: list[str] | None = None,
+                       update_path: str | None = None, **kwargs) -> ExportResult:
+    """Exports the user's Liked Songs. Takes the same keyword arguments as export_playlist."""
+    return export_playlist('', output_path, attributes, update_path, **kwargs)
+
+
+@spotify_errors
+def update_workbook(playlist_query: str, workbook_path: str, output_path: str | None = None, **kwargs) -> ExportResult:
+    """Refreshes an existing export with the playlist's current tracks, writing '<name>_updated.<ext>' by default."""
+    return export_playlist(playlist_query, output_path, update_path=workbook_path, **kwargs)
+
+
+@spotify_errors
+def analyze_library(output_path: str | None = None, include_liked: bool = True, refresh: bool = False,
+                    min_playlists: int = 2, sp: Spotify | None = None) -> LibraryReport:
+    """
+    Updates the cross-playlist track index and writes its analysis sheets to output_path (any export format):
+    tracks in at least min_playlists playlists, tracks repeated within a playlist, liked songs that are in
+    no playlist (needs include_liked) and the number of tracks each pair of playlists shares.
+    """
+    sp = sp or get_client()
+    update = update_track_index(include_liked, refresh, sp=sp)
+    sheets = get_track_index().to_sheets(min_playlists)
+    sheet_row_counts = {sheet_name: len(df) for sheet_name, df in sheets.items()}
+    if not output_path or not any(sheet_row_counts.values()):
+        return LibraryReport(update, None, sheet_row_counts)
+    write_sheets(sheets, output_path)
+    return LibraryReport(update, output_path, sheet_row_counts)
+
+
+def read_track_ids(path: str) -> list[str]:
+    """Reads the 'id' column of an export in any supported format. Raises InputFileError if there are no usable ids."""
+    import pandas as pd
+
+    try:
+        df = read_table(path, None)
+    except pd.errors.EmptyDataError as e:
+        raise InputFileError("The selected file is empty or has no sheets to read.") from e
+    if 'id' not in df.columns:
+        raise InputFileError("The file must contain an 'id' column with Spotify track IDs.")
+
+    track_ids = df['id'].dropna().astype(str).tolist()
+    track_ids = [tid for tid in track_ids if tid]
+    if not track_ids:
+        raise InputFileError("No track IDs found in the 'id' column of the selected file.")
+    return track_ids
+
+
+@spotify_errors
+def create_playlist_from_file(path: str, playlist_name: str | None = None, sp: Spotify | None = None, mode: str = 'create',
+                              target_playlist: str | None = None) -> UploadResult:
+    """
+    Writes the tracks listed in the file's 'id' column (bare ids, spotify:track: URIs or track links) to a playlist.
+    mode 'create' makes a new private playlist called playlist_name, 'append' and 'sync' update target_playlist
+    (a name or link) with only the tracks that differ. Duplicate and invalid ids are skipped and reported.
+    An interrupted upload is resumed by calling this again with the same arguments.
+    Raises InputFileError if the file holds no valid track ids and UploadError if the upload fails part way.
+    """
+    sp = sp or get_client()
+    cleaned = clean_track_ids(read_track_ids(path))
+    if not cleaned.track_ids:
+        raise InputFileError("No valid Spotify track IDs found in the 'id' column of the selected file.")
+
+    playlist_id = None
+    if mode != 'create':
+        playlist_id = resolve_playlist(target_playlist or '', sp)
+        if not playlist_id:
+            raise UploadError(f"'{mode}' needs an existing playlist to write to, Liked Songs cannot be used.")
+    elif not playlist_name:
+        raise UploadError("A name is needed to create a playlist.")
+
+    checkpoint_key = f"{os.path.abspath(path)}|{mode}|{playlist_id or playlist_name}"
+    result = upload_tracks(cleaned.track_ids, mode, playlist_name, playlist_id, checkpoint_key, sp)
+    result.invalid = cleaned.invalid
+    result.duplicate_count = cleaned.duplicate_count
+    return result
@@ -0,0 +1,207 @@
+"""
+Track attributes that can be exported, and their compiled form.
+
+An attribute is a dotted path into a track object ('album.name'), into the playlist /
+saved item around it ('added_at'), or into the track's primary artist / album as returned by
+the artists and albums endpoints ('artist.genres', see enrich.py). A selection is compiled once
+into a RowBuilder holding one specialized getter per column, and into the fields= filter of the
+playlist items endpoint, so attributes that are not selected are never fetched.
+"""
+from __future__ import annotations
+
+# attributes with a path that differs from their name; other names are used as the track path itself
+TRACK_ATTRIBUTE_PATHS = {
+    'isrc': ('external_ids', 'isrc'),
+}
+ITEM_ATTRIBUTE_PATHS = {
+    'added_at': ('added_at',),
+}
+# attribute -> (endpoint, track attribute holding the id looked up there, path in the fetched object)
+ENRICHMENT_ATTRIBUTES = {
+    'artist.genres': ('artists', 'artists.id', ('genres',)),
+    'artist.popularity': ('artists', 'artists.id', ('popularity',)),
+    'album.label': ('albums', 'album.id', ('label',)),
+}
+# every supported track level attribute; tracks fetched by id are cached with all of them
+KNOWN_TRACK_ATTRIBUTES = ('id', 'name', 'artists.name', 'artists.id', 'album.name', 'album.album_type', 'album.release_date',
+                          'album.id', 'album.total_tracks', 'duration_ms', 'popularity', 'isrc')
+# track attributes that change from day to day; selecting one lists the tracks again instead of using the track cache
+VOLATILE_TRACK_ATTRIBUTES = ('popularity',)
+ARTISTS_ATTRIBUTE = 'artists.name'
+ARTISTS_COLUMNS = ('primary-artist', 'featured-artists')
+
+
+def is_item_attribute(attribute: str) -> bool:
+    return attribute in ITEM_ATTRIBUTE_PATHS
+
+
+def is_enrichment_attribute(attribute: str) -> bool:
+    return attribute in ENRICHMENT_ATTRIBUTES
+
+
+def attribute_path(attribute: str) -> tuple[str, ...]:
+    if attribute in ITEM_ATTRIBUTE_PATHS:
+        return ITEM_ATTRIBUTE_PATHS[attribute]
+    return TRACK_ATTRIBUTE_PATHS.get(attribute) or tuple(attribute.split('.'))
+
+
+def track_attributes(attributes: list[str]) -> list[str]:
+    """
+    The attributes that live on the track object itself, always including 'id'.
+    Enrichment attributes are replaced by the track attribute holding their lookup id.
+    """
+    selected = ['id']
+    for attribute in attributes:
+        if is_enrichment_attribute(attribute):
+            selected.append(ENRICHMENT_ATTRIBUTES[attribute][1])
+        elif not is_item_attribute(attribute):
+            selected.append(attribute)
+    return list(dict.fromkeys(selected))
+
+
+def attribute_columns(attribute: str) -> list[str]:
+    if attribute == ARTISTS_ATTRIBUTE:
+        return list(ARTISTS_COLUMNS)
+    if attribute in TRACK_ATTRIBUTE_PATHS:
+        return [attribute]
+    return [attribute.replace('.', '-')]
+
+
+def _field_tree(paths: list[tuple[str, ...]]) -> dict:
+    tree = {}
+    for path in paths:
+        node = tree
+        for part in path:
+            node = node.setdefault(part, {})
+    return tree
+
+
+def _render_fields(tree: dict) -> str:
+    return ",".join(key if not subtree else f"{key}({_render_fields(subtree)})" for key, subtree in tree.items())
+
+
+def build_fields_query(attributes: list[str], ids_only: bool = False) -> str:
+    """
+    fields= filter of the playlist items endpoint for the selected attributes, e.g.
+    'items(track(id,name,album(name))),next,total'. ids_only keeps just the track ids
+    (plus the item level attributes, which are not cached with the track).
+    """
+    track_paths = [('id',)] if ids_only else [attribute_path(attribute) for attribute in track_attributes(attributes)]
+    item_tree = {'track': _field_tree(track_paths)}
+    item_tree.update(_field_tree([attribute_path(attribute) for attribute in attributes if is_item_attribute(attribute)]))
+    return f"items({_render_fields(item_tree)}),next,total"
+
+
+def _trim(value, tree: dict):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_trim(element, tree) for element in value]
+    if isinstance(value, dict):
+        return {key: _trim(value.get(key), subtree) for key, subtree in tree.items()}
+    return value
+
+
+def trim_track(track: dict, attributes: list[str]) -> dict:
+    """Reduces a full track object to the fields of the given track level attributes, as the fields= filter would."""
+    return _trim(track, _field_tree([attribute_path(attribute) for attribute in track_attributes(attributes)]))
+
+
+def trim_item(item: dict, attributes: list[str]) -> dict:
+    """The item level attributes of a playlist / saved item, without its track."""
+    return _trim(item, _field_tree([attribute_path(attribute) for attribute in attributes if is_item_attribute(attribute)]))
+
+
+def trim_entity(entity: dict, kind: str) -> dict:
+    """Reduces an artist / album object to the fields of every enrichment attribute looked up on that kind of object."""
+    paths = [('id',)] + [path for endpoint, _, path in ENRICHMENT_ATTRIBUTES.values() if endpoint == kind]
+    return _trim(entity, _field_tree(paths))
+
+
+def _compile_getter(path: tuple[str, ...]):
+    """Getter for a fixed path, unrolled for the usual one and two level paths."""
+    if len(path) == 1:
+        key = path[0]
+        return lambda data: data.get(key)
+    if len(path) == 2:
+        outer, inner = path
+
+        def get_nested(data):
+            value = data.get(outer)
+            return value.get(inner) if isinstance(value, dict) else None
+        return get_nested
+
+    def get_deep(data):
+        for part in path:
+            if not isinstance(data, dict):
+                return None
+            data = data.get(part)
+        return data
+    return get_deep
+
+
+def _primary_artist(track: dict, item: dict | None):
+    artists = track.get('artists')
+    return artists[0].get('name') if artists else None
+
+
+def _featured_artists(track: dict, item: dict | None):
+    artists = track.get('artists')
+    if artists and len(artists) > 1:
+        return ", ".join([artist.get('name') for artist in artists[1:]])
+    return None
+
+
+def _primary_artist_id(track: dict, item: dict | None):
+    artists = track.get('artists')
+    return artists[0].get('id') if artists else None
+
+
+def _column_getters(attribute: str) -> list:
+    if attribute == ARTISTS_ATTRIBUTE:
+        return [_primary_artist, _featured_artists]
+    if is_enrichment_attribute(attribute):
+        # the column holds the lookup id until enrich.py maps it to the looked up value
+        if ENRICHMENT_ATTRIBUTES[attribute][1] == 'artists.id':
+            return [_primary_artist_id]
+        get_id = _compile_getter(attribute_path(ENRICHMENT_ATTRIBUTES[attribute][1]))
+        return [lambda track, item: get_id(track)]
+    get = _compile_getter(attribute_path(attribute))
+    if is_item_attribute(attribute):
+        return [lambda track, item: get(item) if item else None]
+    return [lambda track, item: get(track)]
+
+
+class RowBuilder:
+    """
+    Compiled row builder of an attribute selection.
+    row(track, item) turns a track object (and optionally its playlist / saved item, for
+    attributes such as 'added_at') into a row list matching columns. Columns of enrichment
+    attributes (enrichment_columns) hold lookup ids until they are enriched.
+    """
+    def __init__(self, attributes: list[str]):
+        self.attributes = list(attributes)
+        self.columns = []
+        self.item_indices = []
+        self.enrichment_columns = {}
+        self._getters = []
+        for attribute in self.attributes:
+            if is_item_attribute(attribute):
+                self.item_indices.append(len(self.columns))
+            if is_enrichment_attribute(attribute):
+                self.enrichment_columns[attribute_columns(attribute)[0]] = attribute
+            self.columns.extend(attribute_columns(attribute))
+            self._getters.extend(_column_getters(attribute))
+        self.fields = build_fields_query(self.attributes)
+
+    def row(self, track: dict, item: dict | None = None) -> list:
+        return [get(track, item) for get in self._getters]
+
+    def with_item(self, row: list, item: dict | None) -> list:
+        """Copy of a row built without its item, with the item level columns filled in."""
+        if not self.item_indices:
+            return row
+        row = list(row)
+        for index in self.item_indices:
+            row[index] = self._getters[index](None, item)
+        return row
@@ -0,0 +1,84 @@
+"""
+Access token handling shared by every request of a run.
+
+spotipy's PKCE manager re-reads the token cache file on every request and, once the token has
+expired, lets each worker thread refresh it on its own. Spotify rotates refresh tokens, so all but
+the first of those concurrent refreshes fail and a long export dies halfway. SharedTokenManager
+keeps the token in memory and refreshes it once, under a lock, a few minutes before it expires.
+It never falls back to the browser login in the middle of a run.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from .config import SCOPE, TOKEN_REFRESH_MARGIN_SECONDS
+from .errors import AuthenticationError
+
+if TYPE_CHECKING:
+    from spotipy.oauth2 import SpotifyPKCE
+
+
+class SharedTokenManager:
+    """Auth manager for spotipy.Spotify wrapping a SpotifyPKCE manager (which does the login and owns the cache file)."""
+    def __init__(self, pkce: SpotifyPKCE, refresh_margin_seconds: float = TOKEN_REFRESH_MARGIN_SECONDS):
+        self.pkce = pkce
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._lock = threading.Lock()
+        self._token_info = None
+
+    def _needs_refresh(self, token_info: dict) -> bool:
+        return token_info.get('expires_at', 0) - time.time() < self.refresh_margin_seconds
+
+    def _cached_token(self) -> dict | None:
+        """Token of the cache file if it was granted every scope we need (another scope set needs a new login)."""
+        token_info = self.pkce.cache_handler.get_cached_token()
+        if not token_info or not set(SCOPE.split()) <= set(token_info.get('scope', '').split()):
+            return None
+        return token_info
+
+    def login(self, interactive: bool = True):
+        """
+        Loads the cached token, refreshing it if it is about to expire. Without a usable cached token the
+        PKCE login runs (browser, or pasting the redirect URL) if interactive, otherwise AuthenticationError is raised.
+        """
+        with self._lock:
+            token_info = self._cached_token()
+            if token_info is not None:
+                self._token_info = token_info if not self._needs_refresh(token_info) else self._refresh(token_info)
+                return
+            if not interactive:
+                raise AuthenticationError("No saved Spotify login found. Log in once without --headless (or from the app) first.")
+            try:
+                self.pkce.get_access_token(check_cache=False)
+            except Exception as e:
+                raise AuthenticationError(f"Could not log in to Spotify: {e}") from e
+            self._token_info = self._cached_token()
+            if self._token_info is None:
+                raise AuthenticationError("Could not get Spotify access token. Please try again.")
+
+    def _refresh(self, token_info: dict) -> dict:
+        # another process (the app, a second export) may have refreshed it already
+        cached = self._cached_token()
+        if cached is not None and not self._needs_refresh(cached):
+            return cached
+        refresh_token = (cached or token_info).get('refresh_token')
+        if not refresh_token:
+            raise AuthenticationError("The saved Spotify login cannot be refreshed. Please log in again.")
+        try:
+            return self.pkce.refresh_access_token(refresh_token)
+        except Exception as e:
+            raise AuthenticationError(f"Could not refresh the Spotify access token: {e}. Please log in again.") from e
+
+    def get_access_token(self, as_dict: bool = False):
+        """Current token, refreshed by the first thread that finds it about to expire while the others wait for it."""
+        token_info = self._token_info
+        if token_info is None or self._needs_refresh(token_info):
+            with self._lock:
+                token_info = self._token_info
+                if token_info is None:
+                    raise AuthenticationError("Spotify not authenticated. Please authenticate first.")
+                if self._needs_refresh(token_info):
+                    token_info = self._token_info = self._refresh(token_info)
+        return token_info if as_dict else token_info['access_token']
@@ -0,0 +1,221 @@
+"""
+Batch export of many playlists in one run.
+
+All playlists share one bounded request pool and one request budget. A track that
+appears in several playlists is fetched and turned into a row only once.
+"""
+from __future__ import annotations
+
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from . import client
+from .attributes import RowBuilder
+from .cache import get_track_cache
+from .client import RateLimiter, call_with_retries, get_client, spotify_errors
+from .config import BATCH_PLAYLIST_CONCURRENCY, BATCH_REQUESTS_PER_SECOND, DEFAULT_ATTRIBUTES, FETCH_CONCURRENCY
+from .diff import save_snapshot
+from .enrich import enrich_rows, enrichment_ids, fetch_enrichment
+from .formats import write_sheets
+from .playlist_index import find_playlist_id, get_playlist_index
+from .table import compact_tracks
+from .trace import span
+from .tracks import hydrate_tracks, id_helper_url, list_playlist_tracks
+
+if TYPE_CHECKING:
+    from spotipy import Spotify
+
+LIKED_SONGS_QUERIES = ('', 'liked', 'liked songs')
+
+
+@dataclass
+class PlaylistReport:
+    """Outcome of one playlist of a batch. error is set when the playlist could not be exported."""
+    query: str
+    label: str
+    playlist_id: str | None = None
+    track_count: int = 0
+    output_path: str | None = None
+    seconds: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class BatchResult:
+    reports: list[PlaylistReport]
+    combined_path: str | None = None
+    unique_track_count: int = 0
+    seconds: float = 0.0
+    phase_seconds: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def failed(self) -> list[PlaylistReport]:
+        return [report for report in self.reports if report.error]
+
+
+def _linked_playlist_name(playlist_id: str, sp: Spotify) -> str | None:
+    """
+    Name of a linked playlist: from the playlist index, else asked for (a link can point at a playlist
+    the user does not follow). None if Spotify does not know it either, the listing then reports why.
+    """
+    from spotipy import SpotifyException
+
+    name = get_playlist_index(sp).name_of(playlist_id)
+    if name is not None:
+        return name
+    try:
+        return call_with_retries(sp.playlist, playlist_id, fields='name').get('name')
+    except SpotifyException:
+        return None
+
+
+def resolve_playlists(queries: list[str], sp: Spotify) -> list[PlaylistReport]:
+    """Resolves names (through the playlist index), links and 'liked' to playlist ids. Links are labelled with the playlist's name."""
+    reports = []
+    for query in queries:
+        query = query.strip()
+        if query.lower() in LIKED_SONGS_QUERIES:
+            reports.append(PlaylistReport(query, 'Liked Songs', playlist_id=''))
+            continue
+        playlist_id = id_helper_url(query)
+        if playlist_id is not None:
+            reports.append(PlaylistReport(query, _linked_playlist_name(playlist_id, sp) or playlist_id, playlist_id=playlist_id))
+            continue
+
+        playlist_id = find_playlist_id(query, sp)
+        report = PlaylistReport(query, query, playlist_id=playlist_id)
+        if playlist_id is None:
+            report.error = f"Could not find playlist: '{query}'."
+        reports.append(report)
+    return reports
+
+
+def _safe_filename(label: str, used: set[str], extension: str) -> str:
+    name = re.sub(r'[\\/:*?"<>|]+', '_', label).strip() or 'playlist'
+    candidate, counter = name, 2
+    while candidate.lower() in used:
+        candidate = f"{name}_{counter}"
+        counter += 1
+    used.add(candidate.lower())
+    return candidate + extension
+
+
+@spotify_errors
+def export_batch(queries: list[str], output_dir: str = '.', combined_path: str | None = None, output_format: str = '.xlsx',
+                 attributes: list[str] | None = None, max_workers: int = FETCH_CONCURRENCY,
+                 requests_per_second: float | None = BATCH_REQUESTS_PER_SECOND, use_cache: bool = True,
+                 refresh_cache: bool = False, sp: Spotify | None = None) -> BatchResult:
+    """
+    Exports many playlists (names, links or 'liked') in one run.
+    Writes one file per playlist into output_dir (in output_format, e.g. '.xlsx' or '.parquet'), or,
+    with combined_path, a single file whose 'AllSongs' table has an extra 'playlist' column. Failures are reported per playlist
+    in the returned BatchResult instead of aborting the whole batch.
+    """
+    import pandas as pd
+
+    sp = sp or get_client()
+    attributes = attributes or DEFAULT_ATTRIBUTES
+    cache = get_track_cache() if use_cache else None
+    batch_start = time.perf_counter()
+    phase_seconds = {}
+
+    previous_limiter = client.rate_limiter_global
+    client.rate_limiter_global = RateLimiter(requests_per_second) if requests_per_second else None
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as request_pool:
+            phase_start = time.perf_counter()
+            reports = resolve_playlists(queries, sp)
+            phase_seconds['resolve'] = time.perf_counter() - phase_start
+
+            # list every distinct playlist once, tracks that came inline are kept for hydration
+            phase_start = time.perf_counter()
+            playlist_ids = list(dict.fromkeys(report.playlist_id for report in reports if not report.error))
+            listings, listing_errors, listing_seconds = {}, {}, {}
+            known_tracks = {}
+
+            def list_one(playlist_id):
+                start = time.perf_counter()
+                try:
+                    return list_playlist_tracks(playlist_id, max_workers, sp, cache, refresh_cache, request_pool, attributes)
+                except Exception as e:
+                    listing_errors[playlist_id] = str(e)
+                    return None
+                finally:
+                    listing_seconds[playlist_id] = time.perf_counter() - start
+
+            with ThreadPoolExecutor(max_workers=max(1, min(BATCH_PLAYLIST_CONCURRENCY, len(playlist_ids) or 1))) as playlist_pool:
+                for playlist_id, listing in zip(playlist_ids, playlist_pool.map(list_one, playlist_ids)):
+                    if listing is not None:
+                        listings[playlist_id] = listing
+                        known_tracks.update(listing.tracks)
+            phase_seconds['list'] = time.perf_counter() - phase_start
+
+            phase_start = time.perf_counter()
+            all_track_ids = list(dict.fromkeys(track_id for listing in listings.values() for track_id in listing.track_ids))
+            tracks_by_id = hydrate_tracks(all_track_ids, known_tracks, cache, max_workers, sp, request_pool, attributes)
+            phase_seconds['hydrate'] = time.perf_counter() - phase_start
+
+            # every unique track is normalized once and shared between playlists, only item level columns differ
+            phase_start = time.perf_counter()
+            row_builder = RowBuilder(attributes)
+            with span('build_rows', rows=len(tracks_by_id)):
+                rows_by_id = {track_id: row_builder.row(track) for track_id, track in tracks_by_id.items() if track}
+            phase_seconds['normalize'] = time.perf_counter() - phase_start
+
+            if row_builder.enrichment_columns:
+                # artists and albums shared by several playlists are looked up once for the whole batch
+                phase_start = time.perf_counter()
+                with span('fetch_enrichment', rows=len(rows_by_id)):
+                    unique_rows = list(rows_by_id.values())
+                    entities = fetch_enrichment(enrichment_ids(row_builder, unique_rows), cache, max_workers, sp, request_pool)
+                    enrich_rows(unique_rows, row_builder, entities)
+                phase_seconds['enrich'] = time.perf_counter() - phase_start
+    finally:
+        client.rate_limiter_global = previous_limiter
+
+    phase_start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    used_filenames = set()
+    combined_frames = []
+    for report in reports:
+        if report.error:
+            continue
+        if report.playlist_id in listing_errors:
+            report.error = listing_errors[report.playlist_id]
+            continue
+        report.seconds = listing_seconds.get(report.playlist_id, 0.0)
+        write_start = time.perf_counter()
+        listing = listings[report.playlist_id]
+        items = listing.items or [None] * len(listing.track_ids)
+        rows = [row_builder.with_item(rows_by_id[track_id], item)
+                for track_id, item in zip(listing.track_ids, items) if track_id in rows_by_id]
+        df = compact_tracks(pd.DataFrame(rows, columns=row_builder.columns))
+        report.track_count = len(df)
+        try:
+            if combined_path:
+                df.insert(0, 'playlist', report.label)
+                combined_frames.append(df)
+            elif not df.empty:
+                report.output_path = os.path.join(output_dir, _safe_filename(report.label, used_filenames, output_format))
+                write_sheets({'AllSongs': df}, report.output_path)
+                save_snapshot(report.output_path, df)
+        except Exception as e:
+            report.error = str(e)
+        report.seconds += time.perf_counter() - write_start
+
+    written_combined_path = None
+    if combined_path and combined_frames:
+        combined_df = compact_tracks(pd.concat(combined_frames, ignore_index=True))
+        if not combined_df.empty:
+            write_sheets({'AllSongs': combined_df}, combined_path)
+            written_combined_path = combined_path
+            for report in reports:
+                if not report.error:
+                    report.output_path = combined_path
+    phase_seconds['write'] = time.perf_counter() - phase_start
+
+    return BatchResult(reports, written_combined_path, len(rows_by_id), time.perf_counter() - batch_start, phase_seconds)
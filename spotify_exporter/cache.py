@@ -0,0 +1,187 @@
+import json
+import sqlite3
+import threading
+import time
+
+from .config import TRACK_CACHE_MAX_BYTES, get_track_cache_path
+
+track_cache_global = None
+
+SCHEMA_VERSION = 2
+
+
+class TrackCache:
+    """
+    SQLite backed cache of track metadata keyed by track id, of playlist track id lists
+    keyed by the playlist's snapshot_id, and of artists / albums fetched for enrichment.
+    Tracks and artists / albums can be read with a maximum age, since their metadata changes.
+    Least recently used tracks are evicted once the cache grows past max_bytes.
+    """
+    def __init__(self, path: str | None = None, max_bytes: int = TRACK_CACHE_MAX_BYTES):
+        self.path = path or get_track_cache_path()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                # older caches do not record which attributes their entries hold or when tracks were fetched; start over
+                self._conn.executescript("DROP TABLE IF EXISTS tracks; DROP TABLE IF EXISTS playlists;")
+            self._conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS tracks (
+                    track_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    attributes TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS playlists (
+                    playlist_id TEXT PRIMARY KEY,
+                    snapshot_id TEXT NOT NULL,
+                    track_ids TEXT NOT NULL,
+                    items TEXT,
+                    item_attributes TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS entities (
+                    kind TEXT NOT NULL,
+                    entity_id TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (kind, entity_id)
+                );
+                CREATE INDEX IF NOT EXISTS tracks_last_used ON tracks(last_used);
+                PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+
+    def get_playlist(self, playlist_id: str, snapshot_id: str | None = None,
+                     item_attributes: list[str] = ()) -> tuple[str, list[str], list[dict] | None] | None:
+        """
+        Returns (snapshot_id, track_ids, items) cached for the playlist, where items holds the item level
+        attributes (e.g. 'added_at') of each position. Returns None if missing, not matching snapshot_id,
+        or cached without some of item_attributes.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT snapshot_id, track_ids, items, item_attributes FROM playlists WHERE playlist_id = ?",
+                                     (playlist_id,)).fetchone()
+            if not row or (snapshot_id is not None and row[0] != snapshot_id):
+                return None
+            if not set(item_attributes) <= set(filter(None, row[3].split(','))):
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE playlists SET last_used = ? WHERE playlist_id = ?", (time.time(), playlist_id))
+        return row[0], json.loads(row[1]), json.loads(row[2]) if row[2] else None
+
+    def put_playlist(self, playlist_id: str, snapshot_id: str, track_ids: list[str], items: list[dict] | None = None,
+                     item_attributes: list[str] = ()):
+        data = json.dumps(track_ids)
+        items_data = json.dumps(items) if items is not None else None
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO playlists VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (playlist_id, snapshot_id, data, items_data, ",".join(sorted(item_attributes)),
+                                len(data) + len(items_data or ''), time.time()))
+        self.evict()
+
+    def get_tracks(self, track_ids: list[str], attributes: list[str] = (), max_age_seconds: float | None = None) -> dict[str, dict]:
+        """
+        Returns the cached track objects for the given ids that hold every one of attributes;
+        other ids, and tracks fetched more than max_age_seconds ago, are left out.
+        """
+        unique_ids = list(dict.fromkeys(track_ids))
+        required = set(attributes)
+        oldest = time.time() - max_age_seconds if max_age_seconds is not None else 0.0
+        found = {}
+        with self._lock:
+            for i in range(0, len(unique_ids), 500): # stay under SQLite's bound parameter limit
+                batch = unique_ids[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                query = f"SELECT track_id, data, attributes FROM tracks WHERE fetched_at >= ? AND track_id IN ({placeholders})"
+                for track_id, data, cached_attributes in self._conn.execute(query, [oldest] + batch):
+                    if required <= set(cached_attributes.split(',')):
+                        found[track_id] = json.loads(data)
+            with self._conn:
+                now = time.time()
+                self._conn.executemany("UPDATE tracks SET last_used = ? WHERE track_id = ?", [(now, tid) for tid in found])
+        return found
+
+    def put_tracks(self, tracks: list[dict], attributes: list[str]):
+        """Caches track objects that hold (at least) the given track level attributes."""
+        now = time.time()
+        cached_attributes = ",".join(sorted(attributes))
+        rows = []
+        for track in tracks:
+            if track and track.get('id'):
+                data = json.dumps(track)
+                rows.append((track['id'], data, cached_attributes, len(data), now, now))
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.evict()
+
+    def get_entities(self, kind: str, entity_ids: list[str], max_age_seconds: float | None = None) -> dict[str, dict]:
+        """Returns the cached objects of the given kind ('artists' / 'albums') and ids, leaving out those older than max_age_seconds."""
+        unique_ids = list(dict.fromkeys(entity_ids))
+        oldest = time.time() - max_age_seconds if max_age_seconds is not None else 0.0
+        found = {}
+        with self._lock:
+            for i in range(0, len(unique_ids), 500):
+                batch = unique_ids[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                query = f"SELECT entity_id, data FROM entities WHERE kind = ? AND fetched_at >= ? AND entity_id IN ({placeholders})"
+                for entity_id, data in self._conn.execute(query, [kind, oldest] + batch):
+                    found[entity_id] = json.loads(data)
+            with self._conn:
+                now = time.time()
+                self._conn.executemany("UPDATE entities SET last_used = ? WHERE kind = ? AND entity_id = ?",
+                                       [(now, kind, entity_id) for entity_id in found])
+        return found
+
+    def put_entities(self, kind: str, entities: list[dict]):
+        now = time.time()
+        rows = []
+        for entity in entities:
+            if entity and entity.get('id'):
+                data = json.dumps(entity)
+                rows.append((kind, entity['id'], data, len(data), now, now))
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.evict()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM " + table).fetchone()[0]
+                       for table in ('tracks', 'playlists', 'entities'))
+
+    def evict(self):
+        """Drops least recently used tracks (then playlists, artists and albums) until the cache is back under max_bytes."""
+        excess = self.total_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+        with self._lock, self._conn:
+            for table in ('tracks', 'playlists', 'entities'):
+                doomed = []
+                for rowid, size in self._conn.execute(f"SELECT rowid, size FROM {table} ORDER BY last_used"):
+                    if excess <= 0:
+                        break
+                    doomed.append((rowid,))
+                    excess -= size
+                self._conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", doomed)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tracks")
+            self._conn.execute("DELETE FROM playlists")
+            self._conn.execute("DELETE FROM entities")
+
+def get_track_cache() -> TrackCache | None:
+    """Returns the shared track cache, opening it on first use. Returns None if it cannot be opened."""
+    global track_cache_global
+    if track_cache_global is None:
+        try:
+            track_cache_global = TrackCache()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not open track cache at {get_track_cache_path()}: {e}")
+            return None
+    return track_cache_global
@@ -0,0 +1,226 @@
+"""
+Command line interface:
+
+    python -m spotify_exporter export "My Playlist" -o my_playlist.xlsx
+    python -m spotify_exporter liked -o liked.xlsx
+    python -m spotify_exporter liked --stream -o liked.csv
+    python -m spotify_exporter update "My Playlist" my_playlist.xlsx
+    python -m spotify_exporter create-playlist my_playlist.xlsx "My Copy"
+    python -m spotify_exporter batch liked "My Playlist" --file playlists.txt -d exports/
+    python -m spotify_exporter index -o library.xlsx
+"""
+import argparse
+import os
+import sys
+
+from .config import (BATCH_PLAYLIST_CONCURRENCY, BATCH_REQUESTS_PER_SECOND, DEFAULT_ATTRIBUTES, FETCH_CONCURRENCY,
+                     OPTIONAL_ATTRIBUTES)
+from .errors import SpotifyExporterError
+from .formats import SUPPORTED_EXTENSIONS
+
+OUTPUT_HELP = "output path, the extension picks the format: .xlsx, .parquet, .feather/.arrow, .csv or .ndjson"
+
+
+def _add_fetch_options(parser: argparse.ArgumentParser):
+    parser.add_argument('-a', '--attributes', nargs='+', default=DEFAULT_ATTRIBUTES, metavar='ATTR',
+                        help=f"track attributes to export (default: {' '.join(DEFAULT_ATTRIBUTES)}; "
+                             f"also available: {' '.join(OPTIONAL_ATTRIBUTES)})")
+    parser.add_argument('-w', '--workers', type=int, default=FETCH_CONCURRENCY,
+                        help=f"concurrent page requests (default: {FETCH_CONCURRENCY})")
+    parser.add_argument('--no-cache', action='store_true', help="bypass the local track cache")
+    parser.add_argument('--refresh-cache', action='store_true', help="ignore cached playlists and refetch everything")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='spotify_exporter', description="Export Spotify playlists and liked songs to Excel, Parquet, Feather, CSV or NDJSON.")
+    parser.add_argument('--no-browser', action='store_true',
+                        help="do not open a browser for login, paste the redirect URL into the terminal instead")
+    parser.add_argument('--headless', action='store_true',
+                        help="only use the saved login, fail instead of asking to log in (the default when not run from a terminal)")
+    parser.add_argument('--trace', metavar='PATH', help="write a JSON trace of every request and processing step to PATH")
+    parser.add_argument('--profile', metavar='PATH', help="write cProfile stats of the run to PATH (view with python -m pstats)")
+    parser.add_argument('--summary', action='store_true', help="print where the time went (network, row building, writing)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="export a playlist by name or link")
+    export_parser.add_argument('playlist', help="playlist name or open.spotify.com link")
+    export_parser.add_argument('-o', '--output', help=OUTPUT_HELP)
+    export_parser.add_argument('-u', '--update', metavar='WORKBOOK', help="existing export to update")
+    export_parser.add_argument('--stream', action='store_true',
+                              help="write pages as they arrive (.xlsx, .csv or .ndjson), memory stays flat")
+    _add_fetch_options(export_parser)
+
+    liked_parser = subparsers.add_parser('liked', help="export your Liked Songs")
+    liked_parser.add_argument('-o', '--output', help=OUTPUT_HELP)
+    liked_parser.add_argument('-u', '--update', metavar='WORKBOOK', help="existing export to update")
+    liked_parser.add_argument('--stream', action='store_true',
+                              help="write pages as they arrive (.xlsx, .csv or .ndjson), memory stays flat")
+    _add_fetch_options(liked_parser)
+
+    update_parser = subparsers.add_parser('update', help="update an existing export with the playlist's current tracks")
+    update_parser.add_argument('playlist', help="playlist name or link, '' for Liked Songs")
+    update_parser.add_argument('workbook', help="existing export (.xlsx, .parquet, .feather, .csv or .ndjson)")
+    update_parser.add_argument('-o', '--output', help="output path (default: <workbook>_updated.<ext>)")
+    _add_fetch_options(update_parser)
+
+    create_parser = subparsers.add_parser('create-playlist', help="create (or append to / sync) a playlist from the 'id' column of a file")
+    create_parser.add_argument('file', help="export with an 'id' column (.xlsx, .parquet, .feather, .csv or .ndjson)")
+    create_parser.add_argument('name', nargs='?', help="name of the new playlist")
+    target_group = create_parser.add_mutually_exclusive_group()
+    target_group.add_argument('--append', metavar='PLAYLIST', help="add the tracks an existing playlist does not have yet instead")
+    target_group.add_argument('--sync', metavar='PLAYLIST', help="make an existing playlist hold exactly the file's tracks instead")
+
+    batch_parser = subparsers.add_parser('batch', help="export many playlists in one run")
+    batch_parser.add_argument('playlists', nargs='*', help="playlist names, links or 'liked'")
+    batch_parser.add_argument('-f', '--file', help="text file with one playlist name/link per line")
+    batch_parser.add_argument('-d', '--output-dir', default='.', help="directory for one file per playlist")
+    batch_parser.add_argument('--format', default='.xlsx', choices=SUPPORTED_EXTENSIONS, help="format of the per-playlist files (default: .xlsx)")
+    batch_parser.add_argument('-c', '--combined', metavar='PATH', help="write one combined workbook with a 'playlist' column instead")
+    batch_parser.add_argument('--rps', type=float, default=BATCH_REQUESTS_PER_SECOND,
+                              help=f"shared request budget per second, 0 for unlimited (default: {BATCH_REQUESTS_PER_SECOND})")
+    _add_fetch_options(batch_parser)
+
+    index_parser = subparsers.add_parser('index', help="index every playlist to find tracks in several playlists, "
+                                                       "duplicates and liked songs in no playlist")
+    index_parser.add_argument('-o', '--output', help="write the analysis sheets to this file (.xlsx, .parquet, .feather/.arrow, .csv or .ndjson)")
+    index_parser.add_argument('--track', metavar='ID', help="only list the playlists holding this track (no update)")
+    index_parser.add_argument('--no-liked', action='store_true', help="leave Liked Songs out of the index")
+    index_parser.add_argument('--refresh', action='store_true', help="relist every playlist, changed or not")
+    index_parser.add_argument('--min-playlists', type=int, default=2,
+                              help="tracks in at least this many playlists count as overlapping (default: 2)")
+    return parser
+
+
+def _print_export_result(result):
+    if result.output_path is None:
+        print("No data to export.")
+        return
+    print(f"Exported {result.track_count} tracks to {result.output_path}")
+    for sheet_name, row_count in result.sheet_row_counts.items():
+        print(f"  {sheet_name}: {row_count} rows")
+
+
+def _print_upload_result(result):
+    action = {'create': 'created', 'append': 'appended to', 'sync': 'synced'}[result.mode]
+    resumed = " (resumed)" if result.resumed else ""
+    print(f"Playlist '{result.name}' {action}{resumed}: {result.added} tracks added, {result.removed} removed.\nURL: {result.url}")
+    if result.duplicate_count:
+        print(f"  {result.duplicate_count} duplicate ids skipped")
+    if result.invalid:
+        print(f"  {len(result.invalid)} invalid ids skipped, e.g. {', '.join(result.invalid[:3])}")
+
+
+def _print_batch_result(result):
+    for report in result.reports:
+        status = f"ERROR: {report.error}" if report.error else f"{report.track_count} tracks -> {report.output_path}"
+        print(f"{report.label[:40]:<40} {report.seconds:8.2f}s  {status}")
+    phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in result.phase_seconds.items())
+    print(f"{len(result.reports) - len(result.failed)}/{len(result.reports)} playlists exported, "
+          f"{result.unique_track_count} unique tracks in {result.seconds:.2f}s ({phases})")
+
+
+def _print_library_report(result):
+    update = result.update
+    print(f"Indexed {len(update.listed)} playlists ({update.unchanged} unchanged, {update.removed} removed) in {update.seconds:.2f}s")
+    for playlist_id, (name, error) in update.errors.items():
+        print(f"  ERROR {name} ({playlist_id}): {error}")
+    for sheet_name, row_count in result.sheet_row_counts.items():
+        print(f"  {sheet_name}: {row_count} rows")
+    if result.output_path:
+        print(f"Written to {result.output_path}")
+
+
+def _read_batch_queries(args) -> list[str]:
+    queries = list(args.playlists)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            queries.extend(line.strip() for line in f if line.strip())
+    return queries
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not (args.trace or args.profile or args.summary):
+        return _run_command(args)
+
+    from .trace import Trace, format_summary, profiling, tracing
+    trace = Trace() if args.trace or args.summary else None
+    with tracing(trace), profiling(args.profile):
+        exit_code = _run_command(args)
+    if args.trace:
+        trace.save(args.trace)
+    if args.summary:
+        print(format_summary(trace.summary()), file=sys.stderr)
+    return exit_code
+
+
+def _has_display() -> bool:
+    """False on Linux servers without a desktop session, where opening a browser cannot work."""
+    if sys.platform.startswith('linux'):
+        return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+    return True
+
+
+def _is_terminal() -> bool:
+    return sys.stdin is not None and sys.stdin.isatty()
+
+
+def _run_command(args) -> int:
+    from . import api
+    from .client import get_client
+
+    try:
+        if args.command == 'index' and args.track:
+            # only reads the local index, so it needs no login and works offline
+            from .track_index import get_track_index
+            from .upload import parse_track_id
+            placements = get_track_index().playlists_of(parse_track_id(args.track) or args.track)
+            print(placements.to_string(index=False) if not placements.empty else "The track is in no indexed playlist.")
+            return 0
+
+        sp = get_client(open_browser=not args.no_browser and _has_display(), interactive=not args.headless and _is_terminal(),
+                        pool_size=getattr(args, 'workers', FETCH_CONCURRENCY) + BATCH_PLAYLIST_CONCURRENCY)
+        if args.command == 'create-playlist':
+            mode = 'append' if args.append else 'sync' if args.sync else 'create'
+            if mode == 'create' and not args.name:
+                print("Error: a playlist name is needed (or use --append / --sync).", file=sys.stderr)
+                return 1
+            result = api.create_playlist_from_file(args.file, args.name, sp=sp, mode=mode, target_playlist=args.append or args.sync)
+            _print_upload_result(result)
+            return 0
+
+        if args.command == 'index':
+            result = api.analyze_library(args.output, include_liked=not args.no_liked, refresh=args.refresh,
+                                         min_playlists=args.min_playlists, sp=sp)
+            _print_library_report(result)
+            return 1 if result.update.errors else 0
+
+        fetch_options = dict(attributes=args.attributes, max_workers=args.workers, use_cache=not args.no_cache,
+                             refresh_cache=args.refresh_cache, sp=sp)
+        if args.command == 'batch':
+            from .batch import export_batch
+            queries = _read_batch_queries(args)
+            if not queries:
+                print("Error: no playlists given.", file=sys.stderr)
+                return 1
+            result = export_batch(queries, args.output_dir, args.combined, output_format=args.format,
+                                  requests_per_second=args.rps, **fetch_options)
+            _print_batch_result(result)
+            return 1 if result.failed else 0
+        if getattr(args, 'stream', False):
+            if args.update:
+                print("Error: --stream cannot be combined with --update.", file=sys.stderr)
+                return 1
+            playlist_query = args.playlist if args.command == 'export' else ''
+            result = api.export_playlist_stream(playlist_query, args.output, args.attributes, args.workers, sp=sp)
+        elif args.command == 'export':
+            result = api.export_playlist(args.playlist, args.output, update_path=args.update, **fetch_options)
+        elif args.command == 'liked':
+            result = api.export_liked_songs(args.output, update_path=args.update, **fetch_options)
+        else:
+            result = api.update_workbook(args.playlist, args.workbook, args.output, **fetch_options)
+        _print_export_result(result)
+        return 0
+    except (SpotifyExporterError, FileNotFoundError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
@@ -0,0 +1,326 @@
+import functools
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+from .config import (FETCH_CONCURRENCY, HTTP_POOL_SIZE, LISTING_ATTEMPTS, MAX_REQUEST_RETRIES, REQUEST_TIMEOUT_SECONDS,
+                     RETRY_BACKOFF_SECONDS, SCOPE, get_spotify_cache_path, load_config)
+from .errors import AuthenticationError, PlaylistNotFoundError, SpotifyAPIError
+
+sp_global = None
+auth_manager_global = None
+rate_limiter_global = None
+progress_global = None # ProgressTracker of the running operation, see progress.py
+trace_global = None # Trace recording requests and processing steps, see trace.py
+_user_ids = weakref.WeakKeyDictionary() # client -> id of the user it is logged in as
+
+
+def build_session(pool_size: int = HTTP_POOL_SIZE):
+    """
+    requests session shared by the client and its auth manager: pool_size keep-alive connections per host
+    and gzip responses. urllib3 only retries connections that could not be made. Error responses reach
+    call_with_retries: a 429 with its Retry-After header for the shared rate limiter, a 5xx to back off from
+    without touching it. (When urllib3 runs out of status retries spotipy reports a 429 without Retry-After,
+    which would stall every worker.)
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(total=3, read=False, status=0, backoff_factor=0.3, respect_retry_after_header=False)
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, pool_size), max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    return session
+
+
+def initialize_spotify_auth(open_browser: bool = True, interactive: bool = True, pool_size: int = HTTP_POOL_SIZE):
+    """
+    Initializes the Spotify Authentication Manager and the Spotipy client.
+    A saved login is reused (and refreshed) without opening the browser; without one the login runs
+    in the browser, or by pasting the redirect URL when open_browser is False. interactive=False
+    (headless runs) raises AuthenticationError instead of prompting.
+    Returns the client on success, raises ConfigurationError / AuthenticationError on failure.
+    """
+    global auth_manager_global, sp_global
+
+    client_id, redirect_uri = load_config()
+    import spotipy
+    from spotipy.oauth2 import SpotifyPKCE
+
+    from .auth import SharedTokenManager
+
+    session = build_session(pool_size)
+    try:
+        pkce = SpotifyPKCE(
+            client_id=client_id,
+            redirect_uri=redirect_uri,
+            scope=SCOPE,
+            open_browser=open_browser,
+            cache_path=get_spotify_cache_path(),
+            requests_session=session,
+            requests_timeout=REQUEST_TIMEOUT_SECONDS
+        )
+        auth_manager_global = SharedTokenManager(pkce)
+        auth_manager_global.login(interactive=interactive)
+    except AuthenticationError:
+        sp_global = None
+        raise
+    except Exception as e:
+        sp_global = None
+        raise AuthenticationError(f"Could not initialize Spotify: {e}") from e
+    # error responses are left to call_with_retries (see build_session)
+    sp_global = spotipy.Spotify(auth_manager=auth_manager_global, requests_session=session,
+                                requests_timeout=REQUEST_TIMEOUT_SECONDS)
+    from .trace import instrument_client
+    instrument_client(sp_global)
+    return sp_global
+
+
+def get_client(open_browser: bool = True, interactive: bool = True, pool_size: int = HTTP_POOL_SIZE):
+    """Returns the authenticated client, authenticating on first use."""
+    if sp_global is None:
+        initialize_spotify_auth(open_browser=open_browser, interactive=interactive, pool_size=pool_size)
+    return sp_global
+
+
+def spotify_errors(func):
+    """
+    Decorator for library entry points: errors of the Spotify API (and of reaching it) that get through
+    func are raised as SpotifyExporterError subclasses, a 404 as PlaylistNotFoundError since the
+    entry points work on playlists.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        import requests
+        from spotipy import SpotifyException
+
+        try:
+            return func(*args, **kwargs)
+        except SpotifyException as e:
+            if e.http_status == 404:
+                raise PlaylistNotFoundError(f"Not found on Spotify: {e.msg}") from e
+            raise SpotifyAPIError(f"Spotify request failed ({e.http_status}): {e.msg}", e.http_status) from e
+        except requests.RequestException as e:
+            raise SpotifyAPIError(f"Could not reach Spotify: {e}") from e
+    return wrapper
+
+
+def current_user_id(sp) -> str:
+    """Id of the user the client is logged in as, requested once per client."""
+    user_id = _user_ids.get(sp)
+    if user_id is None:
+        user_id = _user_ids[sp] = call_with_retries(sp.me)['id']
+    return user_id
+
+
+class RateLimiter:
+    """
+    Request budget shared by every thread: at most `requests_per_second` calls are started per second,
+    and a 429's Retry-After pauses all callers instead of only the thread that received it.
+    """
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> float:
+        """Blocks until the caller may start its request. Returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+        return slot - now
+
+    def pause(self, seconds: float):
+        """Holds back every caller for the given number of seconds."""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+def _retry_wait_seconds(error: Exception, attempt: int) -> float:
+    """Returns how long to wait before retrying, preferring the Retry-After header of a 429."""
+    headers = getattr(error, 'headers', None) or {}
+    retry_after = headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            pass
+    return RETRY_BACKOFF_SECONDS * (2 ** attempt)
+
+def call_with_retries(func, *args, **kwargs):
+    """
+    Calls a Spotify API function, retrying rate limited (429) and server error (5xx)
+    responses as well as dropped connections with exponential backoff.
+    Raises OperationCancelled instead of starting a request once the installed progress tracker is cancelled.
+    With a trace installed (see trace.py) the call is recorded, retries and waits included.
+    """
+    trace = trace_global
+    if trace is None:
+        return _call_with_retries(func, args, kwargs, None)
+
+    from .trace import take_response_info
+    stats = {'attempts': 0, 'rate_limited_seconds': 0.0, 'backoff_seconds': 0.0, 'throttled_seconds': 0.0}
+    take_response_info()
+    start = trace.offset()
+    error = None
+    try:
+        return _call_with_retries(func, args, kwargs, stats)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        endpoint, response_bytes = take_response_info()
+        trace.record_request(endpoint or getattr(func, '__name__', repr(func)), start, trace.offset() - start,
+                             response_bytes, error=error, **stats)
+
+def _call_with_retries(func, args: tuple, kwargs: dict, stats: dict | None):
+    import requests
+    from spotipy import SpotifyException
+
+    tracker = progress_global
+    for attempt in range(MAX_REQUEST_RETRIES + 1):
+        if tracker is not None:
+            tracker.check()
+        rate_limiter = rate_limiter_global
+        if rate_limiter is not None:
+            throttled = rate_limiter.acquire()
+            if stats is not None:
+                stats['throttled_seconds'] += throttled
+        if stats is not None:
+            stats['attempts'] += 1
+        try:
+            return func(*args, **kwargs)
+        except SpotifyException as e:
+            if attempt == MAX_REQUEST_RETRIES or not (e.http_status == 429 or e.http_status >= 500):
+                raise
+            wait = _retry_wait_seconds(e, attempt)
+            if stats is not None:
+                stats['rate_limited_seconds' if e.http_status == 429 else 'backoff_seconds'] += wait
+            if e.http_status == 429 and rate_limiter is not None:
+                # the shared limiter holds back every thread, this one included
+                rate_limiter.pause(wait)
+                wait = 0
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == MAX_REQUEST_RETRIES:
+                raise
+            wait = _retry_wait_seconds(e, attempt)
+            if stats is not None:
+                stats['backoff_seconds'] += wait
+        if tracker is not None:
+            tracker.cancel_event.wait(wait)
+        else:
+            time.sleep(wait)
+
+def map_concurrently(func, args: list, max_workers: int = FETCH_CONCURRENCY, executor: Executor | None = None) -> list:
+    """
+    Returns [func(arg) for arg in args], computed through the given executor or,
+    without one, a temporary thread pool of max_workers. Results keep the order of args.
+    """
+    if not args:
+        return []
+    if executor is not None:
+        return [future.result() for future in [executor.submit(func, arg) for arg in args]]
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as own_executor:
+        # executor.map yields results in submission order
+        return list(own_executor.map(func, args))
+
+def _report_first_page(tracker, first_page: dict, remaining_pages: int):
+    if tracker is not None:
+        tracker.add_work(remaining_pages + 1, first_page.get('total') or 0)
+        tracker.page_done(len(first_page.get('items', [])))
+
+def fetch_all_items(fetch_page, page_limit: int, max_workers: int = FETCH_CONCURRENCY, executor: Executor | None = None) -> list:
+    """
+    Fetches every item of a paged endpoint.
+    fetch_page(offset, limit) must return a Spotify paging object containing 'total'.
+    The first page is fetched to read 'total', then all remaining offsets are requested
+    at once through a bounded thread pool (or a shared executor). Items are returned in their original order.
+    A page reporting another total means the list changed part way and the offsets shifted (tracks skipped
+    or repeated), so it is listed again, up to LISTING_ATTEMPTS times in all.
+    """
+    tracker = progress_global
+
+    def fetch_offset(offset):
+        page = call_with_retries(fetch_page, offset, page_limit)
+        if tracker is not None:
+            tracker.page_done(len((page or {}).get('items', [])))
+        return page
+
+    for _ in range(LISTING_ATTEMPTS):
+        first_page = call_with_retries(fetch_page, 0, page_limit)
+        if not first_page:
+            return []
+        all_items = list(first_page.get('items', []))
+        total = first_page.get('total') or 0
+        offsets = list(range(page_limit, total, page_limit))
+        _report_first_page(tracker, first_page, len(offsets))
+
+        consistent = True
+        for page in map_concurrently(fetch_offset, offsets, max_workers, executor):
+            if page:
+                all_items.extend(page.get('items', []))
+                consistent = consistent and (page.get('total') or 0) == total
+        if consistent:
+            break
+    return all_items
+
+def fetch_items_until(fetch_page, page_limit: int, stop) -> tuple[list, int]:
+    """
+    Fetches the items of a paged endpoint one page at a time, in order, up to (not including)
+    the first item for which stop(item) is true. Returns those items and the endpoint's 'total'.
+    On an endpoint sorted newest first this fetches only what was added since a known item.
+    """
+    tracker = progress_global
+    items = []
+    offset = 0
+    while True:
+        page = call_with_retries(fetch_page, offset, page_limit) or {}
+        page_items = page.get('items', [])
+        if tracker is not None:
+            tracker.add_work(1, len(page_items))
+            tracker.page_done(len(page_items))
+        for item in page_items:
+            if stop(item):
+                return items, page.get('total') or 0
+            items.append(item)
+        offset += page_limit
+        if not page_items or offset >= (page.get('total') or 0):
+            return items, page.get('total') or 0
+
+def iter_pages(fetch_page, page_limit: int, max_workers: int = FETCH_CONCURRENCY):
+    """
+    Yields the pages of a paged endpoint in order as they arrive.
+    Like fetch_all_items the remaining offsets are fetched concurrently, but at most max_workers
+    pages are in flight or waiting at any time, so memory does not grow with the number of pages.
+    """
+    tracker = progress_global
+    first_page = call_with_retries(fetch_page, 0, page_limit)
+    if not first_page:
+        return
+    offsets = range(page_limit, first_page.get('total') or 0, page_limit)
+    _report_first_page(tracker, first_page, len(offsets))
+    yield first_page
+
+    offsets = iter(offsets)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pending = deque()
+        for offset in offsets:
+            pending.append(executor.submit(call_with_retries, fetch_page, offset, page_limit))
+            if len(pending) >= max(1, max_workers):
+                break
+        while pending:
+            page = pending.popleft().result()
+            next_offset = next(offsets, None)
+            if next_offset is not None:
+                pending.append(executor.submit(call_with_retries, fetch_page, next_offset, page_limit))
+            if tracker is not None:
+                tracker.page_done(len((page or {}).get('items', [])))
+            if page:
+                yield page
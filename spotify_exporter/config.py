@@ -0,0 +1,136 @@
+import json
+import os
+import sys
+
+# helper function for pyinstaller
+def resource_path(relative_path):
+    """ Get absolute path to resource, works for dev and for PyInstaller """
+    try:
+        base_path = sys._MEIPASS
+    except AttributeError:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+CONFIG_FILE = resource_path('config.json')
+
+APP_NAME = "SpotifyPlaylistExporter"
+APP_AUTHOR = "MySpotifyTools"
+
+SCOPE = "user-library-read playlist-read-private playlist-read-collaborative playlist-modify-private playlist-modify-public"
+DEFAULT_ATTRIBUTES = ['id', 'name', 'artists.name', 'album.name', 'album.album_type', 'album.release_date', 'duration_ms']
+# further attributes that can be selected, off by default (see attributes.py for how any path is handled)
+OPTIONAL_ATTRIBUTES = ['album.id', 'album.total_tracks', 'popularity', 'isrc', 'added_at', 'artist.genres', 'artist.popularity',
+                       'album.label']
+
+# paging / concurrency settings for track fetching
+PLAYLIST_PAGE_LIMIT = 100 # max page size of the playlist items endpoint
+SAVED_TRACKS_PAGE_LIMIT = 50 # max page size of the saved tracks endpoint
+TRACKS_BATCH_LIMIT = 50 # max ids per call of the several tracks endpoint
+ARTISTS_BATCH_LIMIT = 50 # max ids per call of the several artists endpoint
+ALBUMS_BATCH_LIMIT = 20 # max ids per call of the several albums endpoint
+PLAYLIST_WRITE_LIMIT = 100 # max tracks per call when adding to / removing from a playlist
+FETCH_CONCURRENCY = 8
+MAX_REQUEST_RETRIES = 5
+LISTING_ATTEMPTS = 3 # a paged listing whose total changed while its pages were fetched is listed again
+RETRY_BACKOFF_SECONDS = 1.0
+REQUEST_TIMEOUT_SECONDS = 30 # connect / read timeout of every request, token requests included
+BATCH_REQUESTS_PER_SECOND = 10 # shared request budget of a batch export
+BATCH_PLAYLIST_CONCURRENCY = 4 # playlists listed at the same time in a batch export
+HTTP_POOL_SIZE = FETCH_CONCURRENCY + BATCH_PLAYLIST_CONCURRENCY # keep-alive connections, one per thread requesting at once
+TOKEN_REFRESH_MARGIN_SECONDS = 5 * 60 # access tokens are refreshed this long before they expire
+
+TRACK_CACHE_FILENAME = 'track_cache.sqlite3'
+TRACK_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TRACK_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60 # cached tracks are listed again after this (names and albums get edited)
+ENRICHMENT_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60 # cached artists / albums are refetched after this (genres and popularity change)
+LIKED_SONGS_RECONCILE_SECONDS = 7 * 24 * 60 * 60 # Liked Songs are listed in full at least this often, not just the newest likes
+
+PLAYLISTS_PAGE_LIMIT = 50 # max page size of the current user's playlists endpoint
+PLAYLIST_INDEX_FILENAME = 'playlist_index_{user_id}.json'
+TRACK_INDEX_FILENAME = 'track_index.sqlite3'
+SNAPSHOT_DIRNAME = 'snapshots'
+UPLOAD_CHECKPOINT_DIRNAME = 'uploads'
+PLAYLIST_INDEX_TTL_SECONDS = 6 * 60 * 60
+PLAYLIST_INDEX_MIN_REFRESH_SECONDS = 30 # a lookup miss refreshes the index at most this often
+
+_cache_dir = None
+_spotify_config = None
+
+
+def get_cache_dir() -> str:
+    """Returns the per-user cache directory, creating it on first use. Falls back to the working directory."""
+    global _cache_dir
+    if _cache_dir is None:
+        from appdirs import user_cache_dir
+        cache_dir = user_cache_dir(APP_NAME, APP_AUTHOR)
+        if not os.path.exists(cache_dir):
+            try:
+                os.makedirs(cache_dir)
+            except OSError as e:
+                print(f"Warning: Could not create cache directory at {cache_dir}: {e}")
+                cache_dir = "."
+        _cache_dir = cache_dir
+    return _cache_dir
+
+
+def set_cache_dir(cache_dir: str):
+    """Points the caches (tokens, tracks, playlist index, snapshots...) at another directory, e.g. for benchmarks."""
+    global _cache_dir
+    os.makedirs(cache_dir, exist_ok=True)
+    _cache_dir = cache_dir
+
+
+def get_spotify_cache_path() -> str:
+    """Path of the PKCE token cache."""
+    return os.path.join(get_cache_dir(), '.spotify_pkce_cache')
+
+
+def get_track_cache_path() -> str:
+    """Path of the SQLite track metadata cache."""
+    return os.path.join(get_cache_dir(), TRACK_CACHE_FILENAME)
+
+
+def get_playlist_index_path(user_id: str) -> str:
+    """Path of the persisted playlist name index of the given user."""
+    return os.path.join(get_cache_dir(), PLAYLIST_INDEX_FILENAME.format(user_id=user_id))
+
+
+def get_track_index_path() -> str:
+    """Path of the SQLite cross-playlist track index."""
+    return os.path.join(get_cache_dir(), TRACK_INDEX_FILENAME)
+
+
+def get_snapshot_dir() -> str:
+    """Directory of the columnar snapshots of written exports, created on first use."""
+    snapshot_dir = os.path.join(get_cache_dir(), SNAPSHOT_DIRNAME)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    return snapshot_dir
+
+
+def get_upload_checkpoint_dir() -> str:
+    """Directory of the progress checkpoints of playlist uploads, created on first use."""
+    checkpoint_dir = os.path.join(get_cache_dir(), UPLOAD_CHECKPOINT_DIRNAME)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    return checkpoint_dir
+
+
+def load_config() -> tuple[str, str]:
+    """
+    Reads CLIENT_ID and REDIRECT_URI from config.json (once).
+    Raises ConfigurationError if the file or either key is missing.
+    """
+    global _spotify_config
+    if _spotify_config is None:
+        from .errors import ConfigurationError
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                spotify_data = json.load(f)['SPOTIFY']
+            client_id = spotify_data['CLIENT_ID']
+            redirect_uri = spotify_data['REDIRECT_URI']
+        except (FileNotFoundError, KeyError) as e:
+            raise ConfigurationError(f"Error loading configuration from {CONFIG_FILE}: {e}") from e
+        if not client_id or not redirect_uri:
+            raise ConfigurationError(f"CLIENT_ID or REDIRECT_URI missing. Please check '{CONFIG_FILE}'.")
+        _spotify_config = (client_id, redirect_uri)
+    return _spotify_config
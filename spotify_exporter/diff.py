@@ -0,0 +1,199 @@
+"""
+Diff engine of the update flow.
+
+An old export and the current tracks are compared with a single merge on 'id'. The diff gives
+added and removed tracks, tracks whose fields changed (renames, album edits...) and tracks that
+moved within the playlist. The last written 'AllSongs' table of every export is also kept as a
+Parquet snapshot in the cache dir, so an update can skip re-reading the old workbook.
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .config import get_snapshot_dir
+from .formats import coerce_column_types
+from .table import concat_tracks
+from .trace import span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+KEY_COLUMN = 'id'
+
+
+@dataclass
+class TrackDiff:
+    combined: pd.DataFrame
+    added: pd.DataFrame
+    removed: pd.DataFrame
+    changed: pd.DataFrame
+    moved: pd.DataFrame
+
+    def to_sheets(self) -> dict[str, pd.DataFrame]:
+        """Sheets of an updated export. Empty diff sheets are left out."""
+        sheets = {'AllSongs': self.combined}
+        for sheet_name, df in (('MissingFromCurrentPlaylist', self.removed), ('NewlyAddedToPlaylist', self.added),
+                               ('ChangedTracks', self.changed), ('MovedInPlaylist', self.moved)):
+            if not df.empty:
+                sheets[sheet_name] = df
+        return sheets
+
+
+def _comparable(new_values: pd.Series, old_values: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    Values in a form where old (read back from a file) and new (from the API) rows compare equal.
+    Empty text counts as missing: CSV and Excel read an empty cell back as NA.
+    """
+    import pandas as pd
+
+    new_numeric, old_numeric = pd.api.types.is_numeric_dtype(new_values), pd.api.types.is_numeric_dtype(old_values)
+    if new_numeric and old_numeric:
+        return new_values, old_values
+    if pd.api.types.is_datetime64_any_dtype(new_values) and pd.api.types.is_datetime64_any_dtype(old_values):
+        return new_values, old_values
+    if isinstance(new_values.dtype, pd.CategoricalDtype) and isinstance(old_values.dtype, pd.CategoricalDtype):
+        # compared by code once both share the same categories
+        new_values, old_values = (values.cat.remove_categories('') if '' in values.cat.categories else values
+                                  for values in (new_values, old_values))
+        categories = new_values.cat.categories.union(old_values.cat.categories)
+        return new_values.cat.set_categories(categories), old_values.cat.set_categories(categories)
+    if new_numeric or old_numeric:
+        # e.g. a track called '1999' that Excel read back as a number
+        return pd.to_numeric(new_values, errors='coerce'), pd.to_numeric(old_values, errors='coerce')
+    return new_values.astype('string').replace('', pd.NA), old_values.astype('string').replace('', pd.NA)
+
+
+def _moved_flags(old_positions: list[int]) -> list[bool]:
+    """
+    Given the old positions of the common tracks in their new order, flags the tracks that moved:
+    everything outside one longest increasing run of old positions, i.e. the fewest tracks
+    that explain the reordering (a track moved to the end does not mark every other track as moved).
+    """
+    tails, tail_indices, previous = [], [], [-1] * len(old_positions)
+    for i, position in enumerate(old_positions):
+        slot = bisect.bisect_left(tails, position)
+        if slot == len(tails):
+            tails.append(position)
+            tail_indices.append(i)
+        else:
+            tails[slot] = position
+            tail_indices[slot] = i
+        previous[i] = tail_indices[slot - 1] if slot > 0 else -1
+
+    moved = [True] * len(old_positions)
+    i = tail_indices[-1] if tail_indices else -1
+    while i != -1:
+        moved[i] = False
+        i = previous[i]
+    return moved
+
+
+def diff_tracks(old_df: pd.DataFrame, new_df: pd.DataFrame) -> TrackDiff:
+    """
+    Compares an old export with the current tracks, keyed on 'id' (the first row of a duplicated id counts).
+    combined is the current tracks followed by the removed ones, as in the 'AllSongs' sheet of an update.
+    changed lists one row per changed field with its old and new value.
+    moved lists tracks whose position changed relative to the other common tracks.
+    """
+    import pandas as pd
+
+    old_keyed = old_df[old_df[KEY_COLUMN].notna()].drop_duplicates(subset=[KEY_COLUMN]).reset_index(drop=True)
+    new_keyed = new_df[new_df[KEY_COLUMN].notna()].drop_duplicates(subset=[KEY_COLUMN]).reset_index(drop=True)
+
+    # one keyed merge of positions; rows are then taken from the original frames so dtypes survive
+    keys = pd.DataFrame({KEY_COLUMN: new_keyed[KEY_COLUMN], '_new_position': range(len(new_keyed))}).merge(
+        pd.DataFrame({KEY_COLUMN: old_keyed[KEY_COLUMN], '_old_position': range(len(old_keyed))}),
+        on=KEY_COLUMN, how='outer', indicator=True, sort=False)
+    added_positions = keys.loc[keys['_merge'] == 'left_only', '_new_position'].astype(int).sort_values()
+    removed_positions = keys.loc[keys['_merge'] == 'right_only', '_old_position'].astype(int).sort_values()
+    both = keys.loc[keys['_merge'] == 'both', ['_new_position', '_old_position']].astype(int).sort_values('_new_position')
+
+    new_columns = list(new_df.columns)
+    old_columns = list(old_df.columns)
+    added = new_keyed.iloc[added_positions.to_numpy()][new_columns].reset_index(drop=True)
+    removed = old_keyed.iloc[removed_positions.to_numpy()][old_columns].reset_index(drop=True)
+    combined = concat_tracks([new_keyed[new_columns], removed])
+
+    # field changes, compared column by column over all common tracks at once
+    new_common = new_keyed.iloc[both['_new_position'].to_numpy()].reset_index(drop=True)
+    old_common = old_keyed.iloc[both['_old_position'].to_numpy()].reset_index(drop=True)
+    names = new_common['name'] if 'name' in new_common.columns else None
+    shared_columns = [column for column in new_columns if column != KEY_COLUMN and column in old_columns]
+    typed_new = coerce_column_types(new_common[shared_columns])
+    typed_old = coerce_column_types(old_common[shared_columns])
+    changes = []
+    for column in shared_columns:
+        new_values, old_values = _comparable(typed_new[column], typed_old[column])
+        differs = (new_values != old_values).fillna(True) & ~(new_values.isna() & old_values.isna())
+        if differs.any():
+            changes.append(pd.DataFrame({
+                KEY_COLUMN: new_common.loc[differs, KEY_COLUMN],
+                'name': names[differs] if names is not None else None,
+                'field': column,
+                'old_value': old_common.loc[differs, column].astype(object),
+                'new_value': new_common.loc[differs, column].astype(object),
+            }))
+    changed = (pd.concat(changes, ignore_index=True) if changes
+               else pd.DataFrame(columns=[KEY_COLUMN, 'name', 'field', 'old_value', 'new_value']))
+
+    moved_mask = _moved_flags(both['_old_position'].tolist())
+    moved_positions = both.loc[moved_mask]
+    moved_rows = new_keyed.iloc[moved_positions['_new_position'].to_numpy()]
+    moved = pd.DataFrame({
+        KEY_COLUMN: moved_rows[KEY_COLUMN].to_numpy(),
+        'name': moved_rows['name'].to_numpy() if 'name' in moved_rows.columns else None,
+        'old_position': moved_positions['_old_position'].to_numpy() + 1,
+        'new_position': moved_positions['_new_position'].to_numpy() + 1,
+    })
+
+    return TrackDiff(combined, added, removed, changed, moved)
+
+
+def _snapshot_paths(export_path: str) -> tuple[str, str]:
+    key = hashlib.sha1(os.path.abspath(export_path).encode('utf-8')).hexdigest()
+    snapshot_dir = get_snapshot_dir()
+    return os.path.join(snapshot_dir, f'{key}.parquet'), os.path.join(snapshot_dir, f'{key}.json')
+
+
+def _file_signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def save_snapshot(export_path: str, all_songs_df: pd.DataFrame) -> bool:
+    """
+    Keeps a columnar copy of the 'AllSongs' table just written to export_path.
+    Returns False (and keeps nothing) if the snapshot cannot be written, e.g. without pyarrow.
+    """
+    snapshot_path, meta_path = _snapshot_paths(export_path)
+    try:
+        with span('snapshot', rows=len(all_songs_df)):
+            all_songs_df.to_parquet(snapshot_path, index=False)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(_file_signature(export_path), f)
+        return True
+    except Exception:
+        return False
+
+
+def load_snapshot(export_path: str) -> pd.DataFrame | None:
+    """
+    Returns the snapshot of export_path if the file is still exactly the one the snapshot was taken of
+    (same size and modification time), otherwise None and the file has to be read itself.
+    """
+    import pandas as pd
+
+    snapshot_path, meta_path = _snapshot_paths(export_path)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            signature = json.load(f)
+        if signature != _file_signature(export_path):
+            return None
+        return pd.read_parquet(snapshot_path)
+    except Exception:
+        return None
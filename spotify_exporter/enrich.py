@@ -0,0 +1,121 @@
+"""
+Enrichment of exports with details of the tracks' artists and albums (genres, label...).
+
+Rows built by a RowBuilder hold the primary artist / album id in the columns of enrichment
+attributes. fetch_enrichment collects the distinct ids of the whole export, takes what it can
+from the cache and fetches the rest through the several artists (50 ids per call) and albums
+(20 per call) endpoints in parallel. enrich_frame then maps each column from ids to values.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from . import client
+from .attributes import ENRICHMENT_ATTRIBUTES, RowBuilder, trim_entity
+from .cache import TrackCache
+from .client import call_with_retries, map_concurrently
+from .config import ALBUMS_BATCH_LIMIT, ARTISTS_BATCH_LIMIT, ENRICHMENT_CACHE_TTL_SECONDS, FETCH_CONCURRENCY
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from concurrent.futures import Executor
+
+    import pandas as pd
+    from spotipy import Spotify
+
+BATCH_LIMITS = {'artists': ARTISTS_BATCH_LIMIT, 'albums': ALBUMS_BATCH_LIMIT}
+
+
+def _fetch_by_id(kind: str, ids: list[str], max_workers: int, sp: Spotify, executor: Executor | None) -> list[dict]:
+    fetch = sp.artists if kind == 'artists' else sp.albums
+    limit = BATCH_LIMITS[kind]
+    batches = [ids[i:i + limit] for i in range(0, len(ids), limit)]
+    tracker = client.progress_global
+    if tracker is not None:
+        tracker.add_work(len(batches), len(ids))
+
+    def fetch_batch(batch):
+        result = call_with_retries(fetch, batch)
+        if tracker is not None:
+            tracker.page_done(len(batch))
+        return result
+
+    fetched = []
+    for result in map_concurrently(fetch_batch, batches, max_workers, executor):
+        fetched.extend(entity for entity in (result or {}).get(kind, []) if entity)
+    return fetched
+
+
+def enrichment_ids(row_builder: RowBuilder, rows: Iterable[list]) -> dict[str, list[str]]:
+    """Distinct lookup ids per endpoint in the enrichment columns of rows."""
+    indices = {row_builder.columns.index(column): ENRICHMENT_ATTRIBUTES[attribute][0]
+               for column, attribute in row_builder.enrichment_columns.items()}
+    ids = {kind: {} for kind in indices.values()}
+    for row in rows:
+        for index, kind in indices.items():
+            if row[index]:
+                ids[kind][row[index]] = None
+    return {kind: list(kind_ids) for kind, kind_ids in ids.items()}
+
+
+def fetch_enrichment(ids: dict[str, list[str]], cache: TrackCache | None = None, max_workers: int = FETCH_CONCURRENCY,
+                     sp: Spotify | None = None, executor: Executor | None = None,
+                     known: dict[str, dict[str, dict]] | None = None) -> dict[str, dict[str, dict]]:
+    """
+    Artist / album objects by endpoint and id. Objects in known (e.g. from earlier pages of a stream) are reused,
+    then the cache is asked, and each id missing from both (or stale in the cache) is fetched once.
+    """
+    sp = sp or client.sp_global
+    entities = {}
+    for kind, kind_ids in ids.items():
+        found = dict((known or {}).get(kind, {}))
+        kind_ids = [entity_id for entity_id in kind_ids if entity_id not in found]
+        if cache is not None and kind_ids:
+            found.update(cache.get_entities(kind, kind_ids, ENRICHMENT_CACHE_TTL_SECONDS))
+        missing = [entity_id for entity_id in kind_ids if entity_id not in found]
+        if missing:
+            # kept with every enrichment attribute of the kind, so the cache serves any later selection
+            fetched = [trim_entity(entity, kind) for entity in _fetch_by_id(kind, missing, max_workers, sp, executor)]
+            if cache is not None:
+                cache.put_entities(kind, fetched)
+            found.update((entity['id'], entity) for entity in fetched)
+        entities[kind] = found
+    return entities
+
+
+def _value(entity: dict | None, path: tuple[str, ...]):
+    for part in path:
+        if not isinstance(entity, dict):
+            return None
+        entity = entity.get(part)
+    if isinstance(entity, list):
+        return ", ".join(str(value) for value in entity)
+    return entity
+
+
+def _lookup_tables(row_builder: RowBuilder, entities: dict[str, dict[str, dict]]) -> dict[str, dict]:
+    """Per enrichment column, the mapping from lookup id to value."""
+    tables = {}
+    for column, attribute in row_builder.enrichment_columns.items():
+        kind, _, path = ENRICHMENT_ATTRIBUTES[attribute]
+        tables[column] = {entity_id: _value(entity, path) for entity_id, entity in entities.get(kind, {}).items()}
+    return tables
+
+
+def enrich_frame(df: pd.DataFrame, row_builder: RowBuilder, entities: dict[str, dict[str, dict]]) -> pd.DataFrame:
+    """Replaces the lookup ids of df's enrichment columns with their values, one vectorized map per column."""
+    import pandas as pd
+
+    for column, table in _lookup_tables(row_builder, entities).items():
+        if column in df.columns:
+            df[column] = df[column].map(pd.Series(table, dtype=object)).infer_objects()
+    return df
+
+
+def enrich_rows(rows: list[list], row_builder: RowBuilder, entities: dict[str, dict[str, dict]]) -> list[list]:
+    """enrich_frame for plain row lists (streamed exports), in place."""
+    tables = [(row_builder.columns.index(column), table) for column, table in _lookup_tables(row_builder, entities).items()]
+    for row in rows:
+        for index, table in tables:
+            row[index] = table.get(row[index])
+    return rows
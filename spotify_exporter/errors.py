@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+
+class SpotifyExporterError(Exception):
+    """Base class for errors raised by spotify_exporter."""
+
+
+class ConfigurationError(SpotifyExporterError):
+    """config.json is missing or incomplete."""
+
+
+class AuthenticationError(SpotifyExporterError):
+    """Spotify authentication failed or has not been done yet."""
+
+
+class PlaylistNotFoundError(SpotifyExporterError):
+    """A playlist name or link could not be resolved to a playlist id."""
+
+
+class SpotifyAPIError(SpotifyExporterError):
+    """Spotify answered a request with an error (after retries), or could not be reached."""
+    def __init__(self, message: str, http_status: int | None = None):
+        super().__init__(message)
+        self.http_status = http_status
+
+
+class UpdateError(SpotifyExporterError):
+    """An existing workbook could not be used to update an export."""
+
+
+class InputFileError(SpotifyExporterError):
+    """A file of track ids could not be read or contained no usable ids."""
+
+
+class ExportError(SpotifyExporterError):
+    """The export file could not be written."""
+
+
+class UploadError(SpotifyExporterError):
+    """Tracks could not be written to a playlist. Progress is kept, so running the upload again resumes it."""
+
+
+class OperationCancelled(SpotifyExporterError):
+    """The operation was cancelled by the user before it finished."""
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+from .errors import ExportError, UpdateError
+from .diff import diff_tracks, load_snapshot
+from .formats import read_table
+from .table import compact_tracks
+from .trace import span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_OUTPUT_FILENAME = "spotify_playlist_data.xlsx"
+
+
+def suggest_output_filename(update_excel_path: str | None = None) -> str:
+    """Default name for an export, '<old name>_updated.<ext>' when updating an existing export."""
+    if update_excel_path:
+        stem, extension = os.path.splitext(os.path.basename(update_excel_path))
+        return f"{stem}_updated{extension or '.xlsx'}"
+    return DEFAULT_OUTPUT_FILENAME
+
+
+def build_export_sheets(main_df: pd.DataFrame, update_excel_path: str | None = None) -> dict[str, pd.DataFrame]:
+    """
+    Builds the sheets of an export.
+    Without update_excel_path this is just 'AllSongs'. With it, the old export's 'AllSongs' table
+    (its cached snapshot when the file is unchanged since we wrote it, otherwise the file itself,
+    in any format read_table supports) is diffed against main_df: removed tracks are kept in 'AllSongs'
+    and 'MissingFromCurrentPlaylist', 'NewlyAddedToPlaylist', 'ChangedTracks' and 'MovedInPlaylist'
+    sheets are added.
+    Raises FileNotFoundError if the old export does not exist and UpdateError if it cannot be used.
+    """
+    if not update_excel_path:
+        return {'AllSongs': main_df}
+
+    with span('read_previous', path=update_excel_path) as fields:
+        old_df = load_snapshot(update_excel_path)
+        fields['from_snapshot'] = old_df is not None
+        if old_df is None:
+            try:
+                old_df = read_table(update_excel_path, 'AllSongs')
+            except FileNotFoundError:
+                raise
+            except Exception as e:
+                raise UpdateError(f"Error during update: {e}") from e
+        old_df = compact_tracks(old_df)
+        fields['rows'] = len(old_df)
+    if 'id' not in old_df.columns or 'id' not in main_df.columns:
+        raise UpdateError("'id' column missing in existing or new data. Cannot update.")
+    with span('diff', rows=len(main_df)):
+        return diff_tracks(old_df, main_df).to_sheets()
+
+
+def write_workbook(final_sheets: dict[str, pd.DataFrame], save_path: str):
+    """Writes every non-empty sheet to an Excel workbook. Raises ExportError on failure."""
+    import pandas as pd
+
+    try:
+        with pd.ExcelWriter(save_path) as writer:
+            for sheet_name, df_to_write in final_sheets.items():
+                if not df_to_write.empty:
+                    df_to_write.to_excel(writer, sheet_name=sheet_name, index=False)
+    except Exception as e:
+        raise ExportError(f"Could not save Excel file: {e}") from e
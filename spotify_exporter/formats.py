@@ -0,0 +1,159 @@
+"""
+Output and input formats of exports, picked by file extension.
+
+Excel keeps one sheet per table. The other formats hold a single table per file, so extra
+tables (e.g. 'NewlyAddedToPlaylist') go to sibling files named '<stem>.<table><ext>'.
+"""
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+from .errors import ExportError, InputFileError
+from .trace import span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MAIN_TABLE = 'AllSongs'
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+TABLE_EXTENSIONS = ('.parquet', '.feather', '.arrow', '.csv', '.ndjson', '.jsonl')
+SUPPORTED_EXTENSIONS = EXCEL_EXTENSIONS + TABLE_EXTENSIONS
+
+# file dialog filters shared by the GUI
+FILE_TYPES = [
+    ("Excel files", "*.xlsx"),
+    ("Parquet files", "*.parquet"),
+    ("Feather / Arrow IPC files", "*.feather *.arrow"),
+    ("CSV files", "*.csv"),
+    ("NDJSON files", "*.ndjson *.jsonl"),
+    ("All files", "*.*"),
+]
+
+INTEGER_COLUMNS = ('duration_ms',)
+# 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD' depending on the album's release_date_precision, kept as that text
+DATE_COLUMNS = ('album-release_date',)
+TIMESTAMP_COLUMNS = ('added_at',) # ISO 8601 UTC timestamps from the API, kept as naive UTC datetimes
+TIMESTAMP_TEXT_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def _extension(path: str) -> str:
+    return os.path.splitext(path)[1].lower()
+
+
+def table_path(path: str, table_name: str) -> str:
+    """Path holding table_name for single-table formats; the main table lives at path itself."""
+    if table_name == MAIN_TABLE:
+        return path
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{table_name}{extension}"
+
+
+def coerce_column_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns df with typed columns: integer columns as nullable Int64, release dates as their original
+    text (a datetime would turn '1999' into 1999-01-01) and added_at as a UTC datetime without timezone
+    (Excel cannot store one). Safe to apply twice.
+    """
+    import pandas as pd
+
+    df = df.copy(deep=False)
+    for column in INTEGER_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').round().astype('Int64')
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = _release_dates_as_text(df[column])
+    for column in TIMESTAMP_COLUMNS:
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column].astype('string'), errors='coerce', format='mixed', utc=True).dt.tz_localize(None)
+    return df
+
+
+def _release_dates_as_text(values: pd.Series) -> pd.Series:
+    """Release dates that a reader typed back as text: years-only CSV columns come back as numbers."""
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime('%Y-%m-%d')
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_numeric(values, errors='coerce').round().astype('Int64').astype('string')
+    return values
+
+
+def _dates_as_text(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy(deep=False)
+    for column in TIMESTAMP_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].dt.strftime(TIMESTAMP_TEXT_FORMAT)
+    return df
+
+
+def _write_table(df: pd.DataFrame, path: str):
+    extension = _extension(path)
+    df = coerce_column_types(df)
+    if extension == '.parquet':
+        df.to_parquet(path, index=False)
+    elif extension in ('.feather', '.arrow'):
+        df.reset_index(drop=True).to_feather(path)
+    elif extension == '.csv':
+        _dates_as_text(df).to_csv(path, index=False)
+    else:
+        _dates_as_text(df).to_json(path, orient='records', lines=True, force_ascii=False)
+
+
+def write_sheets(final_sheets: dict[str, pd.DataFrame], save_path: str):
+    """
+    Writes every non-empty table to save_path in the format given by its extension.
+    Raises ExportError for unsupported extensions, a missing optional dependency (pyarrow) or write failures.
+    """
+    extension = _extension(save_path)
+    if extension and extension not in SUPPORTED_EXTENSIONS:
+        raise ExportError(f"Unsupported export format '{extension}'. Use one of: {', '.join(SUPPORTED_EXTENSIONS)}.")
+
+    with span('write', format=extension or '.xlsx', rows=sum(len(df) for df in final_sheets.values())):
+        if extension in EXCEL_EXTENSIONS or not extension:
+            from .export import write_workbook
+            write_workbook(final_sheets, save_path)
+            return
+        try:
+            for table_name, df_to_write in final_sheets.items():
+                if not df_to_write.empty:
+                    _write_table(df_to_write, table_path(save_path, table_name))
+        except ImportError as e:
+            raise ExportError(f"Writing {extension} files needs pyarrow (pip install pyarrow): {e}") from e
+        except Exception as e:
+            raise ExportError(f"Could not save {save_path}: {e}") from e
+
+
+def read_table(path: str, table_name: str | None = MAIN_TABLE) -> pd.DataFrame:
+    """
+    Reads one table of an export. For Excel table_name is the sheet (None for the first sheet);
+    for single-table formats a table other than the main one is read from its sibling file.
+    Raises FileNotFoundError if the file does not exist and InputFileError if it cannot be read.
+    """
+    import pandas as pd
+
+    extension = _extension(path)
+    if extension in EXCEL_EXTENSIONS:
+        return pd.read_excel(path, sheet_name=table_name if table_name is not None else 0)
+    if extension not in TABLE_EXTENSIONS:
+        raise InputFileError(f"Unsupported file format '{extension}'. Use one of: {', '.join(SUPPORTED_EXTENSIONS)}.")
+
+    path = table_path(path, table_name or MAIN_TABLE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    try:
+        if extension == '.parquet':
+            df = pd.read_parquet(path)
+        elif extension in ('.feather', '.arrow'):
+            df = pd.read_feather(path)
+        elif extension == '.csv':
+            df = pd.read_csv(path)
+        else:
+            df = pd.read_json(path, orient='records', lines=True, dtype=False)
+    except ImportError as e:
+        raise InputFileError(f"Reading {extension} files needs pyarrow (pip install pyarrow): {e}") from e
+    except pd.errors.EmptyDataError as e:
+        raise InputFileError(f"The file {path} is empty.") from e
+    return coerce_column_types(df)
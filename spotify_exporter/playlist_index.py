@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import difflib
+import json
+import os
+import time
+from typing import TYPE_CHECKING
+
+from .client import current_user_id, fetch_all_items
+from .config import (PLAYLIST_INDEX_MIN_REFRESH_SECONDS, PLAYLIST_INDEX_TTL_SECONDS, PLAYLISTS_PAGE_LIMIT,
+                     get_playlist_index_path)
+
+if TYPE_CHECKING:
+    from spotipy import Spotify
+
+playlist_index_global = None
+
+
+def _entry(item: dict) -> dict:
+    return {'id': item.get('id'), 'name': item.get('name') or '', 'snapshot_id': item.get('snapshot_id')}
+
+
+class PlaylistIndex:
+    """
+    Case-folded name -> playlist index of a user's playlists, persisted to disk (one file per user) with a TTL.
+    Several playlists can share a name: find() returns the first one in the user's playlist order
+    (the one the old linear scan returned) and matches() returns all of them.
+    """
+    def __init__(self, user_id: str, path: str | None = None, ttl_seconds: float = PLAYLIST_INDEX_TTL_SECONDS):
+        self.user_id = user_id
+        self.path = path or get_playlist_index_path(user_id)
+        self.ttl_seconds = ttl_seconds
+        self.playlists = []
+        self.built_at = 0.0
+        self._by_name = {}
+        self._by_id = {}
+
+    def _set_playlists(self, playlists: list[dict]):
+        self.playlists = playlists
+        self._by_name = {}
+        self._by_id = {playlist['id']: playlist for playlist in playlists}
+        for playlist in playlists:
+            self._by_name.setdefault(playlist['name'].casefold(), []).append(playlist)
+
+    def load(self) -> bool:
+        """Loads the persisted index. Returns False if there is none or it is unreadable."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._set_playlists(data['playlists'])
+            self.built_at = data['built_at']
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def save(self):
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'built_at': self.built_at, 'playlists': self.playlists}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: Could not save playlist index to {self.path}: {e}")
+
+    def is_stale(self) -> bool:
+        return not self.playlists or time.time() - self.built_at > self.ttl_seconds
+
+    def refresh(self, sp: Spotify):
+        """
+        Lists every playlist again (concurrently). A renamed or edited playlist can sit anywhere in the
+        user's playlist order, so no part of the stored index is reused.
+        """
+        def fetch_page(offset, limit):
+            return sp.current_user_playlists(limit=limit, offset=offset)
+
+        self._set_playlists([_entry(item) for item in fetch_all_items(fetch_page, PLAYLISTS_PAGE_LIMIT) if item])
+        self.built_at = time.time()
+        self.save()
+
+    def matches(self, playlist_name: str) -> list[dict]:
+        """All playlists with this name (case-insensitive), in the user's playlist order."""
+        return list(self._by_name.get(playlist_name.casefold(), []))
+
+    def find(self, playlist_name: str) -> str | None:
+        matches = self._by_name.get(playlist_name.casefold())
+        return matches[0]['id'] if matches else None
+
+    def name_of(self, playlist_id: str) -> str | None:
+        """Name of one of the user's playlists, None for a playlist the user does not have (or the index does not know yet)."""
+        playlist = self._by_id.get(playlist_id)
+        return playlist['name'] if playlist else None
+
+    def search(self, text: str, limit: int = 5) -> list[dict]:
+        """Playlists whose name starts with text, followed by close fuzzy matches."""
+        key = text.casefold()
+        names = list(self._by_name)
+        found = [name for name in names if name.startswith(key)]
+        found += [name for name in difflib.get_close_matches(key, names, n=limit, cutoff=0.6) if name not in found]
+        return [self._by_name[name][0] for name in found[:limit]]
+
+
+def get_playlist_index(sp: Spotify, refresh: bool = False) -> PlaylistIndex:
+    """
+    Returns the playlist index of the user sp is logged in as, loading it from disk and relisting
+    it when stale (or when refresh is set).
+    """
+    global playlist_index_global
+    user_id = current_user_id(sp)
+    if playlist_index_global is None or playlist_index_global.user_id != user_id:
+        playlist_index_global = PlaylistIndex(user_id)
+        playlist_index_global.load()
+    if refresh or playlist_index_global.is_stale():
+        playlist_index_global.refresh(sp)
+    return playlist_index_global
+
+
+def find_playlist_id(playlist_name: str, sp: Spotify) -> str | None:
+    """
+    Looks a playlist name up in the index. On a miss the index is relisted (at most
+    every PLAYLIST_INDEX_MIN_REFRESH_SECONDS) in case the playlist was created or renamed since.
+    """
+    index = get_playlist_index(sp)
+    playlist_id = index.find(playlist_name)
+    if playlist_id is None and time.time() - index.built_at > PLAYLIST_INDEX_MIN_REFRESH_SECONDS:
+        index.refresh(sp)
+        playlist_id = index.find(playlist_name)
+    return playlist_id
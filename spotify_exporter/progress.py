@@ -0,0 +1,103 @@
+"""
+Progress reporting and cancellation of long running operations.
+
+A ProgressTracker installed as client.progress_global is fed by the paging helpers (pages and
+items as they are fetched) and checked by call_with_retries before every request, so cancelling
+it stops an export or upload at the next request boundary.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from . import client
+from .errors import OperationCancelled
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+@dataclass
+class ProgressSnapshot:
+    phase: str
+    pages_done: int
+    pages_total: int
+    items_done: int
+    items_total: int
+    items_per_second: float
+    eta_seconds: float | None
+
+    @property
+    def fraction(self) -> float:
+        return self.pages_done / self.pages_total if self.pages_total else 0.0
+
+
+class ProgressTracker:
+    """
+    Thread-safe counters of an operation. Totals grow as the paging helpers discover them.
+    on_update(snapshot) is called from whichever thread made progress.
+    """
+    def __init__(self, on_update: Callable[[ProgressSnapshot], None] | None = None):
+        self.on_update = on_update
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._phase = ''
+        self._pages_done = self._pages_total = 0
+        self._items_done = self._items_total = 0
+
+    def snapshot(self) -> ProgressSnapshot:
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started, 1e-6)
+            pages_per_second = self._pages_done / elapsed
+            remaining_pages = self._pages_total - self._pages_done
+            eta = remaining_pages / pages_per_second if pages_per_second and remaining_pages > 0 else None
+            return ProgressSnapshot(self._phase, self._pages_done, self._pages_total, self._items_done,
+                                    self._items_total, self._items_done / elapsed, eta)
+
+    def _changed(self):
+        if self.on_update is not None:
+            self.on_update(self.snapshot())
+
+    def set_phase(self, phase: str):
+        with self._lock:
+            self._phase = phase
+        self._changed()
+
+    def add_work(self, pages: int, items: int = 0):
+        with self._lock:
+            self._pages_total += pages
+            self._items_total += items
+        self._changed()
+
+    def page_done(self, items: int = 0):
+        with self._lock:
+            self._pages_done += 1
+            self._items_done += items
+        self._changed()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check(self):
+        """Raises OperationCancelled once cancel() has been called."""
+        if self.cancel_event.is_set():
+            raise OperationCancelled("The operation was cancelled.")
+
+
+@contextmanager
+def tracking(tracker: ProgressTracker):
+    """Installs tracker as client.progress_global for the duration of the block."""
+    previous_tracker = client.progress_global
+    client.progress_global = tracker
+    try:
+        yield tracker
+    finally:
+        client.progress_global = previous_tracker
@@ -0,0 +1,100 @@
+"""
+Writers for streaming exports. Each consumes an iterator of row batches and writes
+every batch straight to disk, without building a DataFrame first.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import os
+from typing import TYPE_CHECKING
+
+from .errors import ExportError
+from .trace import span
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+
+def _write_csv(path: str, columns: list[str], row_batches: Iterable[list[list]]) -> int:
+    row_count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in row_batches:
+            writer.writerows(rows)
+            row_count += len(rows)
+    return row_count
+
+
+def _write_ndjson(path: str, columns: list[str], row_batches: Iterable[list[list]]) -> int:
+    row_count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for rows in row_batches:
+            f.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows)
+            row_count += len(rows)
+    return row_count
+
+
+def _write_xlsx(path: str, columns: list[str], row_batches: Iterable[list[list]]) -> int:
+    from openpyxl import Workbook
+
+    # write-only workbooks stream rows to a temporary file instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('AllSongs')
+    sheet.append(columns)
+    row_count = 0
+    for rows in row_batches:
+        for row in rows:
+            sheet.append(row)
+        row_count += len(rows)
+    workbook.save(path)
+    return row_count
+
+
+STREAM_WRITERS = {
+    '.csv': _write_csv,
+    '.ndjson': _write_ndjson,
+    '.jsonl': _write_ndjson,
+    '.xlsx': _write_xlsx,
+}
+
+
+def write_row_batches(path: str, columns: list[str], row_batches: Iterable[list[list]]) -> int:
+    """
+    Streams row batches to path, picking the format from its extension (.xlsx, .csv, .ndjson/.jsonl).
+    The rows go to a temporary file next to path that replaces it once complete, so a failed export
+    leaves no partial file behind (and an older file at path untouched).
+    Returns the number of rows written. Raises ExportError for unknown extensions or write failures;
+    errors raised while the rows are fetched are passed on as they are.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    writer = STREAM_WRITERS.get(extension)
+    if writer is None:
+        raise ExportError(f"Streaming export does not support '{extension}' files. Use one of: {', '.join(STREAM_WRITERS)}.")
+
+    fetch_errors = []
+
+    def fetched_batches():
+        try:
+            yield from row_batches
+        except Exception as e:
+            fetch_errors.append(e)
+            raise
+
+    tmp_path = path + '.tmp'
+    try:
+        # rows are fetched while they are written, so this step includes the network time
+        with span('write_stream', format=extension) as fields:
+            fields['rows'] = writer(tmp_path, columns, fetched_batches())
+        os.replace(tmp_path, path)
+        return fields['rows']
+    except BaseException as e:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        if not isinstance(e, Exception) or any(e is error for error in fetch_errors):
+            raise
+        # not only OSError: writers reject some values, e.g. openpyxl's IllegalCharacterError on control characters
+        raise ExportError(f"Could not write {path}: {e}") from e
@@ -0,0 +1,94 @@
+"""
+Compact in-memory track tables.
+
+get_tracks_to_df builds its DataFrame from rows of Python objects, where every cell of an object
+column is a separate str (about 50-80 bytes each) even when the same artist or album name repeats
+thousands of times. compact_tracks retypes an export table column by column: repeated names become
+categoricals (one code per row plus one str per distinct value), numbers become small nullable
+integers, added_at becomes datetime64 (release dates stay text, in their own precision) and ids /
+track names become Arrow-backed strings when pyarrow is installed. The diff and the writers of formats.py work on these types directly.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .formats import coerce_column_types
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# columns whose values usually repeat across tracks (an album's name for each of its tracks, a handful of album types...)
+CATEGORY_COLUMNS = ('playlist', 'primary-artist', 'featured-artists', 'album-name', 'album-album_type', 'album-release_date',
+                    'album-id', 'album-label', 'artist-genres')
+# columns of (almost) unique strings, kept as strings but out of Python objects when pyarrow is available
+STRING_COLUMNS = ('id', 'name', 'isrc')
+# the smallest nullable integer type holding each integer column's range
+SMALL_INTEGER_COLUMNS = {'duration_ms': 'Int32', 'popularity': 'Int8', 'artist-popularity': 'Int8',
+                         'album-total_tracks': 'Int16'}
+
+_string_dtype = None
+
+
+def _compact_string_dtype():
+    """'string[pyarrow]' if pyarrow can be imported, otherwise None (the column is left as it is)."""
+    global _string_dtype
+    if _string_dtype is None:
+        try:
+            import pyarrow  # noqa: F401
+            _string_dtype = 'string[pyarrow]'
+        except ImportError:
+            _string_dtype = ''
+    return _string_dtype or None
+
+
+def compact_tracks(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns df with the compact column types described above; columns not listed are only
+    typed by coerce_column_types. Safe to apply twice, and to frames read back from any export format.
+    """
+    import pandas as pd
+
+    df = coerce_column_types(df)
+    for column, dtype in SMALL_INTEGER_COLUMNS.items():
+        if column in df.columns and df[column].dtype != dtype:
+            values = pd.to_numeric(df[column], errors='coerce').round()
+            if not values.dropna().between(*_integer_range(dtype)).all():
+                continue # out of range (not Spotify data), keep the wider type
+            df[column] = values.astype(dtype)
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            # a category per row would cost more than the strings themselves
+            if df[column].nunique() <= len(df) // 2:
+                df[column] = df[column].astype('category')
+    string_dtype = _compact_string_dtype()
+    if string_dtype is not None:
+        for column in STRING_COLUMNS:
+            if column in df.columns and df[column].dtype != string_dtype:
+                df[column] = df[column].astype(string_dtype)
+    return df
+
+
+def concat_tracks(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    pd.concat of track tables that keeps the categorical columns of the first table categorical
+    (concat falls back to plain values when the tables' categories differ).
+    """
+    import pandas as pd
+
+    combined = pd.concat(frames, ignore_index=True)
+    for column, dtype in frames[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and not isinstance(combined[column].dtype, pd.CategoricalDtype):
+            combined[column] = combined[column].astype('category')
+    return combined
+
+
+def _integer_range(dtype: str) -> tuple[int, int]:
+    import numpy as np
+
+    info = np.iinfo(dtype.lower())
+    return int(info.min), int(info.max)
+
+
+def table_bytes(df: pd.DataFrame) -> int:
+    """Memory held by df, strings and categories included."""
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,223 @@
+"""
+Instrumentation of exports: where does the time go, network, row building or writing?
+
+A Trace installed as client.trace_global (see tracing()) records every request made through
+call_with_retries (endpoint, latency, response bytes, retries and time spent waiting on 429s,
+backoff and the shared rate limiter) and the spans of the processing steps (building rows,
+diffing, writing files). It can be saved as a JSON trace and printed as a summary table.
+"""
+from __future__ import annotations
+
+import cProfile
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from . import client
+
+if TYPE_CHECKING:
+    from spotipy import Spotify
+
+_ID_SEGMENT = re.compile(r'[0-9A-Za-z]{22}')
+_last_responses = threading.local()
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """'GET playlists/{id}/tracks' for a request URL, with ids replaced so calls group by endpoint."""
+    segments = urlsplit(url).path.split('/')
+    if len(segments) > 2 and segments[1] == 'v1':
+        segments = segments[2:]
+    normalized = []
+    for segment in segments:
+        is_id = _ID_SEGMENT.fullmatch(segment) or (normalized and normalized[-1] == 'users')
+        normalized.append('{id}' if is_id else segment)
+    return f"{method} {'/'.join(part for part in normalized if part)}"
+
+
+def _record_response(response, *args, **kwargs):
+    if client.trace_global is None:
+        return
+    _last_responses.bytes = getattr(_last_responses, 'bytes', 0) + len(response.content or b'')
+    _last_responses.endpoint = endpoint_name(response.request.method, response.url)
+
+
+def instrument_client(sp: Spotify):
+    """Hooks the client's HTTP session so traces can report endpoints and response bytes (only while a trace is installed)."""
+    session = getattr(sp, '_session', None)
+    if session is not None and _record_response not in session.hooks['response']:
+        session.hooks['response'].append(_record_response)
+
+
+def take_response_info() -> tuple[str | None, int]:
+    """(endpoint of the last response, response bytes) received by the current thread since the last call."""
+    info = getattr(_last_responses, 'endpoint', None), getattr(_last_responses, 'bytes', 0)
+    _last_responses.endpoint, _last_responses.bytes = None, 0
+    return info
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class Trace:
+    """Thread-safe record of the requests and processing spans of one run."""
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.requests = []
+        self.spans = []
+
+    def offset(self) -> float:
+        return time.perf_counter() - self._start
+
+    def record_request(self, endpoint: str, start: float, seconds: float, response_bytes: int = 0, attempts: int = 1,
+                       rate_limited_seconds: float = 0.0, backoff_seconds: float = 0.0, throttled_seconds: float = 0.0,
+                       error: str | None = None):
+        entry = {
+            'endpoint': endpoint,
+            'start': round(start, 6),
+            'seconds': round(seconds, 6),
+            'bytes': response_bytes,
+            'attempts': attempts,
+            'retries': attempts - 1,
+            'rate_limited_seconds': round(rate_limited_seconds, 6),
+            'backoff_seconds': round(backoff_seconds, 6),
+            'throttled_seconds': round(throttled_seconds, 6),
+            'thread': threading.current_thread().name,
+        }
+        if error:
+            entry['error'] = error
+        with self._lock:
+            self.requests.append(entry)
+
+    def record_span(self, name: str, start: float, seconds: float, fields: dict):
+        with self._lock:
+            self.spans.append({'name': name, 'start': round(start, 6), 'seconds': round(seconds, 6), **fields})
+
+    def summary(self) -> dict:
+        """Per endpoint and per span totals. Request seconds add up concurrent requests, wall_seconds does not."""
+        with self._lock:
+            requests, spans = list(self.requests), list(self.spans)
+
+        endpoints = {}
+        for request in requests:
+            endpoints.setdefault(request['endpoint'], []).append(request)
+        endpoint_summary = {}
+        for endpoint, entries in sorted(endpoints.items()):
+            latencies = sorted(entry['seconds'] for entry in entries)
+            endpoint_summary[endpoint] = {
+                'calls': len(entries),
+                'seconds': round(sum(latencies), 6),
+                'p50_seconds': _percentile(latencies, 0.5),
+                'p95_seconds': _percentile(latencies, 0.95),
+                'bytes': sum(entry['bytes'] for entry in entries),
+                'retries': sum(entry['retries'] for entry in entries),
+                'rate_limited_seconds': round(sum(entry['rate_limited_seconds'] for entry in entries), 6),
+                'throttled_seconds': round(sum(entry['throttled_seconds'] for entry in entries), 6),
+                'errors': sum(1 for entry in entries if 'error' in entry),
+            }
+
+        span_summary = {}
+        for span in spans:
+            totals = span_summary.setdefault(span['name'], {'count': 0, 'seconds': 0.0, 'rows': 0})
+            totals['count'] += 1
+            totals['seconds'] = round(totals['seconds'] + span['seconds'], 6)
+            totals['rows'] += span.get('rows', 0)
+        for totals in span_summary.values():
+            totals['rows_per_second'] = round(totals['rows'] / totals['seconds'], 1) if totals['seconds'] else 0.0
+
+        network_wall = 0.0
+        covered_until = 0.0
+        for start, end in sorted((request['start'], request['start'] + request['seconds']) for request in requests):
+            network_wall += max(0.0, end - max(start, covered_until))
+            covered_until = max(covered_until, end)
+        summary = {
+            'wall_seconds': round(self.offset(), 6),
+            'network_wall_seconds': round(network_wall, 6),
+            'endpoints': endpoint_summary,
+            'spans': span_summary,
+        }
+        tables = [span for span in spans if 'table_bytes' in span]
+        if tables:
+            rows, table_bytes = tables[-1].get('rows', 0), tables[-1]['table_bytes']
+            summary['track_table'] = {'rows': rows, 'bytes': table_bytes,
+                                      'bytes_per_track': round(table_bytes / rows, 1) if rows else 0.0}
+        return summary
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            requests, spans = list(self.requests), list(self.spans)
+        return {'started_at': self.started_at, 'summary': self.summary(), 'requests': requests, 'spans': spans}
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+def format_summary(summary: dict) -> str:
+    """Summary table of Trace.summary() for the terminal."""
+    lines = [f"{'endpoint':<36} {'calls':>6} {'seconds':>9} {'p95 ms':>8} {'KiB':>9} {'retries':>7} {'429 wait':>8}"]
+    for endpoint, totals in summary['endpoints'].items():
+        lines.append(f"{endpoint[:36]:<36} {totals['calls']:>6} {totals['seconds']:>9.3f} {totals['p95_seconds'] * 1000:>8.1f} "
+                     f"{totals['bytes'] / 1024:>9.1f} {totals['retries']:>7} {totals['rate_limited_seconds']:>8.2f}")
+    lines.append("")
+    lines.append(f"{'step':<36} {'count':>6} {'seconds':>9} {'rows':>9} {'rows/s':>12}")
+    for name, totals in summary['spans'].items():
+        lines.append(f"{name[:36]:<36} {totals['count']:>6} {totals['seconds']:>9.3f} {totals['rows']:>9} {totals['rows_per_second']:>12.1f}")
+    lines.append("")
+    if 'track_table' in summary:
+        table = summary['track_table']
+        lines.append(f"track table {table['rows']} rows, {table['bytes'] / 1024 / 1024:.1f} MiB in memory, "
+                     f"{table['bytes_per_track']:.0f} bytes per track")
+    lines.append(f"wall time {summary['wall_seconds']:.3f}s, of which waiting on the network {summary['network_wall_seconds']:.3f}s")
+    return "\n".join(lines)
+
+
+@contextmanager
+def span(name: str, **fields):
+    """
+    Records the duration of a processing step in the installed trace (a no-op without one).
+    The yielded dict can be filled in, e.g. fields['rows'] = len(rows).
+    """
+    trace = client.trace_global
+    if trace is None:
+        yield fields
+        return
+    start = trace.offset()
+    try:
+        yield fields
+    finally:
+        trace.record_span(name, start, trace.offset() - start, fields)
+
+
+@contextmanager
+def tracing(trace: Trace | None):
+    """Installs trace as client.trace_global for the duration of the block; None leaves tracing off."""
+    previous_trace = client.trace_global
+    client.trace_global = trace
+    try:
+        yield trace
+    finally:
+        client.trace_global = previous_trace
+
+
+@contextmanager
+def profiling(path: str | None):
+    """Profiles the block with cProfile and dumps the stats to path (pstats format). Only the calling thread is profiled."""
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,269 @@
+"""
+Cross-playlist track index: which playlists (and Liked Songs) hold each track, at which positions.
+
+The index is a SQLite file in the cache dir, brought up to date by update_track_index with the
+listing machinery of exports: only playlists whose snapshot_id changed since the last update are
+listed again, through the shared request pool and budget of batch exports. Overlap, duplicate and
+orphan queries are then answered from the index without touching the network.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from . import client
+from .attributes import RowBuilder
+from .cache import get_track_cache
+from .client import RateLimiter, get_client
+from .config import BATCH_PLAYLIST_CONCURRENCY, BATCH_REQUESTS_PER_SECOND, FETCH_CONCURRENCY, get_track_index_path
+from .playlist_index import get_playlist_index
+from .trace import span
+from .tracks import PlaylistListing, hydrate_tracks, list_playlist_tracks
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from spotipy import Spotify
+
+track_index_global = None
+
+LIKED_SONGS_ID = ''
+LIKED_SONGS_NAME = 'Liked Songs'
+INDEX_ATTRIBUTES = ['id', 'name', 'artists.name', 'added_at']
+ANALYSIS_SHEETS = ('InSeveralPlaylists', 'DuplicatesInPlaylist', 'LikedNotInPlaylists', 'PlaylistOverlap')
+
+
+@dataclass
+class IndexUpdate:
+    """
+    What an update did. listed holds the names of the playlists that were (re)listed, errors maps
+    the id of each playlist that failed to list to its name and the error.
+    """
+    listed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    removed: int = 0
+    errors: dict[str, tuple[str, str]] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+class TrackIndex:
+    """SQLite backed track id -> (playlist, position, added_at) index of the user's library."""
+    def __init__(self, path: str | None = None):
+        self.path = path or get_track_index_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS playlists (
+                    playlist_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    snapshot_id TEXT,
+                    track_count INTEGER NOT NULL,
+                    indexed_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS placements (
+                    track_id TEXT NOT NULL,
+                    playlist_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    added_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS tracks (
+                    track_id TEXT PRIMARY KEY,
+                    name TEXT,
+                    artist TEXT
+                );
+                CREATE INDEX IF NOT EXISTS placements_track ON placements(track_id, playlist_id);
+                CREATE INDEX IF NOT EXISTS placements_playlist ON placements(playlist_id, track_id, position);
+            """)
+
+    def snapshot_ids(self) -> dict[str, str | None]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT playlist_id, snapshot_id FROM playlists"))
+
+    def known_track_ids(self, track_ids: list[str]) -> set[str]:
+        known = set()
+        unique_ids = list(dict.fromkeys(track_ids))
+        with self._lock:
+            for i in range(0, len(unique_ids), 500):
+                batch = unique_ids[i:i + 500]
+                query = f"SELECT track_id FROM tracks WHERE track_id IN ({','.join('?' * len(batch))})"
+                known.update(track_id for (track_id,) in self._conn.execute(query, batch))
+        return known
+
+    def put_playlist(self, playlist_id: str, name: str, snapshot_id: str | None, listing: PlaylistListing):
+        """Replaces the placements of a playlist with those of its listing."""
+        items = listing.items or [None] * len(listing.track_ids)
+        placements = [(track_id, playlist_id, position, (item or {}).get('added_at'))
+                      for position, (track_id, item) in enumerate(zip(listing.track_ids, items))]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM placements WHERE playlist_id = ?", (playlist_id,))
+            self._conn.executemany("INSERT INTO placements VALUES (?, ?, ?, ?)", placements)
+            self._conn.execute("INSERT OR REPLACE INTO playlists VALUES (?, ?, ?, ?, ?)",
+                               (playlist_id, name, snapshot_id, len(placements), time.time()))
+
+    def rename_playlist(self, playlist_id: str, name: str):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE playlists SET name = ? WHERE playlist_id = ?", (name, playlist_id))
+
+    def remove_playlists(self, playlist_ids: list[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM placements WHERE playlist_id = ?", [(pid,) for pid in playlist_ids])
+            self._conn.executemany("DELETE FROM playlists WHERE playlist_id = ?", [(pid,) for pid in playlist_ids])
+
+    def put_tracks(self, rows: list[tuple[str, str | None, str | None]]):
+        """Stores (track_id, name, primary artist) of tracks, for labelling query results."""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?)", rows)
+
+    def _query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        import pandas as pd
+
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            columns = [description[0] for description in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    def playlists_of(self, track_id: str) -> pd.DataFrame:
+        """Every placement of a track: playlist, position (0-based) and added_at."""
+        return self._query("""
+            SELECT pl.name AS playlist, p.playlist_id, p.position, p.added_at
+            FROM placements p JOIN playlists pl ON pl.playlist_id = p.playlist_id
+            WHERE p.track_id = ? ORDER BY pl.name, p.position
+        """, (track_id,))
+
+    def overlaps(self, min_playlists: int = 2) -> pd.DataFrame:
+        """Tracks found in at least min_playlists playlists (Liked Songs not counted), most shared first."""
+        return self._query("""
+            SELECT s.track_id AS id, t.name, t.artist AS "primary-artist", COUNT(*) AS playlist_count,
+                   GROUP_CONCAT(pl.name, ' | ') AS playlists
+            FROM (SELECT DISTINCT track_id, playlist_id FROM placements WHERE playlist_id != ?) s
+            JOIN playlists pl ON pl.playlist_id = s.playlist_id
+            LEFT JOIN tracks t ON t.track_id = s.track_id
+            GROUP BY s.track_id HAVING COUNT(*) >= ?
+            ORDER BY playlist_count DESC, t.artist, t.name
+        """, (LIKED_SONGS_ID, min_playlists))
+
+    def duplicates(self) -> pd.DataFrame:
+        """Tracks that appear more than once within the same playlist, with their positions."""
+        return self._query("""
+            SELECT pl.name AS playlist, d.track_id AS id, t.name, t.artist AS "primary-artist", d.occurrences, d.positions
+            FROM (SELECT playlist_id, track_id, COUNT(*) AS occurrences, GROUP_CONCAT(position, ', ') AS positions,
+                         MIN(position) AS first_position
+                  FROM placements GROUP BY playlist_id, track_id HAVING COUNT(*) > 1) d
+            JOIN playlists pl ON pl.playlist_id = d.playlist_id
+            LEFT JOIN tracks t ON t.track_id = d.track_id
+            ORDER BY pl.name, d.first_position
+        """)
+
+    def orphans(self) -> pd.DataFrame:
+        """Liked songs that are in none of the indexed playlists, in Liked Songs order."""
+        return self._query("""
+            SELECT p.track_id AS id, t.name, t.artist AS "primary-artist", p.added_at
+            FROM placements p LEFT JOIN tracks t ON t.track_id = p.track_id
+            WHERE p.playlist_id = ? AND p.track_id NOT IN (SELECT track_id FROM placements WHERE playlist_id != ?)
+            ORDER BY p.position
+        """, (LIKED_SONGS_ID, LIKED_SONGS_ID))
+
+    def playlist_overlap(self) -> pd.DataFrame:
+        """Pairs of playlists (Liked Songs included) sharing tracks, with the number of distinct shared tracks."""
+        return self._query("""
+            WITH distinct_placements AS (SELECT DISTINCT playlist_id, track_id FROM placements)
+            SELECT pa.name AS playlist, pb.name AS other_playlist, COUNT(*) AS shared_tracks,
+                   pa.track_count AS playlist_tracks, pb.track_count AS other_playlist_tracks
+            FROM distinct_placements a
+            JOIN distinct_placements b ON a.track_id = b.track_id AND a.playlist_id < b.playlist_id
+            JOIN playlists pa ON pa.playlist_id = a.playlist_id
+            JOIN playlists pb ON pb.playlist_id = b.playlist_id
+            GROUP BY a.playlist_id, b.playlist_id
+            ORDER BY shared_tracks DESC
+        """)
+
+    def to_sheets(self, min_playlists: int = 2) -> dict[str, pd.DataFrame]:
+        """The analysis sheets, ANALYSIS_SHEETS in that order."""
+        return dict(zip(ANALYSIS_SHEETS, (self.overlaps(min_playlists), self.duplicates(), self.orphans(), self.playlist_overlap())))
+
+
+def get_track_index() -> TrackIndex:
+    """Returns the shared track index, opening it on first use."""
+    global track_index_global
+    if track_index_global is None:
+        track_index_global = TrackIndex()
+    return track_index_global
+
+
+def update_track_index(include_liked: bool = True, refresh: bool = False, max_workers: int = FETCH_CONCURRENCY,
+                       requests_per_second: float | None = BATCH_REQUESTS_PER_SECOND, index: TrackIndex | None = None,
+                       sp: Spotify | None = None) -> IndexUpdate:
+    """
+    Brings the index up to date with the user's playlists (and Liked Songs, which has no snapshot_id
+    and is synced from its newest likes every time). Every playlist's snapshot_id comes from one full
+    listing of the user's playlists: unchanged ones are skipped unless refresh is set, changed ones are
+    listed without asking for their snapshot_id again, deleted / unfollowed ones are dropped. A playlist that fails to list keeps its previous entry
+    and is reported in the returned errors.
+    """
+    sp = sp or get_client()
+    index = index or get_track_index()
+    cache = get_track_cache()
+    start = time.perf_counter()
+    update = IndexUpdate()
+
+    playlists = [(playlist['id'], playlist['name'], playlist['snapshot_id'])
+                 for playlist in get_playlist_index(sp, refresh=True).playlists if playlist.get('id')]
+    if include_liked:
+        playlists.append((LIKED_SONGS_ID, LIKED_SONGS_NAME, None))
+    stored = index.snapshot_ids()
+    current_ids = {playlist_id for playlist_id, _, _ in playlists}
+    removed = [playlist_id for playlist_id in stored if playlist_id not in current_ids]
+    index.remove_playlists(removed)
+    update.removed = len(removed)
+
+    to_list = []
+    for playlist_id, name, snapshot_id in playlists:
+        if refresh or snapshot_id is None or stored.get(playlist_id, False) != snapshot_id:
+            to_list.append((playlist_id, name, snapshot_id))
+        else:
+            index.rename_playlist(playlist_id, name)
+            update.unchanged += 1
+
+    previous_limiter = client.rate_limiter_global
+    client.rate_limiter_global = RateLimiter(requests_per_second) if requests_per_second else None
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as request_pool:
+            def list_one(playlist):
+                playlist_id, name, snapshot_id = playlist
+                try:
+                    return list_playlist_tracks(playlist_id, max_workers, sp, cache, refresh, request_pool, INDEX_ATTRIBUTES,
+                                                snapshot_id=snapshot_id)
+                except Exception as e:
+                    update.errors[playlist_id] = (name, str(e))
+                    return None
+
+            with span('index_list', playlists=len(to_list)):
+                with ThreadPoolExecutor(max_workers=max(1, min(BATCH_PLAYLIST_CONCURRENCY, len(to_list) or 1))) as playlist_pool:
+                    listings = list(zip(to_list, playlist_pool.map(list_one, to_list)))
+
+            # names of tracks new to the index, for labelling query results
+            known_tracks = {}
+            for _, listing in listings:
+                if listing is not None:
+                    known_tracks.update(listing.tracks)
+            all_ids = list(dict.fromkeys(track_id for _, listing in listings if listing is not None for track_id in listing.track_ids))
+            indexed_ids = index.known_track_ids(all_ids)
+            new_ids = [track_id for track_id in all_ids if track_id not in indexed_ids]
+            if new_ids:
+                row_builder = RowBuilder(['id', 'name', 'artists.name'])
+                tracks_by_id = hydrate_tracks(new_ids, known_tracks, cache, max_workers, sp, request_pool, INDEX_ATTRIBUTES)
+                index.put_tracks([tuple(row_builder.row(track)[:3]) for track in tracks_by_id.values() if track])
+    finally:
+        client.rate_limiter_global = previous_limiter
+
+    with span('index_write', playlists=len(listings)):
+        for (playlist_id, name, snapshot_id), listing in listings:
+            if listing is not None:
+                index.put_playlist(playlist_id, name, snapshot_id, listing)
+                update.listed.append(name)
+    update.seconds = time.perf_counter() - start
+    return update
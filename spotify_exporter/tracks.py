@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from . import client
+from .attributes import (KNOWN_TRACK_ATTRIBUTES, VOLATILE_TRACK_ATTRIBUTES, RowBuilder, build_fields_query, is_item_attribute,
+                         track_attributes, trim_item, trim_track)
+from .cache import TrackCache, get_track_cache
+from .client import call_with_retries, fetch_all_items, fetch_items_until, iter_pages, map_concurrently
+from .config import (DEFAULT_ATTRIBUTES, FETCH_CONCURRENCY, LIKED_SONGS_RECONCILE_SECONDS, PLAYLIST_PAGE_LIMIT,
+                     SAVED_TRACKS_PAGE_LIMIT, TRACK_CACHE_TTL_SECONDS, TRACKS_BATCH_LIMIT)
+from .enrich import enrich_frame, enrich_rows, enrichment_ids, fetch_enrichment
+from .errors import AuthenticationError
+from .playlist_index import find_playlist_id
+from .table import compact_tracks, table_bytes
+from .trace import span
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from concurrent.futures import Executor
+
+    import pandas as pd
+    from spotipy import Spotify
+
+
+def id_helper_name(playlist_name: str, sp: Spotify | None = None) -> str | None:
+    """
+    Finds playlist ID by name through the persisted playlist index. 
+    Uses global sp_global unless a client is passed in.
+    """
+    sp = sp or client.sp_global
+    if not sp: return None 
+    return find_playlist_id(playlist_name, sp)
+
+def reference_pattern(kind: str) -> re.Pattern:
+    """
+    Pattern of a 'spotify:<kind>:' URI or an open.spotify.com <kind> link (localized '/intl-xx/' links
+    and query strings included), capturing the id.
+    """
+    return re.compile(rf'(?:spotify:{kind}:|open\.spotify\.com/(?:[\w-]+/)?{kind}/)([0-9A-Za-z]{{22}})')
+
+
+_PLAYLIST_REFERENCE_PATTERN = reference_pattern('playlist')
+
+
+def id_helper_url(playlist_url: str) -> str | None:
+    """Extracts playlist ID from a playlist link or URI. Returns None if there is none in playlist_url."""
+    match = _PLAYLIST_REFERENCE_PATTERN.search(playlist_url)
+    return match.group(1) if match else None
+
+
+def get_playlist_id_from_query(playlist_query: str, sp: Spotify | None = None) -> str | None:
+    """
+    Determines playlist ID from user query (name, URL, or blank for liked).
+    Returns playlist ID, '' for liked songs, or None if not found/invalid.
+    Raises AuthenticationError if Spotify has not been authenticated.
+    """
+    sp = sp or client.sp_global
+    if not sp:
+        raise AuthenticationError("Spotify not authenticated. Please authenticate first.")
+
+    if not playlist_query: 
+        return ''
+
+    playlist_id = id_helper_url(playlist_query)
+    if playlist_id is not None:
+        return playlist_id
+    else: 
+        return id_helper_name(playlist_query, sp)
+
+
+def fetch_tracks_by_id(track_ids: list[str], max_workers: int = FETCH_CONCURRENCY, sp: Spotify | None = None,
+                       executor: Executor | None = None) -> list[dict]:
+    """Fetches track objects for the given ids through the several tracks endpoint, 50 ids per call."""
+    sp = sp or client.sp_global
+    batches = [track_ids[i:i + TRACKS_BATCH_LIMIT] for i in range(0, len(track_ids), TRACKS_BATCH_LIMIT)]
+    tracker = client.progress_global
+    if tracker is not None:
+        tracker.add_work(len(batches), len(track_ids))
+
+    def fetch_batch(batch):
+        result = call_with_retries(sp.tracks, batch)
+        if tracker is not None:
+            tracker.page_done(len(batch))
+        return result
+
+    tracks = []
+    for result in map_concurrently(fetch_batch, batches, max_workers, executor):
+        tracks.extend(track for track in (result or {}).get('tracks', []) if track)
+    return tracks
+
+@dataclass
+class PlaylistListing:
+    """
+    A listed playlist: track ids in playlist order, the track objects that came back with the
+    listing itself, and (only when item level attributes are selected) the items around each track.
+    """
+    track_ids: list[str]
+    tracks: dict[str, dict] = field(default_factory=dict)
+    items: list[dict] | None = None
+
+
+def _valid_items(items: list[dict]) -> list[dict]:
+    """Items of a page that hold a track, skipping local files / unavailable tracks without an id."""
+    return [item for item in items if item.get('track') and item['track'].get('id')]
+
+def _valid_tracks(items: list[dict]) -> list[dict]:
+    """Track objects of a page's items, skipping local files / unavailable tracks without an id."""
+    return [item['track'] for item in _valid_items(items)]
+
+def _has_volatile(selected_track_attributes: list[str]) -> bool:
+    return any(attribute in VOLATILE_TRACK_ATTRIBUTES for attribute in selected_track_attributes)
+
+def _listing(items: list[dict], attributes: list[str], with_tracks: bool = True) -> PlaylistListing:
+    items = _valid_items(items)
+    item_attributes = [attribute for attribute in attributes if is_item_attribute(attribute)]
+    return PlaylistListing(
+        [item['track']['id'] for item in items],
+        {item['track']['id']: item['track'] for item in items} if with_tracks else {},
+        [trim_item(item, item_attributes) for item in items] if item_attributes else None,
+    )
+
+def list_playlist_tracks(playlist_id: str, max_workers: int = FETCH_CONCURRENCY, sp: Spotify | None = None,
+                         cache: TrackCache | None = None, refresh_cache: bool = False,
+                         executor: Executor | None = None, attributes: list[str] | None = None,
+                         snapshot_id: str | None = None) -> PlaylistListing:
+    """
+    Lists a playlist ('' for Liked Songs) without fetching tracks that the cache already knows.
+    Only the fields of the selected attributes are requested.
+    With a cache, an unchanged snapshot_id skips the listing entirely and a changed one
+    only fetches an ids-only listing; Liked Songs only fetch the tracks liked since the last listing.
+    Cached tracks of the playlist come back in the listing. Once the snapshot_id has changed, they must be younger
+    than TRACK_CACHE_TTL_SECONDS, else the playlist is listed in full instead, which refreshes them all.
+    The snapshot_id is requested unless the caller passes it (e.g. from a listing of the user's playlists).
+    refresh_cache ignores the cached playlist, as does selecting a volatile attribute such as 'popularity'
+    (the full listing brings fresh track objects along).
+    """
+    sp = sp or client.sp_global
+    attributes = attributes or DEFAULT_ATTRIBUTES
+    selected_track_attributes = track_attributes(attributes)
+    item_attributes = [attribute for attribute in attributes if is_item_attribute(attribute)]
+    refresh_cache = refresh_cache or _has_volatile(selected_track_attributes)
+
+    if playlist_id == '':
+        return _list_saved_tracks(max_workers, sp, cache, refresh_cache, executor, attributes)
+
+    def fetch_page(fields):
+        return lambda offset, limit: sp.playlist_items(playlist_id, limit=limit, offset=offset, fields=fields)
+
+    cached_playlist, cached_tracks = None, {}
+    if cache is not None:
+        if snapshot_id is None:
+            snapshot_id = call_with_retries(sp.playlist, playlist_id, fields='snapshot_id')['snapshot_id']
+        cached_playlist = None if refresh_cache else cache.get_playlist(playlist_id, item_attributes=item_attributes)
+    if cached_playlist is not None:
+        cached_ids = cached_playlist[1]
+        # an unchanged snapshot_id vouches for the cached tracks whatever their age, the TTL only applies after a change
+        max_age = None if cached_playlist[0] == snapshot_id else TRACK_CACHE_TTL_SECONDS
+        cached_tracks = cache.get_tracks(cached_ids, selected_track_attributes, max_age)
+        if len(cached_tracks) < len(set(cached_ids)):
+            # stale, evicted or lacking a selected attribute: one full listing is cheaper than fetching them 50 ids per call
+            cached_playlist = None
+
+    if cached_playlist is None:
+        listing = _listing(fetch_all_items(fetch_page(build_fields_query(attributes)), PLAYLIST_PAGE_LIMIT,
+                                           max_workers, executor), attributes)
+        if cache is not None:
+            cache.put_tracks(list(listing.tracks.values()), selected_track_attributes)
+            cache.put_playlist(playlist_id, snapshot_id, listing.track_ids, listing.items, item_attributes)
+        return listing
+
+    if cached_playlist[0] == snapshot_id:
+        return PlaylistListing(cached_ids, cached_tracks, cached_playlist[2] if item_attributes else None)
+    listing = _listing(fetch_all_items(fetch_page(build_fields_query(attributes, ids_only=True)), PLAYLIST_PAGE_LIMIT,
+                                       max_workers, executor), attributes, with_tracks=False)
+    listing.tracks = {track_id: cached_tracks[track_id] for track_id in listing.track_ids if track_id in cached_tracks}
+    cache.put_playlist(playlist_id, snapshot_id, listing.track_ids, listing.items, item_attributes)
+    return listing
+
+def _saved_tracks_delta(fetch_page, cached_ids: list[str], cached_items: list[dict]) -> tuple[list[dict], int]:
+    """The saved items liked after the newest cached one (the watermark), newest first, and the current total."""
+    watermark = cached_items[0].get('added_at')
+    at_watermark = {track_id for track_id, item in zip(cached_ids, cached_items) if item.get('added_at') == watermark}
+
+    def seen(item):
+        # a track liked again moves to the top with a new added_at and counts as new
+        added_at = item.get('added_at')
+        track_id = (item.get('track') or {}).get('id')
+        if not added_at or not track_id:
+            return False
+        return added_at < watermark or (added_at == watermark and track_id in at_watermark)
+
+    return fetch_items_until(fetch_page, SAVED_TRACKS_PAGE_LIMIT, seen)
+
+def _list_saved_tracks(max_workers: int, sp: Spotify, cache: TrackCache | None, refresh_cache: bool,
+                       executor: Executor | None, attributes: list[str]) -> PlaylistListing:
+    """
+    Lists Liked Songs. The saved tracks endpoint has no snapshot_id, but it returns the newest likes first:
+    with a cached listing only the pages down to its newest added_at are fetched and put in front of it.
+    Unliked tracks are not in that delta, so the whole library is listed again when the first page's total
+    does not add up, and at least every LIKED_SONGS_RECONCILE_SECONDS anyway. The tracks kept from the cached
+    listing come back from the cache whatever their age; when one is missing from it, the library is listed again too.
+    """
+    # the saved tracks endpoint has no fields filter, so full track objects come back anyway
+    cached_attributes = list(dict.fromkeys(KNOWN_TRACK_ATTRIBUTES + tuple(track_attributes(attributes))))
+    fetch_page = lambda offset, limit: sp.current_user_saved_tracks(limit=limit, offset=offset)
+    with span('liked_sync') as fields:
+        # the snapshot_id of the cached listing is the time of the last full listing
+        cached_playlist = None if cache is None or refresh_cache else cache.get_playlist('', item_attributes=['added_at'])
+        listing = None
+        if cached_playlist and cached_playlist[1] and time.time() - float(cached_playlist[0]) < LIKED_SONGS_RECONCILE_SECONDS:
+            listed_at, cached_ids, cached_items = cached_playlist
+            items, total = _saved_tracks_delta(fetch_page, cached_ids, cached_items)
+            delta = _listing(items, ['added_at'])
+            new_ids = set(delta.track_ids)
+            kept = [(track_id, item) for track_id, item in zip(cached_ids, cached_items) if track_id not in new_ids]
+            kept_ids = [track_id for track_id, _ in kept]
+            # every kept track was cached by the last full listing at the latest, which the reconcile period keeps recent
+            kept_tracks = cache.get_tracks(kept_ids, track_attributes(attributes))
+            fields['new'] = len(delta.track_ids)
+            if total == len(delta.track_ids) + len(kept) and len(kept_tracks) == len(set(kept_ids)):
+                listing = PlaylistListing(delta.track_ids + kept_ids, delta.tracks, delta.items + [item for _, item in kept])
+                fields['mode'] = 'delta'
+        if listing is None:
+            listed_at, kept_tracks = str(time.time()), {}
+            listing = _listing(fetch_all_items(fetch_page, SAVED_TRACKS_PAGE_LIMIT, max_workers, executor), ['added_at'])
+            fields['mode'] = 'full'
+        fields['rows'] = len(listing.track_ids)
+
+    fetched = [trim_track(track, cached_attributes) for track in listing.tracks.values()]
+    if cache is not None and fetched:
+        cache.put_tracks(fetched, cached_attributes)
+        cache.put_playlist('', listed_at, listing.track_ids, listing.items, ['added_at'])
+    listing.tracks = {**kept_tracks, **{track['id']: track for track in fetched}}
+    if 'added_at' not in attributes:
+        listing.items = None
+    return listing
+
+def hydrate_tracks(track_ids: list[str], known_tracks: dict[str, dict] | None = None, cache: TrackCache | None = None,
+                   max_workers: int = FETCH_CONCURRENCY, sp: Spotify | None = None,
+                   executor: Executor | None = None, attributes: list[str] | None = None) -> dict[str, dict]:
+    """
+    Returns a track object for every id, taken from known_tracks, then the cache (if it holds
+    the selected attributes, was fetched less than TRACK_CACHE_TTL_SECONDS ago and no volatile
+    attribute is selected), and only then fetched by id. Each missing track is fetched once.
+    """
+    selected_track_attributes = track_attributes(attributes or DEFAULT_ATTRIBUTES)
+    tracks_by_id = dict(known_tracks or {})
+    unknown_ids = [track_id for track_id in dict.fromkeys(track_ids) if track_id not in tracks_by_id]
+    if cache is not None and unknown_ids and not _has_volatile(selected_track_attributes):
+        tracks_by_id.update(cache.get_tracks(unknown_ids, selected_track_attributes, TRACK_CACHE_TTL_SECONDS))
+        unknown_ids = [track_id for track_id in unknown_ids if track_id not in tracks_by_id]
+    if unknown_ids:
+        # full track objects come back from the tracks endpoint, keep every known attribute for later selections
+        cached_attributes = list(dict.fromkeys(KNOWN_TRACK_ATTRIBUTES + tuple(selected_track_attributes)))
+        fetched = [trim_track(track, cached_attributes) for track in fetch_tracks_by_id(unknown_ids, max_workers, sp, executor)]
+        if cache is not None:
+            cache.put_tracks(fetched, cached_attributes)
+        tracks_by_id.update((track['id'], track) for track in fetched)
+    return tracks_by_id
+
+def get_playlist_tracks(playlist_id: str, max_workers: int = FETCH_CONCURRENCY, sp: Spotify | None = None,
+                        use_cache: bool = True, refresh_cache: bool = False,
+                        attributes: list[str] | None = None) -> tuple[list[dict | None], list[dict] | None]:
+    """
+    Returns (tracks, items): the track objects of a playlist ('' for Liked Songs) in playlist order,
+    and the items around them when item level attributes such as 'added_at' are selected.
+    With the cache enabled, the network is skipped (apart from a snapshot_id check) when the playlist
+    has not changed since the last run. When it has changed, only a lightweight id listing is fetched
+    and the tracks missing from the cache are fetched by id.
+    refresh_cache ignores any cached playlist and refetches everything.
+    """
+    cache = get_track_cache() if use_cache else None
+    listing = list_playlist_tracks(playlist_id, max_workers, sp, cache, refresh_cache, attributes=attributes)
+    tracks_by_id = hydrate_tracks(listing.track_ids, listing.tracks, cache, max_workers, sp, attributes=attributes)
+    return [tracks_by_id.get(track_id) for track_id in listing.track_ids], listing.items
+
+
+def get_tracks_to_df(playlist_id: str, attributes: list[str], max_workers: int = FETCH_CONCURRENCY, sp: Spotify | None = None,
+                     use_cache: bool = True, refresh_cache: bool = False) -> pd.DataFrame | None:
+    """
+    Fetches tracks and converts them to a DataFrame.
+    Uses global sp_global unless a client is passed in (e.g. one pointed at a local stub API).
+    Playlist tracks are served from the local track cache when the playlist is unchanged,
+    use_cache=False bypasses the cache and refresh_cache=True rebuilds it.
+    The DataFrame is compacted (categorical names, small integers, datetimes, see table.py).
+    """
+    sp = sp or client.sp_global
+    if not sp: return None
+    import pandas as pd
+
+    row_builder = RowBuilder(attributes)
+    with span('fetch', playlist_id=playlist_id) as fields:
+        all_tracks, items = get_playlist_tracks(playlist_id, max_workers, sp, use_cache=use_cache, refresh_cache=refresh_cache,
+                                                attributes=attributes)
+        fields['rows'] = len(all_tracks)
+    with span('build_rows') as fields:
+        items = items or [None] * len(all_tracks)
+        all_rows_data = [row_builder.row(track_data, item) for track_data, item in zip(all_tracks, items)
+                         if track_data and track_data.get('id') is not None]
+        fields['rows'] = len(all_rows_data)
+
+    if not all_rows_data:
+        return pd.DataFrame(columns=row_builder.columns)
+    entities = None
+    if row_builder.enrichment_columns:
+        with span('fetch_enrichment', rows=len(all_rows_data)):
+            entities = fetch_enrichment(enrichment_ids(row_builder, all_rows_data), get_track_cache() if use_cache else None,
+                                        max_workers, sp)
+    with span('dataframe', rows=len(all_rows_data)):
+        df = pd.DataFrame(all_rows_data, columns=row_builder.columns)
+    if entities is not None:
+        with span('enrich', rows=len(df)):
+            enrich_frame(df, row_builder, entities)
+    with span('compact', rows=len(df)) as fields:
+        df = compact_tracks(df)
+        fields['table_bytes'] = table_bytes(df)
+    return df
+
+
+def iter_track_row_batches(playlist_id: str, attributes: list[str], max_workers: int = FETCH_CONCURRENCY,
+                           sp: Spotify | None = None) -> tuple[list[str], Iterator[list[list]]]:
+    """
+    Streaming counterpart of get_tracks_to_df: returns (output_columns, row_batches) where
+    row_batches yields the rows of each API page, in playlist order, as soon as the page arrives.
+    Nothing is accumulated (and the track cache is not used), so memory stays flat for any playlist size;
+    only the artists / albums of enrichment attributes are kept, to look each one up once.
+    """
+    sp = sp or client.sp_global
+    row_builder = RowBuilder(attributes)
+    if playlist_id == '':
+        fetch_page, page_limit = (lambda offset, limit: sp.current_user_saved_tracks(limit=limit, offset=offset)), SAVED_TRACKS_PAGE_LIMIT
+    else:
+        fetch_page, page_limit = (lambda offset, limit: sp.playlist_items(playlist_id, limit=limit, offset=offset, fields=row_builder.fields)), PLAYLIST_PAGE_LIMIT
+
+    def row_batches():
+        row = row_builder.row
+        cache = get_track_cache() if row_builder.enrichment_columns else None
+        entities = {}
+        for page in iter_pages(fetch_page, page_limit, max_workers):
+            rows = [row(item['track'], item) for item in _valid_items(page.get('items', []))]
+            if row_builder.enrichment_columns:
+                entities = fetch_enrichment(enrichment_ids(row_builder, rows), cache, max_workers, sp, known=entities)
+                enrich_rows(rows, row_builder, entities)
+            yield rows
+
+    return row_builder.columns, row_batches()
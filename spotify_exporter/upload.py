@@ -0,0 +1,190 @@
+"""
+Bulk writes of track lists to playlists: creating a playlist from a file, or appending to / syncing an existing one.
+
+Progress is checkpointed to disk after every request. An interrupted upload is resumed by running it
+again: the playlist created by the first attempt is reused, and what is left to send is computed from
+the playlist's current contents, so a retried upload never adds a track twice.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from . import client
+from .client import call_with_retries, current_user_id, get_client
+from .config import PLAYLIST_WRITE_LIMIT, get_upload_checkpoint_dir
+from .errors import OperationCancelled, UploadError
+from .tracks import list_playlist_tracks, reference_pattern
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from spotipy import Spotify
+
+UPLOAD_MODES = ('create', 'append', 'sync')
+
+_TRACK_ID_PATTERN = re.compile(r'[0-9A-Za-z]{22}')
+_TRACK_REFERENCE_PATTERN = reference_pattern('track')
+
+
+def parse_track_id(value) -> str | None:
+    """Track id of a bare id, a 'spotify:track:' URI or an open.spotify.com track link; None for anything else."""
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if _TRACK_ID_PATTERN.fullmatch(value):
+        return value
+    match = _TRACK_REFERENCE_PATTERN.search(value)
+    return match.group(1) if match else None
+
+
+@dataclass
+class CleanedTrackIds:
+    track_ids: list[str]
+    invalid: list[str] = field(default_factory=list)
+    duplicate_count: int = 0
+
+
+def clean_track_ids(values: Iterable) -> CleanedTrackIds:
+    """Parses ids, URIs and links to bare track ids, keeping the first occurrence of each and setting invalid values aside."""
+    cleaned = CleanedTrackIds([])
+    seen = set()
+    for value in values:
+        track_id = parse_track_id(value)
+        if track_id is None:
+            cleaned.invalid.append(str(value))
+        elif track_id in seen:
+            cleaned.duplicate_count += 1
+        else:
+            seen.add(track_id)
+            cleaned.track_ids.append(track_id)
+    return cleaned
+
+
+@dataclass
+class UploadResult:
+    """Outcome of an upload. invalid and duplicate_count describe the input, added / removed what was sent."""
+    playlist_id: str
+    name: str
+    url: str
+    mode: str
+    track_count: int
+    added: int = 0
+    removed: int = 0
+    invalid: list[str] = field(default_factory=list)
+    duplicate_count: int = 0
+    resumed: bool = False
+
+
+class UploadCheckpoint:
+    """Progress of one upload, persisted as JSON under the cache dir and keyed by a caller supplied string."""
+    def __init__(self, key: str):
+        self.path = os.path.join(get_upload_checkpoint_dir(), hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+        self.data = {}
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def save(self):
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: Could not save upload progress to {self.path}: {e}")
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _find_playlist(sp: Spotify, playlist_id: str) -> dict | None:
+    from spotipy import SpotifyException
+
+    try:
+        return call_with_retries(sp.playlist, playlist_id, fields='id,name,external_urls')
+    except SpotifyException as e:
+        if e.http_status == 404:
+            return None
+        raise
+
+
+def upload_tracks(track_ids: list[str], mode: str = 'create', playlist_name: str | None = None,
+                  playlist_id: str | None = None, checkpoint_key: str | None = None, sp: Spotify | None = None) -> UploadResult:
+    """
+    Writes cleaned track ids (see clean_track_ids) to a playlist.
+    'create' makes a new private playlist called playlist_name, 'append' adds the tracks that playlist_id
+    does not have yet and 'sync' also removes the tracks of playlist_id that are not in track_ids
+    (the order of tracks already in the playlist is left alone). Only the difference is sent, in requests
+    of PLAYLIST_WRITE_LIMIT tracks that are retried on 429 / 5xx responses.
+    checkpoint_key identifies the upload for resuming, e.g. the source file and playlist name.
+    Raises UploadError if a request fails for good; progress is kept either way (also when cancelled).
+    """
+    if mode not in UPLOAD_MODES:
+        raise ValueError(f"Unknown upload mode '{mode}', expected one of: {', '.join(UPLOAD_MODES)}.")
+    sp = sp or get_client()
+    checkpoint = UploadCheckpoint(checkpoint_key or f"{mode}|{playlist_id or playlist_name}|{len(track_ids)}")
+    resumed = checkpoint.load()
+
+    playlist = None
+    if mode == 'create':
+        if resumed and checkpoint.data.get('playlist_id'):
+            playlist = _find_playlist(sp, checkpoint.data['playlist_id'])
+        if playlist is None:
+            user_id = current_user_id(sp)
+            playlist = call_with_retries(sp.user_playlist_create, user=user_id, name=playlist_name, public=False)
+            resumed = False
+            checkpoint.data = {'playlist_id': playlist['id'], 'added': 0, 'removed': 0}
+            checkpoint.save()
+    else:
+        playlist = _find_playlist(sp, playlist_id)
+        if playlist is None:
+            raise UploadError(f"Playlist {playlist_id} does not exist or is not accessible.")
+        if not resumed:
+            checkpoint.data = {'playlist_id': playlist['id'], 'added': 0, 'removed': 0}
+    playlist_id = playlist['id']
+
+    # the live contents decide what is left to send, so requests that went through before an interruption are not repeated
+    current_ids = list_playlist_tracks(playlist_id, sp=sp, attributes=['id']).track_ids if resumed or mode != 'create' else []
+    current = set(current_ids)
+    wanted = set(track_ids)
+    to_add = [track_id for track_id in track_ids if track_id not in current]
+    to_remove = list(dict.fromkeys(track_id for track_id in current_ids if track_id not in wanted)) if mode == 'sync' else []
+
+    requests = [(sp.playlist_remove_all_occurrences_of_items, 'removed', to_remove[i:i + PLAYLIST_WRITE_LIMIT])
+                for i in range(0, len(to_remove), PLAYLIST_WRITE_LIMIT)]
+    requests += [(sp.playlist_add_items, 'added', to_add[i:i + PLAYLIST_WRITE_LIMIT])
+                 for i in range(0, len(to_add), PLAYLIST_WRITE_LIMIT)]
+    result = UploadResult(playlist_id, playlist.get('name') or playlist_name or '',
+                          (playlist.get('external_urls') or {}).get('spotify', 'N/A'), mode, len(track_ids), resumed=resumed)
+    tracker = client.progress_global
+    if tracker is not None:
+        tracker.add_work(len(requests), len(to_add) + len(to_remove))
+    for write, counter, batch in requests:
+        try:
+            call_with_retries(write, playlist_id, batch)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            raise UploadError(f"Upload to '{result.name}' stopped after {result.added} added and {result.removed} removed tracks: {e}. "
+                              f"Run it again to resume.") from e
+        setattr(result, counter, getattr(result, counter) + len(batch))
+        checkpoint.data[counter] = checkpoint.data.get(counter, 0) + len(batch)
+        checkpoint.save()
+        if tracker is not None:
+            tracker.page_done(len(batch))
+
+    checkpoint.delete()
+    return result
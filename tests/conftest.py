@@ -0,0 +1,43 @@
+"""Fixtures serving a small synthetic library through the fake Spotify API of benchmarks/fake_spotify.py."""
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+from fake_spotify import FakeLibrary, FakeSpotifyServer, make_client  # noqa: E402
+
+from spotify_exporter import cache, config, playlist_index, track_index  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path):
+    """Keeps every cache in a temporary directory and drops the process wide cache objects around each test."""
+    def reset():
+        cache.track_cache_global = None
+        playlist_index.playlist_index_global = None
+        track_index.track_index_global = None
+
+    reset()
+    config.set_cache_dir(str(tmp_path))
+    yield str(tmp_path)
+    reset()
+
+
+@pytest.fixture
+def library():
+    return FakeLibrary(saved_tracks=30, playlist_count=120, default_playlist_size=20)
+
+
+@pytest.fixture
+def server(library):
+    with FakeSpotifyServer(library) as server:
+        yield server
+
+
+@pytest.fixture
+def sp(server):
+    return make_client(server.url)
@@ -0,0 +1,24 @@
+import pytest
+
+from spotify_exporter import api, cli, client
+from spotify_exporter.errors import PlaylistNotFoundError, SpotifyExporterError
+
+MISSING_PLAYLIST_LINK = 'https://open.spotify.com/playlist/P999999999999999999999'
+
+
+def test_missing_playlist_link_raises_playlist_not_found(sp, tmp_path):
+    with pytest.raises(PlaylistNotFoundError):
+        api.export_playlist(MISSING_PLAYLIST_LINK, str(tmp_path / 'export.csv'), sp=sp)
+
+
+def test_upload_to_missing_playlist_raises_exporter_error(sp, tmp_path):
+    path = tmp_path / 'tracks.csv'
+    path.write_text('id\nT000000000000000000001\n')
+    with pytest.raises(SpotifyExporterError):
+        api.create_playlist_from_file(str(path), sp=sp, mode='append', target_playlist=MISSING_PLAYLIST_LINK)
+
+
+def test_cli_reports_spotify_errors_without_a_traceback(sp, monkeypatch, capsys):
+    monkeypatch.setattr(client, 'sp_global', sp)
+    assert cli.main(['export', MISSING_PLAYLIST_LINK, '-o', 'unused.csv']) == 1
+    assert capsys.readouterr().err.startswith('Error: Not found on Spotify')
@@ -0,0 +1,27 @@
+import os
+
+from fake_spotify import playlist_id
+
+from spotify_exporter.batch import export_batch
+from spotify_exporter.formats import read_table
+
+
+def _link(pid: str) -> str:
+    return f"https://open.spotify.com/playlist/{pid}?si=abc"
+
+
+def test_links_are_labelled_with_the_playlist_name(sp, library, tmp_path):
+    library.rename(playlist_id(3), 'Road Trip')
+    result = export_batch([_link(playlist_id(3)), 'Playlist 4', _link('P999999999999999999999')], str(tmp_path / 'out'),
+                          output_format='.csv', requests_per_second=None, sp=sp)
+    assert [report.label for report in result.reports] == ['Road Trip', 'Playlist 4', 'P999999999999999999999']
+    assert sorted(os.listdir(tmp_path / 'out')) == ['Playlist 4.csv', 'Road Trip.csv']
+    assert result.failed[0].playlist_id == 'P999999999999999999999'
+
+
+def test_combined_export_names_each_playlist(sp, tmp_path):
+    combined_path = str(tmp_path / 'all.csv')
+    result = export_batch([_link(playlist_id(3)), 'liked'], combined_path=combined_path, output_format='.csv',
+                          requests_per_second=None, sp=sp)
+    assert result.combined_path == combined_path
+    assert list(read_table(combined_path)['playlist'].unique()) == ['Playlist 3', 'Liked Songs']
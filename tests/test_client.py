@@ -0,0 +1,95 @@
+import pytest
+from fake_spotify import playlist_id, track_id
+from spotipy import SpotifyException
+
+from spotify_exporter import api, client
+from spotify_exporter.client import RateLimiter, call_with_retries, fetch_all_items
+from spotify_exporter.config import MAX_REQUEST_RETRIES
+from spotify_exporter.errors import SpotifyAPIError
+
+
+class RecordingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(1000)
+        self.pauses = []
+
+    def pause(self, seconds: float):
+        self.pauses.append(seconds)
+        super().pause(seconds)
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(client, 'RETRY_BACKOFF_SECONDS', 0.01)
+    limiter = RecordingLimiter()
+    monkeypatch.setattr(client, 'rate_limiter_global', limiter)
+    return limiter
+
+
+def test_server_errors_are_retried_once_each_without_pausing_the_limiter(sp, library, limiter):
+    library.fail_next(4) # more than urllib3 would have retried on its own
+    requests_before = library.request_count
+    assert call_with_retries(sp.me)['id'] == library.user_id
+    assert library.request_count - requests_before == 5
+    assert limiter.pauses == []
+
+
+def test_rate_limits_pause_the_limiter(sp, library, limiter):
+    library.set_rate_limit_every(1)
+    library.retry_after_seconds = 0
+    with pytest.raises(SpotifyException):
+        call_with_retries(sp.me)
+    assert len(limiter.pauses) == MAX_REQUEST_RETRIES
+
+
+def test_persistent_server_errors_raise_spotify_api_error(sp, library, limiter):
+    library.fail_next(MAX_REQUEST_RETRIES + 1, status=503)
+    with pytest.raises(SpotifyAPIError) as raised:
+        api.resolve_playlist('Playlist 1', sp)
+    assert raised.value.http_status == 503
+    assert limiter.pauses == []
+
+
+def _playlist_pages(sp, pid: str, after_first_page=None):
+    """fetch_page of a playlist's ids; after_first_page runs once the first page came back."""
+    def fetch_page(offset, limit):
+        page = sp.playlist_items(pid, limit=limit, offset=offset, fields='items(track(id)),total')
+        if offset == 0 and after_first_page is not None:
+            after_first_page()
+        return page
+    return fetch_page
+
+
+def _ids(items: list[dict]) -> list[str]:
+    return [item['track']['id'] for item in items]
+
+
+def test_pages_fetched_out_of_order_keep_playlist_order(sp, library):
+    library.playlist_sizes[2] = 1000
+    library.jitter_ms = 20
+    requests_before = library.request_count
+    items = fetch_all_items(_playlist_pages(sp, playlist_id(2)), 100, max_workers=8)
+    assert _ids(items) == [track_id(n) for n in range(2000, 3000)]
+    assert library.request_count - requests_before == 10
+
+
+def test_a_failed_page_is_retried_alone(sp, library, monkeypatch):
+    monkeypatch.setattr(client, 'RETRY_BACKOFF_SECONDS', 0.01)
+    library.playlist_sizes[2] = 1000
+    requests_before = library.request_count
+    items = fetch_all_items(_playlist_pages(sp, playlist_id(2), lambda: library.fail_next(1)), 100, max_workers=8)
+    assert _ids(items) == [track_id(n) for n in range(2000, 3000)]
+    assert library.request_count - requests_before == 11
+
+
+def test_total_changing_part_way_relists(sp, library):
+    library.playlist_sizes[2] = 250
+    removed = [track_id(n) for n in range(2000, 2005)]
+    edits = [lambda: sp.playlist_remove_all_occurrences_of_items(playlist_id(2), removed)]
+
+    def edit_once():
+        if edits:
+            edits.pop()()
+
+    items = fetch_all_items(_playlist_pages(sp, playlist_id(2), edit_once), 100, max_workers=8)
+    assert _ids(items) == [track_id(n) for n in range(2005, 2250)]
@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+import pytest
+
+from spotify_exporter.diff import diff_tracks, load_snapshot, save_snapshot
+from spotify_exporter.formats import read_table, write_sheets
+from spotify_exporter.table import compact_tracks
+
+
+def _tracks(ids: list[str], **columns) -> pd.DataFrame:
+    return compact_tracks(pd.DataFrame({'id': ids, 'name': [f"Track {track_id}" for track_id in ids], **columns}))
+
+
+def test_added_removed_and_changed_tracks():
+    old = _tracks(['a', 'b', 'c'], duration_ms=[1000, 2000, 3000])
+    new = _tracks(['a', 'c', 'd'], duration_ms=[1000, 3500, 4000])
+    diff = diff_tracks(old, new)
+    assert list(diff.added['id']) == ['d']
+    assert list(diff.removed['id']) == ['b']
+    assert list(diff.combined['id']) == ['a', 'c', 'd', 'b']
+    assert diff.changed[['id', 'field', 'old_value', 'new_value']].values.tolist() == [['c', 'duration_ms', 3000, 3500]]
+    assert diff.moved.empty
+    assert set(diff.to_sheets()) == {'AllSongs', 'MissingFromCurrentPlaylist', 'NewlyAddedToPlaylist', 'ChangedTracks'}
+
+
+def test_track_moved_to_the_end_is_one_move():
+    ids = [str(n) for n in range(10)]
+    diff = diff_tracks(_tracks(ids), _tracks(ids[1:] + ids[:1]))
+    assert diff.moved.values.tolist() == [['0', 'Track 0', 1, 10]]
+    assert diff.added.empty and diff.removed.empty and diff.changed.empty
+
+
+def test_numbers_read_back_by_excel_equal_their_text():
+    # a track called '1999' that Excel typed as a number when the file was saved again
+    old = pd.DataFrame({'id': ['a', 'b'], 'name': [1999, 2000]})
+    new = _tracks(['a', 'b'])
+    new['name'] = ['1999', '2001']
+    assert diff_tracks(old, new).changed[['id', 'old_value', 'new_value']].values.tolist() == [['b', 2000, '2001']]
+
+
+@pytest.mark.parametrize('extension', ['.xlsx', '.csv'])
+def test_empty_text_read_back_as_na_is_unchanged(tmp_path, extension):
+    df = compact_tracks(pd.DataFrame({'id': ['a', 'b', 'c'], 'name': ['A', 'B', 'C'], 'artist-genres': ['', 'pop', ''],
+                                      'isrc': ['X1', '', 'X3']}))
+    path = str(tmp_path / f"export{extension}")
+    write_sheets({'AllSongs': df}, path)
+    assert diff_tracks(compact_tracks(read_table(path)), df).changed.empty
+
+
+def test_snapshot_is_reused_until_the_file_changes(tmp_path):
+    df = _tracks(['a', 'b'], duration_ms=[1000, 2000])
+    path = str(tmp_path / 'export.xlsx')
+    write_sheets({'AllSongs': df}, path)
+    assert save_snapshot(path, df)
+    pd.testing.assert_frame_equal(load_snapshot(path), df)
+
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10)) # e.g. saved again in Excel
+    assert load_snapshot(path) is None
@@ -0,0 +1,24 @@
+from fake_spotify import LABELS, make_artist, playlist_id
+
+from spotify_exporter.tracks import get_tracks_to_df
+
+ATTRIBUTES = ['id', 'name', 'artist.genres', 'artist.popularity', 'album.label']
+
+
+def test_enrichment_columns_and_requests(sp, library):
+    library.playlist_sizes[2] = 100
+    requests_before = library.request_count
+    df = get_tracks_to_df(playlist_id(2), ATTRIBUTES, sp=sp)
+    # the snapshot_id, one page of tracks, 100 distinct artists in 2 calls and 9 distinct albums in 1
+    assert library.request_count - requests_before == 5
+    assert list(df.columns) == ['id', 'name', 'artist-genres', 'artist-popularity', 'album-label']
+
+    artist = make_artist(2005)
+    row = df.iloc[5]
+    assert row['artist-genres'] == ", ".join(artist['genres'])
+    assert row['artist-popularity'] == artist['popularity']
+    assert row['album-label'] == LABELS[(2005 // 12) % len(LABELS)]
+
+    requests_before = library.request_count
+    get_tracks_to_df(playlist_id(2), ATTRIBUTES, sp=sp)
+    assert library.request_count - requests_before == 1 # artists and albums come from the cache
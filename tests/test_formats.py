@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from spotify_exporter.formats import read_table, write_sheets
+from spotify_exporter.table import compact_tracks
+
+RELEASE_DATES = ['1999', '2001-05', '2001-05-03']
+
+
+@pytest.mark.parametrize('extension', ['.xlsx', '.csv', '.ndjson', '.parquet', '.feather'])
+def test_release_dates_keep_their_precision(tmp_path, extension):
+    df = compact_tracks(pd.DataFrame({'id': ['a', 'b', 'c'], 'album-release_date': RELEASE_DATES}))
+    path = str(tmp_path / f"export{extension}")
+    write_sheets({'AllSongs': df}, path)
+    assert list(read_table(path)['album-release_date'].astype(str)) == RELEASE_DATES
+
+
+def test_years_only_csv_column_reads_back_as_text(tmp_path):
+    path = str(tmp_path / 'export.csv')
+    write_sheets({'AllSongs': pd.DataFrame({'id': ['a', 'b'], 'album-release_date': ['1999', '2004']})}, path)
+    assert list(read_table(path)['album-release_date']) == ['1999', '2004']
+
+
+def test_excel_release_dates_are_text(tmp_path):
+    from openpyxl import load_workbook
+
+    path = str(tmp_path / 'export.xlsx')
+    write_sheets({'AllSongs': compact_tracks(pd.DataFrame({'id': ['a', 'b', 'c'], 'album-release_date': RELEASE_DATES}))}, path)
+    sheet = load_workbook(path).active
+    assert [row[0] for row in sheet.iter_rows(min_row=2, min_col=2, values_only=True)] == RELEASE_DATES
@@ -0,0 +1,72 @@
+from fake_spotify import track_id
+
+from spotify_exporter import cache
+from spotify_exporter.config import LIKED_SONGS_RECONCILE_SECONDS, TRACK_CACHE_TTL_SECONDS
+from spotify_exporter.tracks import get_tracks_to_df
+
+ATTRIBUTES = ['id', 'name']
+
+
+def _liked_songs(sp):
+    return get_tracks_to_df('', ATTRIBUTES, sp=sp)
+
+
+def _requests(library, sp) -> tuple[int, list[str]]:
+    requests_before = library.request_count
+    ids = list(_liked_songs(sp)['id'])
+    return library.request_count - requests_before, ids
+
+
+def _age_cached_tracks(seconds: float):
+    track_cache = cache.get_track_cache()
+    with track_cache._conn:
+        track_cache._conn.execute("UPDATE tracks SET fetched_at = fetched_at - ?", (seconds,))
+
+
+def _age_listing(seconds: float):
+    """Moves the last full listing of Liked Songs (kept as its snapshot_id) back in time."""
+    track_cache = cache.get_track_cache()
+    with track_cache._conn:
+        track_cache._conn.execute("UPDATE playlists SET snapshot_id = CAST(snapshot_id - ? AS TEXT) WHERE playlist_id = ''",
+                                  (seconds,))
+
+
+def test_new_likes_are_merged_in_front(sp, library):
+    library.saved_tracks = 500
+    requests, ids = _requests(library, sp)
+    assert requests == 10 and len(ids) == 500
+
+    for night in range(2):
+        _age_cached_tracks(TRACK_CACHE_TTL_SECONDS + 1) # kept tracks are not refetched by id once they are older than the TTL
+        new_ids = library.like(3)
+        requests, merged = _requests(library, sp)
+        assert requests == 1
+        assert merged == new_ids + ids
+        ids = merged
+
+
+def test_liked_again_moves_to_the_top(sp, library):
+    library.saved_tracks = 500
+    _, ids = _requests(library, sp)
+    library.relike([ids[250]])
+    requests, merged = _requests(library, sp)
+    assert requests == 1
+    assert merged == [ids[250]] + ids[:250] + ids[251:]
+
+
+def test_unlike_relists_in_full(sp, library):
+    library.saved_tracks = 500
+    _, ids = _requests(library, sp)
+    library.unlike([ids[100]])
+    new_ids = library.like(2)
+    requests, merged = _requests(library, sp)
+    assert requests == 1 + 11 # the delta's total does not add up: 501 likes listed again in 11 pages
+    assert merged == new_ids + ids[:100] + ids[101:]
+
+
+def test_reconcile_period_relists_in_full(sp, library):
+    library.saved_tracks = 500
+    _requests(library, sp)
+    _age_listing(LIKED_SONGS_RECONCILE_SECONDS + 1)
+    requests, ids = _requests(library, sp)
+    assert requests == 10 and ids[-1] == track_id(499)
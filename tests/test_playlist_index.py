@@ -0,0 +1,62 @@
+import os
+import time
+
+from fake_spotify import FakeLibrary, FakeSpotifyServer, make_client, playlist_id
+
+from spotify_exporter import playlist_index
+from spotify_exporter.config import get_playlist_index_path
+from spotify_exporter.playlist_index import PlaylistIndex, find_playlist_id, get_playlist_index
+
+
+def _expire(index: PlaylistIndex):
+    index.built_at = time.time() - index.ttl_seconds - 1
+
+
+def test_lookup_lists_every_page(sp, library):
+    assert find_playlist_id('Playlist 0', sp) == playlist_id(0)
+    assert find_playlist_id('playlist 119', sp) == playlist_id(119)
+    assert len(get_playlist_index(sp).playlists) == library.playlist_count
+
+
+def test_index_is_reused_from_disk(sp, library):
+    get_playlist_index(sp)
+    playlist_index.playlist_index_global = None
+    requests_before = library.request_count
+    assert find_playlist_id('Playlist 119', sp) == playlist_id(119)
+    assert library.request_count == requests_before
+
+
+def test_ttl_expiry_picks_up_renames_past_the_first_page(sp, library):
+    index = get_playlist_index(sp)
+    library.rename(playlist_id(100), 'Renamed')
+    _expire(index)
+    assert find_playlist_id('Renamed', sp) == playlist_id(100)
+    assert find_playlist_id('Playlist 100', sp) is None
+
+
+def test_lookup_miss_relists(sp, library):
+    index = get_playlist_index(sp)
+    library.rename(playlist_id(100), 'Renamed')
+    index.built_at -= playlist_index.PLAYLIST_INDEX_MIN_REFRESH_SECONDS + 1
+    assert find_playlist_id('Renamed', sp) == playlist_id(100)
+    assert index.find('Playlist 100') is None
+
+
+def test_lookup_miss_does_not_relist_right_after_a_refresh(sp, library):
+    get_playlist_index(sp)
+    requests_before = library.request_count
+    assert find_playlist_id('No such playlist', sp) is None
+    assert library.request_count == requests_before
+
+
+def test_index_is_kept_per_user(sp, library):
+    get_playlist_index(sp)
+    other_library = FakeLibrary(playlist_count=3, user_id='otheruser')
+    with FakeSpotifyServer(other_library) as other_server:
+        other_sp = make_client(other_server.url)
+        other_index = get_playlist_index(other_sp)
+        assert len(other_index.playlists) == 3
+        assert find_playlist_id('Playlist 100', other_sp) is None
+    assert os.path.exists(get_playlist_index_path(library.user_id))
+    assert os.path.exists(get_playlist_index_path('otheruser'))
+    assert find_playlist_id('Playlist 100', sp) == playlist_id(100)
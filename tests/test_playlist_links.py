@@ -0,0 +1,30 @@
+import pytest
+
+from fake_spotify import playlist_id
+
+from spotify_exporter.batch import resolve_playlists
+from spotify_exporter.tracks import id_helper_url
+
+PLAYLIST_ID = '37i9dQZF1DXcBWIGoYBM5M'
+
+
+@pytest.mark.parametrize('reference', [
+    f"https://open.spotify.com/playlist/{PLAYLIST_ID}",
+    f"https://open.spotify.com/playlist/{PLAYLIST_ID}?si=0123abcd",
+    f"https://open.spotify.com/intl-de/playlist/{PLAYLIST_ID}",
+    f"open.spotify.com/playlist/{PLAYLIST_ID}",
+    f"spotify:playlist:{PLAYLIST_ID}",
+])
+def test_id_helper_url_finds_the_id(reference):
+    assert id_helper_url(reference) == PLAYLIST_ID
+
+
+@pytest.mark.parametrize('reference', ['My Playlist', 'https://open.spotify.com/playlist/short',
+                                       f"https://open.spotify.com/track/{PLAYLIST_ID}"])
+def test_id_helper_url_without_a_playlist_link(reference):
+    assert id_helper_url(reference) is None
+
+
+def test_batch_resolves_links_and_names(sp):
+    reports = resolve_playlists([f"https://open.spotify.com/intl-fr/playlist/{playlist_id(7)}?si=x", 'Playlist 8', 'liked'], sp)
+    assert [report.playlist_id for report in reports] == [playlist_id(7), playlist_id(8), '']
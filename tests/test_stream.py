@@ -0,0 +1,43 @@
+import os
+
+import pytest
+from fake_spotify import playlist_id, track_id
+
+from spotify_exporter.api import export_playlist_stream
+from spotify_exporter.errors import ExportError
+from spotify_exporter.formats import read_table
+from spotify_exporter.stream import write_row_batches
+
+
+@pytest.mark.parametrize('extension', ['.xlsx', '.csv', '.ndjson'])
+def test_streamed_export_holds_every_page(sp, library, tmp_path, extension):
+    library.playlist_sizes[2] = 250
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    path = str(output_dir / f"export{extension}")
+    result = export_playlist_stream('Playlist 2', path, ['id', 'name', 'duration_ms'], sp=sp)
+    assert result.playlist_id == playlist_id(2) and result.track_count == 250
+    df = read_table(path)
+    assert list(df.columns) == ['id', 'name', 'duration_ms']
+    assert list(df['id']) == [track_id(n) for n in range(2000, 2250)]
+    assert os.listdir(output_dir) == [os.path.basename(path)]
+
+
+def test_writer_errors_raise_export_error_and_keep_the_old_file(tmp_path):
+    path = tmp_path / 'export.xlsx'
+    path.write_bytes(b'previous export')
+    batches = iter([[[track_id(1), 'Fine']], [[track_id(2), 'Bell \x07 in the title']]])
+    with pytest.raises(ExportError):
+        write_row_batches(str(path), ['id', 'name'], batches)
+    assert path.read_bytes() == b'previous export'
+    assert os.listdir(tmp_path) == ['export.xlsx']
+
+
+def test_fetch_errors_are_passed_on_without_a_partial_file(tmp_path):
+    def batches():
+        yield [[track_id(1), 'Fine']]
+        raise ConnectionError('lost')
+
+    with pytest.raises(ConnectionError):
+        write_row_batches(str(tmp_path / 'export.csv'), ['id', 'name'], batches())
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,16 @@
+from fake_spotify import playlist_id
+
+from spotify_exporter.trace import Trace, instrument_client, take_response_info, tracing
+from spotify_exporter.tracks import get_tracks_to_df
+
+
+def test_responses_are_only_recorded_while_tracing(sp):
+    instrument_client(sp)
+    sp.playlist(playlist_id(1), fields='snapshot_id')
+    assert take_response_info() == (None, 0)
+
+    with tracing(Trace()) as trace:
+        get_tracks_to_df(playlist_id(1), ['id', 'name'], sp=sp)
+    endpoints = trace.summary()['endpoints']
+    assert endpoints['GET playlists/{id}/items']['calls'] == 1
+    assert endpoints['GET playlists/{id}/items']['bytes'] > 0
@@ -0,0 +1,74 @@
+import fake_spotify
+from fake_spotify import playlist_id, track_id
+
+from spotify_exporter import cache
+from spotify_exporter.config import TRACK_CACHE_TTL_SECONDS
+from spotify_exporter.tracks import get_tracks_to_df
+
+
+def _edit_tracks(monkeypatch):
+    """From now on the fake API serves every track with a new name and popularity."""
+    make_track = fake_spotify.make_track
+
+    def edited(index):
+        track = make_track(index)
+        track.update(name=track['name'] + ' (Remastered)', popularity=(track['popularity'] + 1) % 101)
+        return track
+
+    monkeypatch.setattr(fake_spotify, 'make_track', edited)
+    monkeypatch.setitem(fake_spotify.BATCH_ENDPOINTS, 'tracks', (edited, fake_spotify.BATCH_ENDPOINTS['tracks'][1]))
+
+
+def _age_cached_tracks(seconds: float):
+    track_cache = cache.get_track_cache()
+    with track_cache._conn:
+        track_cache._conn.execute("UPDATE tracks SET fetched_at = fetched_at - ?", (seconds,))
+
+
+def test_popularity_is_never_served_from_the_cache(sp, monkeypatch):
+    attributes = ['id', 'name', 'popularity']
+    before = get_tracks_to_df(playlist_id(5), attributes, sp=sp)
+    _edit_tracks(monkeypatch)
+    after = get_tracks_to_df(playlist_id(5), attributes, sp=sp)
+    assert list(after['popularity']) == [(popularity + 1) % 101 for popularity in before['popularity']]
+
+
+def test_cached_tracks_expire(sp, monkeypatch):
+    attributes = ['id', 'name']
+    get_tracks_to_df(playlist_id(5), attributes, sp=sp)
+    _edit_tracks(monkeypatch)
+    sp.playlist_add_items(playlist_id(5), [f"spotify:track:{track_id(5100)}"])
+    assert get_tracks_to_df(playlist_id(5), attributes, sp=sp)['name'].iloc[0] == 'Track 5000'
+
+    _age_cached_tracks(TRACK_CACHE_TTL_SECONDS + 1)
+    sp.playlist_add_items(playlist_id(5), [f"spotify:track:{track_id(5101)}"])
+    assert get_tracks_to_df(playlist_id(5), attributes, sp=sp)['name'].iloc[0] == 'Track 5000 (Remastered)'
+
+
+def test_stale_tracks_are_refreshed_by_one_full_listing(sp, library):
+    library.playlist_sizes[5] = 500
+    attributes = ['id', 'name']
+    requests_before = library.request_count
+    get_tracks_to_df(playlist_id(5), attributes, sp=sp)
+    assert library.request_count - requests_before == 6 # the snapshot_id and 5 pages
+
+    _age_cached_tracks(TRACK_CACHE_TTL_SECONDS + 1)
+    sp.playlist_add_items(playlist_id(5), [f"spotify:track:{track_id(5999)}"])
+    requests_before = library.request_count
+    assert len(get_tracks_to_df(playlist_id(5), attributes, sp=sp)) == 501
+    # the snapshot_id and 6 pages, not the ids-only listing plus 11 calls of 50 ids
+    assert library.request_count - requests_before == 7
+
+    requests_before = library.request_count
+    get_tracks_to_df(playlist_id(5), attributes, sp=sp)
+    assert library.request_count - requests_before == 1
+
+
+def test_unchanged_playlist_is_served_from_the_cache_past_the_ttl(sp, library, monkeypatch):
+    attributes = ['id', 'name']
+    get_tracks_to_df(playlist_id(5), attributes, sp=sp)
+    _edit_tracks(monkeypatch)
+    _age_cached_tracks(TRACK_CACHE_TTL_SECONDS + 1)
+    requests_before = library.request_count
+    assert get_tracks_to_df(playlist_id(5), attributes, sp=sp)['name'].iloc[0] == 'Track 5000'
+    assert library.request_count - requests_before == 1 # the snapshot_id
@@ -0,0 +1,51 @@
+from fake_spotify import playlist_id, track_id
+
+from spotify_exporter import cli, client, track_index
+from spotify_exporter.track_index import update_track_index
+
+
+def _update(sp, **kwargs):
+    return update_track_index(sp=sp, requests_per_second=None, **kwargs)
+
+
+def test_second_update_lists_only_changed_playlists(sp, library):
+    first = _update(sp)
+    assert len(first.listed) == library.playlist_count + 1 # Liked Songs included
+
+    library.rename(playlist_id(3), 'Renamed')
+    sp.playlist_add_items(playlist_id(100), [f"spotify:track:{track_id(500_000)}"])
+    requests_before = library.request_count
+    second = _update(sp)
+    assert sorted(second.listed) == ['Liked Songs', 'Playlist 100', 'Renamed']
+    assert second.unchanged == library.playlist_count - 2
+    assert set(track_index.get_track_index().playlists_of(track_id(500_000))['playlist_id']) == {playlist_id(100)}
+    # the playlist listing (3 pages), the two changed playlists, Liked Songs and the new track: no snapshot_id requests
+    assert library.request_count - requests_before == 7
+
+
+def test_errors_are_kept_per_playlist_id(sp, library, monkeypatch):
+    library.rename(playlist_id(1), 'Same name')
+    library.rename(playlist_id(2), 'Same name')
+    list_playlist_tracks = track_index.list_playlist_tracks
+
+    def failing(playlist_id_, *args, **kwargs):
+        if playlist_id_ in (playlist_id(1), playlist_id(2)):
+            raise RuntimeError(f"cannot list {playlist_id_}")
+        return list_playlist_tracks(playlist_id_, *args, **kwargs)
+
+    monkeypatch.setattr(track_index, 'list_playlist_tracks', failing)
+    update = _update(sp)
+    assert update.errors == {playlist_id(1): ('Same name', f"cannot list {playlist_id(1)}"),
+                             playlist_id(2): ('Same name', f"cannot list {playlist_id(2)}")}
+
+
+def test_track_lookup_works_without_logging_in(sp, monkeypatch, capsys):
+    _update(sp)
+    track_index.track_index_global = None
+
+    def no_login(*args, **kwargs):
+        raise AssertionError("index --track must not log in")
+
+    monkeypatch.setattr(client, 'get_client', no_login)
+    assert cli.main(['index', '--track', f"spotify:track:{track_id(3000)}"]) == 0
+    assert 'Playlist 3' in capsys.readouterr().out
@@ -0,0 +1,78 @@
+import pytest
+from fake_spotify import playlist_id, track_id
+
+from spotify_exporter import client
+from spotify_exporter.errors import UploadError
+from spotify_exporter.upload import clean_track_ids, upload_tracks
+
+BARE_ID = track_id(1)
+
+
+def _created_playlists(library) -> list[str]:
+    return [pid for pid in library._written if pid.startswith('N')]
+
+
+def test_clean_track_ids_parses_and_deduplicates():
+    cleaned = clean_track_ids([
+        BARE_ID,
+        f"spotify:track:{BARE_ID}",
+        f"https://open.spotify.com/intl-de/track/{track_id(2)}?si=abc",
+        f" {track_id(3)} ",
+        f"https://open.spotify.com/track/{track_id(2)}",
+        'not a track', None, f"spotify:album:{track_id(4)}",
+    ])
+    assert cleaned.track_ids == [BARE_ID, track_id(2), track_id(3)]
+    assert cleaned.duplicate_count == 2
+    assert cleaned.invalid == ['not a track', 'None', f"spotify:album:{track_id(4)}"]
+
+
+def test_interrupted_create_is_resumed(sp, library, monkeypatch):
+    track_ids = [track_id(n) for n in range(450)]
+    add_items = sp.playlist_add_items
+    calls = []
+
+    def interrupted(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > 2:
+            raise RuntimeError('connection lost')
+        return add_items(*args, **kwargs)
+
+    monkeypatch.setattr(sp, 'playlist_add_items', interrupted)
+    with pytest.raises(UploadError, match='after 200 added'):
+        upload_tracks(track_ids, 'create', 'Upload', sp=sp)
+    monkeypatch.undo()
+
+    result = upload_tracks(track_ids, 'create', 'Upload', sp=sp)
+    assert result.resumed and result.added == 250
+    assert _created_playlists(library) == [result.playlist_id]
+    assert library.playlist_track_ids(result.playlist_id) == track_ids
+
+
+@pytest.mark.parametrize('mode, added, removed', [('append', 10, 0), ('sync', 10, 10)])
+def test_append_and_sync_send_only_the_difference(sp, library, mode, added, removed):
+    current = [track_id(n) for n in range(3000, 3020)]
+    wanted = [track_id(n) for n in range(3010, 3030)]
+    requests_before = library.request_count
+    result = upload_tracks(wanted, mode, playlist_id=playlist_id(3), sp=sp)
+    assert (result.added, result.removed) == (added, removed)
+    # the playlist, its single page of tracks and one write per direction
+    assert library.request_count - requests_before == 2 + (added > 0) + (removed > 0)
+    expected = current + wanted[10:] if mode == 'append' else wanted
+    assert library.playlist_track_ids(playlist_id(3)) == expected
+
+
+def test_server_error_on_a_write_is_retried(sp, library, monkeypatch):
+    monkeypatch.setattr(client, 'RETRY_BACKOFF_SECONDS', 0.01)
+    track_ids = [track_id(n) for n in range(150)]
+    add_items = sp.playlist_add_items
+
+    def failing_once(*args, **kwargs):
+        if not getattr(failing_once, 'failed', False):
+            failing_once.failed = True
+            library.fail_next(1, status=502)
+        return add_items(*args, **kwargs)
+
+    monkeypatch.setattr(sp, 'playlist_add_items', failing_once)
+    result = upload_tracks(track_ids, 'create', 'Retried', sp=sp)
+    assert result.added == 150
+    assert library.playlist_track_ids(result.playlist_id) == track_ids